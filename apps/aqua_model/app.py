@@ -1,29 +1,335 @@
 import pytest
 import datetime
+import itertools
+import numbers
+import time
+from array import array
+from graphlib import TopologicalSorter
+
+
+class WallClock:
+    """Real time. The default clock, so histories record when each update happened."""
+
+    def now(self):
+        """Returns the current time in seconds since the epoch."""
+        return time.time()
+
+
+class SimulationClock:
+    """Simulated time that only moves when advanced, shared by a model and its parameters."""
+
+    def __init__(self, start=None, step=60.0):
+        if isinstance(start, datetime.datetime):
+            start = start.timestamp()
+        self.time = time.time() if start is None else float(start)
+        self.step = step
+
+    def now(self):
+        """Returns the simulated time in seconds since the epoch."""
+        return self.time
+
+    def advance(self, seconds=None):
+        """Moves the clock forward, by the default step unless told otherwise."""
+        self.time += self.step if seconds is None else seconds
+        return self.time
+
+
+WALL_CLOCK = WallClock()
+
+
+class History:
+    """Compact parameter history, stored as float64 arrays of timestamps and values.
+
+    Timestamps are seconds since the epoch. With a capacity the history is a ring buffer that
+    overwrites the oldest samples once full; without one it grows without limit.
+    Reading it looks like the list of (datetime, value) tuples it replaces. appended counts every
+    sample ever appended, including those a ring buffer has since overwritten.
+    """
+
+    __slots__ = ("capacity", "appended", "_start", "_count", "_timestamps", "_values")
+
+    def __init__(self, capacity=None, samples=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("History capacity must be at least 1, or None for unlimited.")
+
+        self.capacity = capacity
+        self.appended = 0
+        self.clear()
+
+        for timestamp, value in samples or ():
+            if isinstance(timestamp, datetime.datetime):
+                timestamp = timestamp.timestamp()
+            self.append(timestamp, value)
+
+    def append(self, timestamp, value):
+        """Adds a sample. The timestamp is in seconds since the epoch."""
+        self.appended += 1
+        if not self.capacity:
+            self._timestamps.append(timestamp)
+            self._values.append(value)
+            self._count += 1
+            return
+
+        if self._count < self.capacity:
+            index = self._start + self._count
+            if index >= self.capacity:
+                index -= self.capacity
+            self._count += 1
+        else:
+            index = self._start
+            self._start = index + 1 if index + 1 < self.capacity else 0
+
+        self._timestamps[index] = timestamp
+        self._values[index] = value
+
+    def clear(self):
+        """Removes all samples. A ring buffer keeps its preallocated arrays."""
+        self._start = 0
+        self._count = 0
+        if self.capacity:
+            self._timestamps = array("d", bytes(8 * self.capacity))
+            self._values = array("d", bytes(8 * self.capacity))
+        else:
+            self._timestamps = array("d")
+            self._values = array("d")
+
+    def _index(self, position):
+        """Maps a position (0 is the oldest sample) to an index into the arrays."""
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("history index out of range")
+        index = self._start + position
+        return index - self.capacity if self.capacity and index >= self.capacity else index
+
+    def timestamp(self, position):
+        """Returns the timestamp of a sample in seconds since the epoch."""
+        return self._timestamps[self._index(position)]
+
+    def value(self, position):
+        return self._values[self._index(position)]
+
+    def timestamps(self):
+        """Iterates over the timestamps, oldest first, in seconds since the epoch."""
+        for position in range(self._count):
+            yield self._timestamps[self._index(position)]
+
+    def values(self):
+        """Iterates over the values, oldest first."""
+        for position in range(self._count):
+            yield self._values[self._index(position)]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._count))]
+        index = self._index(position)
+        return (datetime.datetime.fromtimestamp(self._timestamps[index]), self._values[index])
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self[position]
+
+    def __repr__(self):
+        return f"History({self._count} samples, capacity={self.capacity})"
+
+    def position(self, timestamp, after=False):
+        """Binary search for the first sample at (or, with after=True, after) a time.
+
+        The timestamp is seconds since the epoch or a datetime. Timestamps must be in ascending
+        order, which they are when the samples come from a clock.
+        """
+        timestamp = _seconds(timestamp)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            sample = self._timestamps[self._index(middle)]
+            if sample < timestamp or (after and sample == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(self, start=None, end=None):
+        """Returns a view of the samples from start (inclusive) to end (exclusive), without copying."""
+        first = 0 if start is None else self.position(start)
+        last = self._count if end is None else self.position(end)
+        return HistoryView(self, first, max(first, last))
+
+    def aggregate(self, window, start=None, end=None):
+        """Yields min/max/mean/last for each window of samples between start and end.
+
+        window is in seconds or a timedelta. Windows are aligned to multiples of the window since
+        the epoch, and windows without samples are skipped.
+        """
+        aggregator = WindowAggregator(window)
+        view = self.range(start, end)
+        for timestamp, value in zip(view.timestamps(), view.values()):
+            completed = aggregator.add(timestamp, value)
+            if completed:
+                yield completed
+        completed = aggregator.flush()
+        if completed:
+            yield completed
+
+
+def _seconds(timestamp):
+    """Returns a timestamp as seconds since the epoch."""
+    return timestamp.timestamp() if isinstance(timestamp, datetime.datetime) else float(timestamp)
+
+
+class HistoryView:
+    """A read-only window onto part of a History. Reads go to the History's arrays.
+
+    The view holds the sequence numbers of its samples (counted by History.appended), so it reads
+    the same samples while the history grows. Once a ring buffer overwrites any of them, or the
+    history is cleared, reading the view raises RuntimeError rather than returning other samples.
+    """
+
+    def __init__(self, history, first, last):
+        self._history = history
+        base = history.appended - len(history)
+        self._first = base + first
+        self._last = base + last
+
+    def __len__(self):
+        return self._last - self._first
+
+    def _base(self):
+        """Returns the sequence number of the history's oldest sample, checking the view's samples are still there."""
+        history = self._history
+        base = history.appended - len(history)
+        if self._first < base and self._first < self._last:
+            raise RuntimeError("The history has overwritten or removed the samples of this view.")
+        return base
+
+    def _position(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("history index out of range")
+        return self._first + position - self._base()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return self._history[self._position(position)]
+
+    def __iter__(self):
+        for sequence in range(self._first, self._last):
+            yield self._history[sequence - self._base()]
+
+    def timestamps(self):
+        """Iterates over the timestamps in seconds since the epoch."""
+        history = self._history
+        for sequence in range(self._first, self._last):
+            yield history.timestamp(sequence - self._base())
+
+    def values(self):
+        history = self._history
+        for sequence in range(self._first, self._last):
+            yield history.value(sequence - self._base())
+
+
+class WindowAggregator:
+    """Incremental min/max/mean/last over fixed time windows.
+
+    Feed samples in time order with add(); it returns the previous window's aggregate when a
+    sample starts a new window. flush() returns the window in progress.
+    """
+
+    def __init__(self, window):
+        window = window.total_seconds() if isinstance(window, datetime.timedelta) else float(window)
+        if window <= 0:
+            raise ValueError("The window must be longer than 0 seconds.")
+        self.window = window
+        self._start = None
+
+    def add(self, timestamp, value):
+        timestamp = _seconds(timestamp)
+        start = timestamp - timestamp % self.window
+        completed = None
+        if start != self._start:
+            completed = self.flush()
+            self._start, self._count, self._total = start, 0, 0.0
+            self._min = self._max = value
+
+        self._count += 1
+        self._total += value
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._last = value
+        return completed
+
+    def flush(self):
+        """Returns the aggregate of the window in progress (or None), and starts afresh."""
+        if self._start is None:
+            return None
+        completed = {
+            "start": datetime.datetime.fromtimestamp(self._start),
+            "count": self._count,
+            "min": self._min,
+            "max": self._max,
+            "mean": self._total / self._count,
+            "last": self._last,
+        }
+        self._start = None
+        return completed
 
 
 class Parameter:
-    """Base class for all aquarium parameters."""
+    """Base class for all aquarium parameters.
+
+    Subclasses declare the model parameters they are calculated from (depends_on) and the
+    update_all() inputs they use (inputs), and map both onto calculate() in recalculate().
+    AquariumModel builds its evaluation order from these declarations.
+
+    Parameters use __slots__, so a fleet of models does not carry a __dict__ per parameter.
+    Subclasses declare __slots__ too, listing any attributes they add.
+    """
+
+    __slots__ = ("value", "name", "unit", "clock", "history")
+
+    depends_on = ()
+    inputs = ()
 
-    def __init__(self, initial_value, name=None, unit=None, history=None):
+    def __init__(self, initial_value, name=None, unit=None, history=None, history_capacity=None, clock=None):
         self.value = initial_value
         self.name = name
         self.unit = unit
-        self.history = history if history else []
+        self.clock = clock or WALL_CLOCK
+        if isinstance(history, History):
+            self.history = history
+        else:
+            self.history = History(history_capacity, history)
         self._add_history(initial_value)
 
     def _add_history(self, value):
-        self.history.append((datetime.datetime.now(), value))
+        self.history.append(self.clock.now(), value)
     
     def update(self, new_value):
         """Updates the parameter value and adds to history."""
         self.value = new_value
         self._add_history(new_value)
 
+    def history_range(self, start=None, end=None):
+        """Returns the history between start (inclusive) and end (exclusive), without copying it."""
+        return self.history.range(start, end)
+
+    def downsample(self, window, start=None, end=None):
+        """Returns min/max/mean/last per window (seconds or timedelta) of the history between start and end."""
+        return list(self.history.aggregate(window, start, end))
+
     def calculate(self, **kwargs):
          """Placeholder for parameter-specific calculations."""
          pass
 
+    def recalculate(self, upstream, **inputs):
+        """Calculates the parameter inside a model. upstream maps parameter keys, including the depends_on names, to parameters."""
+        return self.calculate(**inputs)
+
     def __repr__(self):
         return f"{self.name}: {self.value} {self.unit}"
 
@@ -31,8 +337,12 @@ class Parameter:
 class Temperature(Parameter):
     """Temperature in Celsius."""
 
-    def __init__(self, initial_value=25.0):
-        super().__init__(initial_value, name="Temperature", unit="°C")
+    __slots__ = ()
+
+    inputs = ("ambient_temp", "heater_power")
+
+    def __init__(self, initial_value=25.0, **kwargs):
+        super().__init__(initial_value, name="Temperature", unit="°C", **kwargs)
 
     def calculate(self, ambient_temp=None, heater_power=0):
       if ambient_temp:
@@ -44,8 +354,12 @@ class Temperature(Parameter):
 class pH(Parameter):
     """pH level."""
 
-    def __init__(self, initial_value=8.2):
-        super().__init__(initial_value, name="pH", unit="")
+    __slots__ = ()
+
+    depends_on = ("temperature",)
+
+    def __init__(self, initial_value=8.2, **kwargs):
+        super().__init__(initial_value, name="pH", unit="", **kwargs)
 
     def calculate(self, temperature):
         """Simulates pH change due to temperature."""
@@ -53,12 +367,19 @@ class pH(Parameter):
         self.update(max(7, min(9, self.value + temp_effect)))
         return self.value
 
+    def recalculate(self, upstream, **inputs):
+        return self.calculate(temperature=upstream["temperature"])
+
 
 class Salinity(Parameter):
     """Salinity in ppt."""
 
-    def __init__(self, initial_value=35.0):
-        super().__init__(initial_value, name="Salinity", unit="ppt")
+    __slots__ = ()
+
+    inputs = ("top_off_water", "salt_addition")
+
+    def __init__(self, initial_value=35.0, **kwargs):
+        super().__init__(initial_value, name="Salinity", unit="ppt", **kwargs)
 
     def calculate(self, top_off_water=0, salt_addition=0):
         """Simulates salinity change due to water changes."""
@@ -72,29 +393,49 @@ class Salinity(Parameter):
 class Ammonia(Parameter):
     """Ammonia level in ppm."""
 
-    def __init__(self, initial_value=0.0):
-        super().__init__(initial_value, name="Ammonia", unit="ppm")
+    __slots__ = ()
+
+    depends_on = ("bacteria",)
+    inputs = ("fish_load",)
+
+    def __init__(self, initial_value=0.0, **kwargs):
+        super().__init__(initial_value, name="Ammonia", unit="ppm", **kwargs)
     
     def calculate(self, fish_load =0, bacteria_level=0):
       if fish_load:
           self.update(min(1, self.value + (fish_load * 0.01) - (bacteria_level * 0.005)))
       return self.value
 
+    def recalculate(self, upstream, **inputs):
+      return self.calculate(bacteria_level=upstream["bacteria"].value, **inputs)
+
 class Nitrate(Parameter):
     """Nitrate level in ppm."""
 
-    def __init__(self, initial_value=0.0):
-       super().__init__(initial_value, name="Nitrate", unit="ppm")
+    __slots__ = ()
+
+    depends_on = ("ammonia", "bacteria")
+
+    def __init__(self, initial_value=0.0, **kwargs):
+       super().__init__(initial_value, name="Nitrate", unit="ppm", **kwargs)
     
     def calculate(self, ammonia, bacteria_level=0):
        if ammonia:
           self.update(min(50, self.value + (ammonia.value * 0.5) - (bacteria_level * 0.1)))
        return self.value
 
+    def recalculate(self, upstream, **inputs):
+       return self.calculate(ammonia=upstream["ammonia"], bacteria_level=upstream["bacteria"].value)
+
 class Bacteria(Parameter):
     """Bacteria level, arbitrary units."""
-    def __init__(self, initial_value=1.0):
-      super().__init__(initial_value, name="Bacteria Level", unit="units")
+
+    __slots__ = ()
+
+    inputs = ("waste_level",)
+
+    def __init__(self, initial_value=1.0, **kwargs):
+      super().__init__(initial_value, name="Bacteria Level", unit="units", **kwargs)
     
     def calculate(self, waste_level):
         if waste_level:
@@ -102,28 +443,185 @@ class Bacteria(Parameter):
         return self.value
 
 
+# Evaluation orders by dependency graph, shared by every model with that graph: the parameter keys
+# in order, and for each the positions of the parameters that depend on it.
+_ORDERS = {}
+
+# Marks an input that was not passed, in the inputs a settled parameter was last calculated from.
+_ABSENT = object()
+
+
 class AquariumModel:
-    """Container for all parameters."""
-    def __init__(self):
+    """Container for all parameters.
+
+    The parameters are evaluated in dependency order, built once from their depends_on
+    declarations.
+
+    update_all() only recalculates the parameters that are dirty. A parameter is dirty until a
+    calculation leaves its value unchanged (it has settled), and becomes dirty again when its
+    inputs change, when its value is changed outside update_all(), or when a parameter it depends on
+    changes value, which marks its dependents dirty. Every calculate() is a function of exactly
+    those, so skipping the rest gives the same values, and a skipped parameter records the same
+    history samples its last calculation did. skip_settled=False recalculates every parameter.
+    """
+
+    __slots__ = ("clock", "parameters", "skip_settled", "_order", "_dependents", "_targets", "_values", "_settled")
+
+    def __init__(self, history_capacity=None, clock=None, skip_settled=True):
+      self.clock = clock or WALL_CLOCK
+      self.skip_settled = skip_settled
+      options = {"history_capacity": history_capacity, "clock": self.clock}
       self.parameters = {
-        "temperature": Temperature(),
-        "ph": pH(),
-        "salinity": Salinity(),
-        "ammonia": Ammonia(),
-        "nitrate": Nitrate(),
-        "bacteria": Bacteria()
+        "temperature": Temperature(**options),
+        "ph": pH(**options),
+        "salinity": Salinity(**options),
+        "ammonia": Ammonia(**options),
+        "nitrate": Nitrate(**options),
+        "bacteria": Bacteria(**options)
     }
+      self._build_graph()
 
-    def update_all(self, ambient_temp=None, heater_power=0, top_off_water=0, salt_addition=0, fish_load=0, waste_level=0):
-      """Updates all parameters in the model."""
-      
-      self.parameters["temperature"].calculate(ambient_temp=ambient_temp, heater_power=heater_power)
-      self.parameters["ph"].calculate(temperature=self.parameters["temperature"])
-      self.parameters["salinity"].calculate(top_off_water=top_off_water, salt_addition=salt_addition)
-      self.parameters["bacteria"].calculate(waste_level=waste_level)
-      self.parameters["ammonia"].calculate(fish_load=fish_load, bacteria_level=self.parameters["bacteria"].value)
-      self.parameters["nitrate"].calculate(ammonia=self.parameters["ammonia"], bacteria_level=self.parameters["bacteria"].value)
+    def add_parameter(self, key, parameter):
+        """Adds a parameter (e.g. alkalinity) to the model, on the model's clock. A parameter that
+        would make the graph invalid is not added, and the error is re-raised."""
+        previous = self.parameters.get(key)
+        self.parameters[key] = parameter
+        try:
+            self._build_graph()
+        except ValueError:
+            # Also graphlib.CycleError. _build_graph() raises before assigning anything, so only the key needs restoring.
+            if previous is None:
+                del self.parameters[key]
+            else:
+                self.parameters[key] = previous
+            raise
+        parameter.clock = self.clock
+
+    def _build_graph(self):
+        """Orders the parameters so each comes after the parameters it depends on."""
+        graph = {}
+        for key, parameter in self.parameters.items():
+            missing = [name for name in parameter.depends_on if name not in self.parameters]
+            if missing:
+                raise ValueError(f"Parameter '{key}' depends on unknown parameters: {', '.join(missing)}")
+            graph[key] = tuple(parameter.depends_on)
+
+        # Models with the same parameters share one evaluation order, so a fleet sorts the graph once.
+        signature = tuple(graph.items())
+        cached = _ORDERS.get(signature)
+        if cached is None:
+            # Raises graphlib.CycleError for circular dependencies.
+            order = tuple(TopologicalSorter(graph).static_order())
+            positions = {key: index for index, key in enumerate(order)}
+            dependents = tuple(tuple(sorted(positions[other] for other in order if key in graph[other])) for key in order)
+            cached = _ORDERS[signature] = (order, dependents)
+        self._order, self._dependents = cached
+
+        self._targets = tuple(self.parameters[key] for key in self._order)
+        # Per parameter, in order: its value when update_all() last passed it, which its dependents
+        # were calculated from, and when its last calculation left that value unchanged, (the input
+        # values, the values of the samples it recorded). None marks a dirty parameter.
+        self._values = [parameter.value for parameter in self._targets]
+        self._settled = [None] * len(self._targets)
+
+    def set_clock(self, clock):
+        """Shares a clock between the model and all of its parameters."""
+        self.clock = clock
+        for parameter in self.parameters.values():
+            parameter.clock = clock
+
+    def update_all(self, ambient_temp=None, heater_power=0, top_off_water=0, salt_addition=0, fish_load=0, waste_level=0, **inputs):
+      """Updates all parameters in the model. Extra keyword inputs are passed to added parameters
+      declaring them, and any other name raises TypeError."""
+
+      if inputs:
+        declared = set().union(*(parameter.inputs for parameter in self._targets))
+        unknown = inputs.keys() - declared
+        if unknown:
+          raise TypeError(f"update_all() got unexpected inputs: {', '.join(sorted(unknown))}")
+      inputs.update(ambient_temp=ambient_temp, heater_power=heater_power, top_off_water=top_off_water,
+                    salt_addition=salt_addition, fish_load=fish_load, waste_level=waste_level)
+
+      upstream, settled = self.parameters, self._settled
+      if not self.skip_settled:
+        for parameter in self._targets:
+          parameter.recalculate(upstream, **{name: inputs[name] for name in parameter.inputs if name in inputs})
+        # Nothing was tracked, so every parameter is dirty if skipping is turned back on.
+        settled[:] = [None] * len(settled)
+        return
+
+      values = self._values
+      for index, parameter in enumerate(self._targets):
+        names = parameter.inputs
+        own = tuple([inputs.get(name, _ABSENT) for name in names])
+        value = parameter.value
+        last = settled[index]
+        if last is not None and last[0] == own and value == values[index]:
+          # Recalculating would record these samples again, so the history matches a full update.
+          history, now = parameter.history, parameter.clock.now()
+          for sample in last[1]:
+            history.append(now, sample)
+          continue
+
+        history = parameter.history
+        appended = history.appended
+        parameter.recalculate(upstream, **{name: inputs[name] for name in names if name in inputs})
+
+        if parameter.value == value:
+          recorded = min(history.appended - appended, len(history))
+          settled[index] = (own, tuple([history.value(-i) for i in range(recorded, 0, -1)]))
+        else:
+          settled[index] = None
+        if parameter.value != values[index]:
+          values[index] = parameter.value
+          for dependent in self._dependents[index]:
+            settled[dependent] = None
+
+    def run(self, steps=None, dt=60.0, inputs=None, clock=None):
+        """Advances the model many steps in simulated time.
+
+        Each step moves the clock forward by dt seconds and then calls update_all(). inputs maps
+        update_all() argument names to a constant (any real number, including NumPy scalars), or to
+        a per-step series (a list, a NumPy array or a generator). With steps=None the run continues
+        until the shortest series ends.
+
+        The run needs a SimulationClock. clock, when given, becomes the model's clock (as with
+        set_clock()). Otherwise a model already on a SimulationClock continues from it, and a model
+        on the wall clock is moved onto a new SimulationClock starting now, which it keeps after the
+        run: later update_all() calls are timestamped in simulated time too.
+
+        Returns the number of steps run.
+        """
+        if clock is not None:
+            if not isinstance(clock, SimulationClock):
+                raise TypeError("run() needs a SimulationClock.")
+            self.set_clock(clock)
+        elif not isinstance(self.clock, SimulationClock):
+            self.set_clock(SimulationClock())
+
+        series = {}
+        for name, value in (inputs or {}).items():
+            if value is None or isinstance(value, numbers.Real):
+                series[name] = itertools.repeat(value)
+            else:
+                series[name] = iter(value)
+
+        if steps is None and all(isinstance(s, itertools.repeat) for s in series.values()):
+            raise ValueError("steps is required when no input series limits the run.")
+
+        clock, update_all, names, iterators = self.clock, self.update_all, tuple(series), tuple(series.values())
+        for step in (range(steps) if steps is not None else itertools.count()):
+            try:
+                values = [next(iterator) for iterator in iterators]
+            except StopIteration:
+                if steps is None:
+                    return step
+                raise ValueError(f"An input series ended after {step} of {steps} steps.")
+
+            clock.advance(dt)
+            update_all(**dict(zip(names, values)))
 
+        return steps
 
     def get_parameter(self, name):
         """Returns a specific parameter instance."""
@@ -0,0 +1,107 @@
+import numpy as np
+
+from app import AquariumModel
+
+
+class BatchAquariumModel:
+    """Many aquariums advanced together, one NumPy array per parameter.
+
+    Applies the same update rules (and clamps) as the scalar Parameter classes, so tank i of the
+    batch holds the same values as an AquariumModel given tank i's inputs.
+
+    Inputs to update_all() may be scalars (shared by every tank) or arrays with one value per tank.
+    A falsy input skips that tank's update, as it does in the scalar classes. For ambient_temp,
+    None or NaN plays the role of the scalar None.
+    """
+
+    PARAMETERS = ("temperature", "ph", "salinity", "ammonia", "nitrate", "bacteria")
+
+    def __init__(self, tanks, **initial_values):
+        if tanks < 1:
+            raise ValueError("A batch needs at least one tank.")
+
+        unknown = set(initial_values) - set(self.PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+        # The defaults come from the scalar model, so both start from the same state.
+        defaults = {name: p.value for name, p in AquariumModel().get_all_parameters().items()}
+
+        self.tanks = tanks
+        self.parameters = {}
+        for name in self.PARAMETERS:
+            values = np.empty(tanks, dtype=np.float64)
+            values[:] = initial_values.get(name, defaults[name])
+            self.parameters[name] = values
+
+    def _input(self, value):
+        """Returns an input as a per-tank float array, or None when no tank is updated."""
+        if value is None:
+            return None
+        if np.isscalar(value):
+            return np.full(self.tanks, value, dtype=np.float64) if value else None
+
+        values = np.asarray(value, dtype=np.float64)
+        if values.shape != (self.tanks,):
+            raise ValueError(f"Expected {self.tanks} values per input, got shape {values.shape}.")
+        return values
+
+    @staticmethod
+    def _apply(target, mask, new_values):
+        """Writes new_values into target where mask is set, in place."""
+        np.copyto(target, new_values, where=mask)
+
+    def update_all(self, ambient_temp=None, heater_power=0, top_off_water=0, salt_addition=0, fish_load=0, waste_level=0):
+        """Updates all parameters of every tank, in the same order as AquariumModel.update_all()."""
+        temperature = self.parameters["temperature"]
+        ph = self.parameters["ph"]
+        salinity = self.parameters["salinity"]
+        ammonia = self.parameters["ammonia"]
+        nitrate = self.parameters["nitrate"]
+        bacteria = self.parameters["bacteria"]
+
+        ambient_temp = self._input(ambient_temp)
+        if ambient_temp is not None:
+            heater_power = np.broadcast_to(np.asarray(heater_power, dtype=np.float64), (self.tanks,))
+            mask = (ambient_temp != 0) & ~np.isnan(ambient_temp)
+            self._apply(temperature, mask, ambient_temp + (heater_power * 0.1))
+
+        np.clip(ph + (temperature - 25) * -0.01, 7, 9, out=ph)
+
+        top_off_water = self._input(top_off_water)
+        if top_off_water is not None:
+            self._apply(salinity, top_off_water != 0, np.clip(salinity - (top_off_water * 0.1), 20, 40))
+
+        salt_addition = self._input(salt_addition)
+        if salt_addition is not None:
+            self._apply(salinity, salt_addition != 0, np.clip(salinity + (salt_addition * 0.1), 20, 40))
+
+        waste_level = self._input(waste_level)
+        if waste_level is not None:
+            self._apply(bacteria, waste_level != 0, np.minimum(20, bacteria + (waste_level * 0.2)))
+
+        fish_load = self._input(fish_load)
+        if fish_load is not None:
+            self._apply(ammonia, fish_load != 0, np.minimum(1, ammonia + (fish_load * 0.01) - (bacteria * 0.005)))
+
+        np.minimum(50, nitrate + (ammonia * 0.5) - (bacteria * 0.1), out=nitrate)
+
+    def get_parameter(self, name):
+        """Returns the per-tank values of a parameter."""
+        return self.parameters.get(name)
+
+    def get_all_parameters(self):
+        """Returns all parameters"""
+        return self.parameters
+
+    def tank(self, index):
+        """Returns the values of a single tank."""
+        return {name: float(values[index]) for name, values in self.parameters.items()}
+
+    def __len__(self):
+        return self.tanks
+
+    def __repr__(self):
+        return f"Batch of {self.tanks} aquariums:\n" + "\n".join(
+            f"{name}: mean {values.mean():.4f}, min {values.min():.4f}, max {values.max():.4f}"
+            for name, values in self.parameters.items())
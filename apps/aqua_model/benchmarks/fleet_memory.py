@@ -0,0 +1,95 @@
+"""Memory benchmark: a Fleet of models versus the same number of models built from baseline classes.
+
+The baseline is another version of app.py, loaded as a separate module, e.g. the one before
+parameters used __slots__:
+
+    git show <commit>:apps/aqua_model/app.py > /tmp/app_before.py
+
+Baselines whose AquariumModel takes no history_capacity or clock, such as the original app.py, are
+built with their defaults and their histories trimmed to the capacity.
+
+Both sides hold every tank's parameters and histories on one shared clock.
+
+Usage:
+    python benchmarks/fleet_memory.py /tmp/app_before.py [--tanks 100000] [--history-capacity 16]
+    (run from apps/aqua_model)
+"""
+
+import argparse
+import importlib.util
+import inspect
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import SimulationClock
+from fleet import Fleet
+
+
+def load_baseline(path):
+    spec = importlib.util.spec_from_file_location("baseline_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_baseline_models(module, tanks, history_capacity):
+    accepted = inspect.signature(module.AquariumModel).parameters
+    if "history_capacity" in accepted and "clock" in accepted:
+        clock = module.SimulationClock()
+        return {tank: module.AquariumModel(history_capacity=history_capacity, clock=clock) for tank in range(tanks)}
+
+    # Versions before the History ring buffer and clocks take no arguments and keep each history
+    # as a list, so it is trimmed to the capacity instead.
+    models = {}
+    for tank in range(tanks):
+        model = models[tank] = module.AquariumModel()
+        if history_capacity is not None:
+            for parameter in model.parameters.values():
+                del parameter.history[:len(parameter.history) - history_capacity]
+    return models
+
+
+def build_fleet(tanks, history_capacity):
+    fleet = Fleet(history_capacity, SimulationClock())
+    for tank in range(tanks):
+        fleet.add(tank)
+    return fleet
+
+
+def measure(name, function, *args):
+    # Time and memory are measured in separate runs, as tracing allocations slows everything down.
+    started = time.perf_counter()
+    models = function(*args)
+    elapsed = time.perf_counter() - started
+    del models
+
+    tracemalloc.start()
+    models = function(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tanks = len(models)
+    print(f"{name:<16} {tanks:>9} tanks  {elapsed:8.2f} s  {current / 2**20:9.1f} MiB  {current / tanks:8.0f} B/tank")
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of a Fleet with models built from a baseline app.py.")
+    parser.add_argument("baseline", help="The app.py to compare against")
+    parser.add_argument("--tanks", type=int, default=100000, help="Number of tanks. Default is 100000")
+    parser.add_argument("--history-capacity", type=int, help="Ring buffer capacity of each history. Default is unlimited")
+    args = parser.parse_args()
+
+    module = load_baseline(args.baseline)
+    baseline = measure("baseline models", build_baseline_models, module, args.tanks, args.history_capacity)
+    fleet = measure("Fleet", build_fleet, args.tanks, args.history_capacity)
+    print(f"Fleet uses {fleet / baseline:.0%} of the memory of the baseline models.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+from app import WALL_CLOCK, AquariumModel
+
+
+class Fleet:
+    """A registry of aquarium models, looked up by tank id.
+
+    Every tank shares the fleet's clock and history capacity, and models with the same parameters
+    share one evaluation order. Models are created on first use by
+    model_factory, which takes the tank id and returns an AquariumModel.
+    """
+
+    def __init__(self, history_capacity=None, clock=None, model_factory=None):
+        self.clock = clock or WALL_CLOCK
+        self.history_capacity = history_capacity
+        self.model_factory = model_factory or self._model
+        self._models = {}
+
+    def _model(self, tank):
+        return AquariumModel(history_capacity=self.history_capacity, clock=self.clock)
+
+    def add(self, tank, model=None):
+        """Registers a tank, creating its model unless one is given, and returns the model."""
+        if tank in self._models:
+            raise ValueError(f"Tank '{tank}' is already in the fleet.")
+        if model is None:
+            model = self.model_factory(tank)
+        else:
+            model.set_clock(self.clock)
+        self._models[tank] = model
+        return model
+
+    def setdefault(self, tank):
+        """Returns the model of a tank, registering the tank first if it is new."""
+        model = self._models.get(tank)
+        return model if model is not None else self.add(tank)
+
+    def get(self, tank, default=None):
+        return self._models.get(tank, default)
+
+    def remove(self, tank):
+        """Removes a tank and returns its model."""
+        return self._models.pop(tank)
+
+    def set_clock(self, clock):
+        """Moves every tank onto a new clock, e.g. a SimulationClock."""
+        self.clock = clock
+        for model in self._models.values():
+            model.set_clock(clock)
+
+    def update_all(self, inputs=None, **shared):
+        """Updates every tank. shared inputs go to all tanks; inputs maps tank ids to their own inputs, which take precedence."""
+        inputs = inputs or {}
+        for tank, model in self._models.items():
+            own = inputs.get(tank)
+            model.update_all(**({**shared, **own} if own else shared))
+
+    def values(self, key):
+        """Returns {tank: value} for one parameter, e.g. fleet.values("ph")."""
+        return {tank: model.parameters[key].value for tank, model in self._models.items()}
+
+    def items(self):
+        return self._models.items()
+
+    def __getitem__(self, tank):
+        return self._models[tank]
+
+    def __delitem__(self, tank):
+        del self._models[tank]
+
+    def __contains__(self, tank):
+        return tank in self._models
+
+    def __iter__(self):
+        return iter(self._models)
+
+    def __len__(self):
+        return len(self._models)
+
+    def __repr__(self):
+        return f"Fleet of {len(self._models)} aquariums"
@@ -0,0 +1,422 @@
+"""Streaming sensor ingestion for many aquarium models.
+
+Readings are NDJSON lines, one per sensor sample:
+
+    {"tank": "reef-1", "parameter": "ph", "value": 8.12, "ts": "2024-01-01T12:00:00"}
+
+parameter is a model parameter (its history records the reading) or an update_all() input such as
+ambient_temp (held for the tank until the next reading replaces it). ts is optional: seconds since
+the epoch or ISO 8601, defaulting to the tank's clock. A reading later than a simulation clock moves
+the clock forward to it; on the wall clock, readings from the future are rejected.
+
+Lines are validated as they are read, so bad readings never take up queue space, and valid ones
+wait in a bounded queue. A full queue stops the sources reading, which pushes back on socket
+clients through TCP flow control. A single consumer applies the queue in batches and calls
+update_all() on every tank at the update interval. If the consumer fails, sources waiting on the
+full queue are cancelled, later readings raise RuntimeError, and stop() raises the failure.
+
+Usage:
+    python ingest.py --file readings.ndjson --update-interval 0
+    python ingest.py --tcp 127.0.0.1:9100 --unix /tmp/aqua.sock --metrics-interval 10
+    sensor-feed | python ingest.py --stdin
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import sys
+import time
+
+from app import AquariumModel, SimulationClock
+
+# The update_all() arguments a reading may set.
+INPUTS = ("ambient_temp", "heater_power", "top_off_water", "salt_addition", "fish_load", "waste_level")
+
+# Values outside these ranges are sensor faults, not water chemistry, and are rejected.
+LIMITS = {
+    "temperature": (0.0, 45.0),
+    "ph": (0.0, 14.0),
+    "salinity": (0.0, 50.0),
+    "ammonia": (0.0, 10.0),
+    "nitrate": (0.0, 500.0),
+    "bacteria": (0.0, 1000.0),
+    "ambient_temp": (-40.0, 60.0),
+}
+
+_STOP = object()
+
+
+class Metrics:
+    """Throughput and backpressure counters for an IngestPipeline."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.received = 0
+        self.accepted = 0
+        self.applied = 0
+        self.rejected = {}
+        self.batches = 0
+        self.updates = 0
+        self.blocked = 0
+        self.queue_peak = 0
+
+    def reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def as_dict(self, queue_size=0):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "elapsed": elapsed,
+            "received": self.received,
+            "accepted": self.accepted,
+            "applied": self.applied,
+            "rejected": dict(self.rejected),
+            "batches": self.batches,
+            "mean_batch": self.applied / self.batches if self.batches else 0.0,
+            "updates": self.updates,
+            "readings_per_second": self.applied / elapsed,
+            "queue_size": queue_size,
+            "queue_peak": self.queue_peak,
+            "blocked": self.blocked,
+        }
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value).timestamp()
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("ts must be seconds since the epoch or ISO 8601")
+    return float(value)
+
+
+class IngestPipeline:
+    """Feeds sensor readings into one AquariumModel per tank.
+
+    model_factory creates the model of a tank the first time it is seen. batch_size caps the
+    readings applied per batch. update_interval is the seconds between update_all() rounds, or
+    None to only run them through tick().
+    """
+
+    def __init__(self, model_factory=AquariumModel, queue_size=10000, batch_size=1000, update_interval=1.0, limits=None):
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("queue_size and batch_size must be at least 1.")
+
+        self.model_factory = model_factory
+        self.batch_size = batch_size
+        self.update_interval = update_interval
+        self.limits = LIMITS if limits is None else limits
+        self.models = {}
+        self.inputs = {}
+        self.metrics = Metrics()
+        self._queue = None
+        self._queue_size = queue_size
+        self._consumer = None
+        self._error = None
+        self._waiting = set()
+        self._parameters = None
+
+    def model(self, tank):
+        """Returns the model of a tank, creating it on first use."""
+        model = self.models.get(tank)
+        if model is None:
+            model = self.models[tank] = self.model_factory()
+            self.inputs[tank] = {}
+        return model
+
+    def parse(self, line):
+        """Validates an NDJSON line and returns its (tank, parameter, value, timestamp).
+
+        Raises ValueError with the reason the reading was rejected.
+        """
+        try:
+            reading = json.loads(line)
+        except ValueError:
+            raise ValueError("invalid json") from None
+        if not isinstance(reading, dict):
+            raise ValueError("not an object")
+
+        tank, parameter, value = reading.get("tank"), reading.get("parameter"), reading.get("value")
+        if not isinstance(tank, (str, int)) or isinstance(tank, bool):
+            raise ValueError("missing tank")
+        if self._parameters is None:
+            self._parameters = frozenset(self.model_factory().parameters)
+        if parameter not in self._parameters and parameter not in INPUTS:
+            raise ValueError("unknown parameter")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError("invalid value")
+        low, high = self.limits.get(parameter, (-math.inf, math.inf))
+        if not low <= value <= high:
+            raise ValueError("out of range")
+        try:
+            timestamp = _timestamp(reading.get("ts"))
+        except (TypeError, ValueError):
+            raise ValueError("invalid ts") from None
+
+        return tank, parameter, float(value), timestamp
+
+    async def start(self):
+        """Starts the consumer. Sources can feed the pipeline once it has started."""
+        if self._consumer is None:
+            self._queue = asyncio.Queue(self._queue_size)
+            self._error = None
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """Applies the readings still queued, runs a last update_all() round and stops the consumer.
+
+        Raises the consumer's exception if it failed.
+        """
+        if self._consumer is not None:
+            consumer, self._consumer = self._consumer, None
+            if not consumer.done():
+                await self._enqueue(_STOP)
+            await consumer
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def put(self, line):
+        """Validates a line and queues it, waiting while the queue is full. Returns whether it was accepted."""
+        self.metrics.received += 1
+        try:
+            reading = self.parse(line)
+        except ValueError as e:
+            self.metrics.reject(str(e))
+            return False
+
+        if self._error is not None:
+            raise RuntimeError("The ingest consumer has failed.") from self._error
+        if self._queue.full():
+            self.metrics.blocked += 1
+        await self._enqueue(reading)
+        self.metrics.accepted += 1
+        self.metrics.queue_peak = max(self.metrics.queue_peak, self._queue.qsize())
+        return True
+
+    async def _enqueue(self, item):
+        """Queues an item, waiting while the queue is full. Waiting tasks are cancelled if the consumer fails."""
+        if not self._queue.full():
+            self._queue.put_nowait(item)
+            return
+        task = asyncio.current_task()
+        self._waiting.add(task)
+        try:
+            await self._queue.put(item)
+        finally:
+            self._waiting.discard(task)
+
+    async def feed(self, lines):
+        """Queues every line of a sync or async iterable of str or bytes."""
+        if hasattr(lines, "__aiter__"):
+            async for line in lines:
+                if line.strip():
+                    await self.put(line)
+            return
+
+        for count, line in enumerate(lines, 1):
+            if line.strip():
+                await self.put(line)
+            # Let the consumer run even when the queue never fills.
+            if count % self.batch_size == 0:
+                await asyncio.sleep(0)
+
+    async def read_file(self, file):
+        """Queues the lines of a file opened in binary mode (or stdin), reading in a thread so the loop keeps running.
+
+        read1() returns whatever a pipe has buffered rather than waiting for a full block, so each reading
+        of a live feed is queued as soon as its line arrives.
+        """
+        loop = asyncio.get_running_loop()
+        partial = b""
+        while True:
+            chunk = await loop.run_in_executor(None, file.read1, 65536)
+            if not chunk:
+                break
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            await self.feed(lines)
+        if partial.strip():
+            await self.feed([partial])
+
+    async def read_path(self, path):
+        with open(path, "rb") as file:
+            await self.read_file(file)
+
+    async def read_stdin(self):
+        await self.read_file(sys.stdin.buffer)
+
+    async def read_stream(self, reader, writer=None):
+        """Queues the lines of an asyncio stream, e.g. a socket connection."""
+        try:
+            await self.feed(reader)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def serve_tcp(self, host, port):
+        """Returns an asyncio server that feeds each connection's lines into the pipeline."""
+        return await asyncio.start_server(self.read_stream, host, port)
+
+    async def serve_unix(self, path):
+        return await asyncio.start_unix_server(self.read_stream, path)
+
+    async def _consume(self):
+        try:
+            await self._apply_queue()
+        except BaseException as e:
+            # Nothing reads the queue any more, so sources waiting for space would wait forever.
+            self._error = e
+            for task in list(self._waiting):
+                task.cancel()
+            raise
+
+    async def _apply_queue(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        next_update = None if self.update_interval is None else loop.time() + self.update_interval
+        stopping = False
+
+        while not stopping:
+            try:
+                if next_update is None:
+                    first = await queue.get()
+                else:
+                    first = await asyncio.wait_for(queue.get(), max(0.0, next_update - loop.time()))
+                batch = [first]
+            except asyncio.TimeoutError:
+                batch = []
+
+            if batch and batch[0] is _STOP:
+                batch.pop()
+                stopping = True
+            while not stopping and batch and len(batch) < self.batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                self.apply(batch)
+            while stopping and not queue.empty():
+                # Readings queued behind the stop (by sources still running) are applied too.
+                batch = [queue.get_nowait() for _ in range(min(self.batch_size, queue.qsize()))]
+                batch = [item for item in batch if item is not _STOP]
+                if batch:
+                    self.apply(batch)
+
+            if stopping or (next_update is not None and loop.time() >= next_update):
+                if self.update_interval is not None:
+                    self.tick()
+                    next_update = loop.time() + self.update_interval
+
+    def apply(self, batch):
+        """Applies a batch of parsed readings to the tanks' parameters and inputs."""
+        for tank, name, value, timestamp in batch:
+            model = self.model(tank)
+            parameter = model.parameters.get(name)
+
+            if parameter is None:
+                self.inputs[tank][name] = value
+            elif timestamp is None:
+                parameter.update(value)
+            else:
+                history = parameter.history
+                # History queries binary search the timestamps, so they must stay in order.
+                if len(history) and timestamp < history.timestamp(-1):
+                    self.metrics.reject("out of order")
+                    continue
+                # update_all() records samples at the clock's time, which must not fall behind this reading.
+                now = model.clock.now()
+                if timestamp > now:
+                    if not isinstance(model.clock, SimulationClock):
+                        self.metrics.reject("in the future")
+                        continue
+                    model.clock.advance(timestamp - now)
+                parameter.value = value
+                history.append(timestamp, value)
+
+            self.metrics.applied += 1
+
+        self.metrics.batches += 1
+
+    def tick(self):
+        """Runs update_all() on every tank with its latest inputs."""
+        for tank, model in self.models.items():
+            model.update_all(**self.inputs[tank])
+        self.metrics.updates += 1
+
+    def stats(self):
+        return self.metrics.as_dict(self._queue.qsize() if self._queue else 0)
+
+
+async def _report(pipeline, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps({"metrics": pipeline.stats()}), file=sys.stderr, flush=True)
+
+
+async def _main(args):
+    pipeline = IngestPipeline(queue_size=args.queue_size, batch_size=args.batch_size,
+                              update_interval=args.update_interval or None)
+    servers, sources = [], []
+
+    async with pipeline:
+        reporter = asyncio.create_task(_report(pipeline, args.metrics_interval)) if args.metrics_interval else None
+
+        for address in args.tcp or ():
+            host, _, port = address.rpartition(":")
+            servers.append(await pipeline.serve_tcp(host or None, int(port)))
+        for path in args.unix or ():
+            servers.append(await pipeline.serve_unix(path))
+        sources.extend(pipeline.read_path(path) for path in args.file or ())
+        if args.stdin:
+            sources.append(pipeline.read_stdin())
+
+        try:
+            await asyncio.gather(*sources, *(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            if reporter:
+                reporter.cancel()
+
+    if not args.update_interval:
+        pipeline.tick()
+
+    print(json.dumps({"metrics": pipeline.stats()}))
+    for tank, model in pipeline.models.items():
+        print(json.dumps({"tank": tank, "values": {key: p.value for key, p in model.get_all_parameters().items()}}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream sensor readings (NDJSON) into aquarium models.")
+    parser.add_argument("--file", action="append", help="NDJSON file of readings. Can be repeated")
+    parser.add_argument("--stdin", action="store_true", help="Read NDJSON readings from stdin")
+    parser.add_argument("--tcp", action="append", help="Listen for readings on host:port. Can be repeated")
+    parser.add_argument("--unix", action="append", help="Listen for readings on a unix socket path. Can be repeated")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Readings held before sources are paused. Default is 10000")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Maximum readings applied per batch. Default is 1000")
+    parser.add_argument("--update-interval", type=float, default=1.0, help="Seconds between update_all() rounds, 0 for one at the end. Default is 1")
+    parser.add_argument("--metrics-interval", type=float, help="Print metrics to stderr every this many seconds")
+    args = parser.parse_args()
+
+    if not (args.file or args.stdin or args.tcp or args.unix):
+        parser.error("at least one of --file, --stdin, --tcp or --unix is required")
+
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""Memory-mapped, columnar persistence for aquarium parameter histories.
+
+Each parameter's history lives in its own file, <directory>/<parameter>.aqh:
+
+    header   32 bytes: magic b"AQH1", version (u16), flags (u16), count (u64), slots (u64), padding
+    column   slots x float64 timestamps (seconds since the epoch)
+    column   slots x float64 values
+
+Samples are written straight into the mapped columns and the count is updated after each one, so a
+model reopened from its directory only reads the headers. Files double in size when they fill up.
+Opened with readonly=True (as the export command does), files are mapped read-only and never created.
+
+Usage:
+    model = open_model("./tank1")
+    model.run(steps=1440, inputs={"ambient_temp": 26})
+    close_model(model)
+
+    python storage.py export ./tank1 --format ndjson > tank1.ndjson
+"""
+
+import argparse
+import datetime
+import errno
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+
+from app import AquariumModel, History
+
+HEADER = struct.Struct("<4sHHQQ8x")
+MAGIC = b"AQH1"
+VERSION = 1
+EXTENSION = ".aqh"
+
+
+class MappedHistory(History):
+    """A History whose samples live in a memory-mapped columnar file. It grows without limit.
+
+    With readonly=True the file must exist, is mapped read-only and cannot be appended to.
+    """
+
+    def __init__(self, path, initial_slots=1024, readonly=False):
+        if initial_slots < 1:
+            raise ValueError("A history file needs at least 1 slot.")
+
+        self.path = path
+        self.readonly = readonly
+        self.capacity = None
+        self.appended = 0
+        self._start = 0
+
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(errno.ENOENT, "No such parameter history", path)
+            exists = True
+            self._file = open(path, "rb")
+        else:
+            exists = os.path.exists(path) and os.path.getsize(path) > 0
+            self._file = open(path, "r+b" if exists else "w+b")
+
+        if exists:
+            try:
+                count, slots = self._read_header()
+            except ValueError:
+                self._file.close()
+                raise
+        else:
+            count, slots = 0, initial_slots
+            self._file.write(HEADER.pack(MAGIC, VERSION, 0, count, slots))
+            self._file.truncate(HEADER.size + 16 * slots)
+
+        self._map(slots)
+        self._count = count
+
+    def _read_header(self):
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{self.path} is shorter than a history file header ({len(header)} of {HEADER.size} bytes).")
+        magic, version, _, count, slots = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} history file.")
+        if slots < 1 or count > slots or os.fstat(self._file.fileno()).st_size < HEADER.size + 16 * slots:
+            raise ValueError(f"{self.path} is truncated: its header lists {count} of {slots} slots.")
+        return count, slots
+
+    def _map(self, slots):
+        self._slots = slots
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._mmap = mmap.mmap(self._file.fileno(), HEADER.size + 16 * slots, access=access)
+        view = memoryview(self._mmap)
+        self._timestamps = view[HEADER.size:HEADER.size + 8 * slots].cast("d")
+        self._values = view[HEADER.size + 8 * slots:HEADER.size + 16 * slots].cast("d")
+        view.release()
+
+    def _unmap(self):
+        self._timestamps.release()
+        self._values.release()
+        self._mmap.close()
+
+    def _grow(self):
+        """Doubles the slots, moving the values column to its new offset."""
+        old_slots, new_slots = self._slots, self._slots * 2
+        self._mmap.flush()
+        self._unmap()
+        self._file.truncate(HEADER.size + 16 * new_slots)
+        self._map(new_slots)
+        self._mmap.move(HEADER.size + 8 * new_slots, HEADER.size + 8 * old_slots, 8 * self._count)
+        struct.pack_into("<Q", self._mmap, 16, new_slots)
+
+    def append(self, timestamp, value):
+        if self.readonly:
+            raise io.UnsupportedOperation(f"{self.path} is open read-only.")
+        self.appended += 1
+        if self._count == self._slots:
+            self._grow()
+        self._timestamps[self._count] = timestamp
+        self._values[self._count] = value
+        self._count += 1
+        # The count goes last, so a reader never sees a sample that has not been written.
+        struct.pack_into("<Q", self._mmap, 8, self._count)
+
+    def clear(self):
+        """Removes all samples. The file keeps its size."""
+        if self.readonly:
+            raise io.UnsupportedOperation(f"{self.path} is open read-only.")
+        self._count = 0
+        struct.pack_into("<Q", self._mmap, 8, 0)
+
+    def flush(self):
+        if not self.readonly:
+            self._mmap.flush()
+
+    def close(self):
+        if not self._mmap.closed:
+            self.flush()
+            self._unmap()
+            self._file.close()
+
+    def __repr__(self):
+        return f"MappedHistory({self.path}, {self._count} samples)"
+
+
+def open_model(directory, clock=None, initial_slots=1024, readonly=False):
+    """Opens a model whose histories are memory-mapped files in directory, creating them if needed.
+
+    Parameters with saved samples resume from their last value. New files start with the
+    parameter's initial sample. With readonly=True nothing is created or written: every parameter
+    must have a file (FileNotFoundError otherwise), and the model can be read but not updated.
+    """
+    if not readonly:
+        os.makedirs(directory, exist_ok=True)
+    model = AquariumModel(clock=clock)
+
+    try:
+        for key, parameter in model.get_all_parameters().items():
+            history = MappedHistory(os.path.join(directory, key + EXTENSION), initial_slots, readonly)
+            if len(history):
+                parameter.value = history.value(-1)
+            elif not readonly:
+                for timestamp, value in zip(parameter.history.timestamps(), parameter.history.values()):
+                    history.append(timestamp, value)
+            parameter.history = history
+    except BaseException:
+        close_model(model)
+        raise
+
+    return model
+
+
+def flush_model(model):
+    for parameter in model.get_all_parameters().values():
+        if isinstance(parameter.history, MappedHistory):
+            parameter.history.flush()
+
+
+def close_model(model):
+    for parameter in model.get_all_parameters().values():
+        if isinstance(parameter.history, MappedHistory):
+            parameter.history.close()
+
+
+def _iso(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).isoformat()
+
+
+def export_csv(histories, file):
+    """Streams {parameter: history (or HistoryView)} to file as CSV rows of parameter,timestamp,value."""
+    file.write("parameter,timestamp,value\n")
+    for name, history in histories.items():
+        for timestamp, value in zip(history.timestamps(), history.values()):
+            file.write(f"{name},{_iso(timestamp)},{value!r}\n")
+
+
+def export_ndjson(histories, file):
+    """Streams {parameter: history (or HistoryView)} to file as one JSON object per sample."""
+    for name, history in histories.items():
+        for timestamp, value in zip(history.timestamps(), history.values()):
+            file.write(json.dumps({"parameter": name, "timestamp": _iso(timestamp), "value": value}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export memory-mapped aquarium histories.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Stream histories as CSV or NDJSON")
+    export.add_argument("directory", help="Directory holding the .aqh history files")
+    export.add_argument("--format", choices=("csv", "ndjson"), default="csv", help="Output format. Default is csv")
+    export.add_argument("--parameter", action="append", help="Parameter to export. Default is all of them")
+    export.add_argument("--start", type=datetime.datetime.fromisoformat, help="First time to export (ISO 8601)")
+    export.add_argument("--end", type=datetime.datetime.fromisoformat, help="Time to stop at, exclusive (ISO 8601)")
+    args = parser.parse_args()
+
+    names = args.parameter or sorted(file[:-len(EXTENSION)] for file in os.listdir(args.directory) if file.endswith(EXTENSION))
+    histories = {}
+    try:
+        for name in names:
+            try:
+                histories[name] = MappedHistory(os.path.join(args.directory, name + EXTENSION), readonly=True)
+            except FileNotFoundError:
+                parser.error(f"no such parameter: {name}")
+            except ValueError as e:
+                parser.error(str(e))
+        views = {name: history.range(args.start, args.end) for name, history in histories.items()}
+        (export_csv if args.format == "csv" else export_ndjson)(views, sys.stdout)
+    finally:
+        for history in histories.values():
+            history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
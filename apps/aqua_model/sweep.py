@@ -0,0 +1,226 @@
+"""Parallel Monte Carlo and grid sweeps over the aquarium model.
+
+Scenarios are dicts of constant update_all() inputs. They are split into chunks, and each chunk is
+simulated in a worker process as one BatchAquariumModel, one tank per scenario. Workers only send
+back per-scenario statistics (final value, min/max, time out of the safe range), never histories.
+
+Usage:
+    python sweep.py --grid heater_power=0,5,10 --grid fish_load=1,2 --steps 1440
+    python sweep.py --random 10000 --range ambient_temp=20:30 --range fish_load=0:3 --workers 8
+"""
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from batch import BatchAquariumModel
+
+# The update_all() inputs a scenario can set, and their defaults (NaN stands for ambient_temp=None).
+INPUTS = {
+    "ambient_temp": np.nan,
+    "heater_power": 0.0,
+    "top_off_water": 0.0,
+    "salt_addition": 0.0,
+    "fish_load": 0.0,
+    "waste_level": 0.0,
+}
+
+# Safe ranges for a reef tank. Bacteria are in arbitrary units and have no safe range.
+SAFE_RANGES = {
+    "temperature": (24.0, 28.0),
+    "ph": (7.8, 8.5),
+    "salinity": (33.0, 36.0),
+    "ammonia": (0.0, 0.25),
+    "nitrate": (0.0, 20.0),
+}
+
+
+def grid(**values):
+    """Yields every combination of the given input values, e.g. grid(heater_power=[0, 5], fish_load=[1, 2])."""
+    names = list(values)
+    for combination in itertools.product(*(values[name] for name in names)):
+        yield dict(zip(names, combination))
+
+
+def random_scenarios(count, seed=None, **distributions):
+    """Yields count scenarios drawn from distributions.
+
+    A distribution is a (low, high) tuple for a uniform draw, a list to choose from, a callable
+    taking a numpy Generator, or a constant.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        scenario = {}
+        for name, distribution in distributions.items():
+            if isinstance(distribution, tuple):
+                scenario[name] = float(rng.uniform(*distribution))
+            elif isinstance(distribution, list):
+                scenario[name] = distribution[rng.integers(len(distribution))]
+            elif callable(distribution):
+                scenario[name] = distribution(rng)
+            else:
+                scenario[name] = distribution
+        yield scenario
+
+
+def run_chunk(start, scenarios, steps, dt=60.0, safe_ranges=None):
+    """Simulates a chunk of scenarios and returns one statistics dict per scenario.
+
+    Runs in the worker processes, so it only takes and returns plain, picklable values.
+    """
+    safe_ranges = SAFE_RANGES if safe_ranges is None else safe_ranges
+    unknown = {name for scenario in scenarios for name in scenario} - set(INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(sorted(unknown))}")
+
+    model = BatchAquariumModel(len(scenarios))
+    inputs = {}
+    for name, default in INPUTS.items():
+        values = [scenario.get(name, default) for scenario in scenarios]
+        inputs[name] = np.array([default if value is None else value for value in values], dtype=np.float64)
+
+    values = model.get_all_parameters()
+    minimum = {name: array.copy() for name, array in values.items()}
+    maximum = {name: array.copy() for name, array in values.items()}
+    out_of_range = {name: np.zeros(len(scenarios), dtype=np.int64) for name in safe_ranges}
+
+    for _ in range(steps):
+        model.update_all(**inputs)
+        for name, array in values.items():
+            np.minimum(minimum[name], array, out=minimum[name])
+            np.maximum(maximum[name], array, out=maximum[name])
+        for name, (low, high) in safe_ranges.items():
+            out_of_range[name] += (values[name] < low) | (values[name] > high)
+
+    return [{
+        "index": start + i,
+        "inputs": scenario,
+        "final": {name: float(array[i]) for name, array in values.items()},
+        "min": {name: float(array[i]) for name, array in minimum.items()},
+        "max": {name: float(array[i]) for name, array in maximum.items()},
+        "time_out_of_range": {name: float(count[i] * dt) for name, count in out_of_range.items()},
+    } for i, scenario in enumerate(scenarios)]
+
+
+def _chunks(scenarios, chunk_size):
+    iterator = iter(scenarios)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def iter_sweep(scenarios, steps, dt=60.0, workers=None, chunk_size=256, safe_ranges=None):
+    """Runs the scenarios across a process pool and yields each scenario's statistics as its chunk finishes.
+
+    Results arrive in completion order; each carries the scenario's index in the input. Scenarios
+    are consumed lazily, with at most two chunks per worker queued, so a generator of millions of
+    scenarios is never held in memory. workers=0 runs everything in this process.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    chunks = _chunks(scenarios, chunk_size)
+
+    if workers == 0:
+        for start, chunk in chunks:
+            yield from run_chunk(start, chunk, steps, dt, safe_ranges)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for start, chunk in itertools.islice(chunks, workers * 2):
+            pending.add(executor.submit(run_chunk, start, chunk, steps, dt, safe_ranges))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for start, chunk in itertools.islice(chunks, 1):
+                    pending.add(executor.submit(run_chunk, start, chunk, steps, dt, safe_ranges))
+                yield from future.result()
+
+
+class Summary:
+    """Aggregates per-scenario statistics into per-parameter statistics, one result at a time."""
+
+    def __init__(self):
+        self.scenarios = 0
+        self.final = {}
+        self.out_of_range = {}
+
+    def add(self, result):
+        self.scenarios += 1
+        for name, value in result["final"].items():
+            stats = self.final.setdefault(name, {"min": value, "max": value, "total": 0.0})
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            stats["total"] += value
+        for name, seconds in result["time_out_of_range"].items():
+            stats = self.out_of_range.setdefault(name, {"scenarios": 0, "max": 0.0})
+            stats["scenarios"] += seconds > 0
+            stats["max"] = max(stats["max"], seconds)
+
+    def as_dict(self):
+        final = {name: {"min": stats["min"], "max": stats["max"], "mean": stats["total"] / self.scenarios}
+                 for name, stats in self.final.items()}
+        return {"scenarios": self.scenarios, "final": final, "time_out_of_range": self.out_of_range}
+
+
+def summarize(results):
+    """Aggregates an iterable of per-scenario statistics."""
+    summary = Summary()
+    for result in results:
+        summary.add(result)
+    return summary.as_dict()
+
+
+def _parse_assignments(assignments, parse):
+    parsed = {}
+    for assignment in assignments or ():
+        name, _, value = assignment.partition("=")
+        if name not in INPUTS or not value:
+            raise SystemExit(f"Invalid input '{assignment}'. Inputs are: {', '.join(INPUTS)}")
+        parsed[name] = parse(value)
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep aquarium model inputs across a process pool.")
+    parser.add_argument("--grid", action="append", help="Grid values, e.g. --grid heater_power=0,5,10")
+    parser.add_argument("--random", type=int, help="Number of random scenarios to draw from the --range inputs")
+    parser.add_argument("--range", action="append", help="Uniform range for --random, e.g. --range ambient_temp=20:30")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument("--steps", type=int, default=1440, help="Steps per scenario. Default is 1440")
+    parser.add_argument("--dt", type=float, default=60.0, help="Seconds per step. Default is 60")
+    parser.add_argument("--workers", type=int, help="Worker processes. Default is the CPU count, 0 runs in process")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Scenarios per work unit. Default is 256")
+    parser.add_argument("--summary-only", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    if args.random:
+        ranges = _parse_assignments(args.range, lambda value: tuple(float(v) for v in value.split(":", 1)))
+        scenarios = random_scenarios(args.random, args.seed, **ranges)
+    else:
+        values = _parse_assignments(args.grid, lambda value: [float(v) for v in value.split(",")])
+        scenarios = grid(**values)
+
+    summary = Summary()
+    for result in iter_sweep(scenarios, args.steps, args.dt, args.workers, args.chunk_size):
+        if not args.summary_only:
+            print(json.dumps(result))
+        summary.add(result)
+
+    print(json.dumps({"summary": summary.as_dict()}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+import datetime
+import json
+import os
+import platform
+import sys
+
+import pytest
+
+# Make the app modules importable from the tests directory.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Benchmarks only run when selected, e.g. pytest -m benchmark. Their results are written as JSON to
+# --bench-output (or $AQUA_BENCHMARK_OUTPUT), and printed at the end of the run.
+BENCHMARK_OUTPUT_ENV = 'AQUA_BENCHMARK_OUTPUT'
+
+_results = []
+
+
+def pytest_addoption(parser):
+    parser.addoption('--bench-output', help='Write aqua_model benchmark results to this JSON file')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: aqua_model performance benchmark, run with -m benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    if 'benchmark' in (config.getoption('markexpr', '') or ''):
+        return
+    skip = pytest.mark.skip(reason='benchmark, run with -m benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark_result(request):
+    """Records a benchmark's metrics: benchmark_result(steps_per_second=..., ...)."""
+    def record(**metrics):
+        _results.append({'name': request.node.name, **metrics})
+    return record
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+
+    report = {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'results': _results,
+    }
+    output = config.getoption('--bench-output', None) or os.environ.get(BENCHMARK_OUTPUT_ENV)
+    if output:
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    terminalreporter.section('aqua_model benchmarks')
+    terminalreporter.write_line(json.dumps(report, indent=2))
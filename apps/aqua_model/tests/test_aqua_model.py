@@ -1,3 +1,6 @@
+from app import AquariumModel, Ammonia, Bacteria, Nitrate, Salinity, Temperature, pH
+
+
 def test_parameter_creation():
     temp = Temperature(26.0)
     assert temp.value == 26.0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app import AquariumModel
+from batch import BatchAquariumModel
+
+
+def _scalar_inputs(inputs, index):
+    return {name: (value[index] if isinstance(value, np.ndarray) else value) for name, value in inputs.items()}
+
+
+def test_batch_matches_scalar_models():
+    rng = np.random.default_rng(7)
+    tanks = 12
+    batch = BatchAquariumModel(tanks)
+    models = [AquariumModel() for _ in range(tanks)]
+
+    for step in range(60):
+        inputs = {
+            # Some tanks get no ambient temperature (None in the scalar model, NaN in the batch).
+            "ambient_temp": np.where(rng.random(tanks) < 0.2, np.nan, rng.uniform(20, 32, tanks)),
+            "heater_power": rng.integers(0, 5, tanks).astype(float),
+            "top_off_water": rng.integers(0, 3, tanks).astype(float),
+            "salt_addition": rng.integers(0, 3, tanks).astype(float),
+            "fish_load": rng.integers(0, 4, tanks).astype(float),
+            "waste_level": 1 if step % 3 else 0,
+        }
+        batch.update_all(**inputs)
+
+        for index, model in enumerate(models):
+            scalar_inputs = _scalar_inputs(inputs, index)
+            if np.isnan(scalar_inputs["ambient_temp"]):
+                scalar_inputs["ambient_temp"] = None
+            model.update_all(**scalar_inputs)
+
+    for index, model in enumerate(models):
+        for name, parameter in model.get_all_parameters().items():
+            assert batch.get_parameter(name)[index] == parameter.value
+
+
+def test_batch_defaults_and_initial_values():
+    batch = BatchAquariumModel(3, ph=np.array([7.5, 8.0, 8.5]))
+    assert len(batch) == 3
+    assert batch.tank(0)["temperature"] == AquariumModel().get_parameter("temperature").value
+    assert batch.tank(2)["ph"] == 8.5
+
+
+def test_batch_rejects_bad_input():
+    with pytest.raises(ValueError):
+        BatchAquariumModel(0)
+    with pytest.raises(ValueError):
+        BatchAquariumModel(2, alkalinity=8)
+    with pytest.raises(ValueError):
+        BatchAquariumModel(2).update_all(ambient_temp=[25, 26, 27])
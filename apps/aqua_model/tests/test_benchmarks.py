@@ -0,0 +1,94 @@
+"""Performance benchmarks for the aquarium model. Run with: pytest -m benchmark [--bench-output results.json]"""
+
+import itertools
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app import AquariumModel, History, Parameter, SimulationClock
+from batch import BatchAquariumModel
+
+pytestmark = pytest.mark.benchmark
+
+STEPS = 20000
+HISTORY_UPDATES = 1000000
+BATCH_TANKS = 200
+BATCH_STEPS = 200
+
+
+def _timed(function):
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+@pytest.mark.parametrize("inputs, skip_settled", [("changing", True), ("constant", True), ("constant", False)])
+def test_update_all_steps_per_second(benchmark_result, inputs, skip_settled):
+    model = AquariumModel(clock=SimulationClock(), skip_settled=skip_settled)
+    if inputs == "changing":
+        # Every parameter changes on every step.
+        series = {"ambient_temp": itertools.cycle([24.0, 25.0, 26.0]), "top_off_water": 1, "fish_load": 1, "waste_level": 1}
+    else:
+        # Parameters settle, and update_all() skips them unless skip_settled is off.
+        series = {"ambient_temp": 25.0}
+
+    elapsed, steps = _timed(lambda: model.run(steps=STEPS, inputs=series))
+    benchmark_result(steps=steps, seconds=elapsed, steps_per_second=steps / elapsed,
+                     history_samples=sum(len(p.history) for p in model.get_all_parameters().values()))
+    assert steps == STEPS
+
+
+@pytest.mark.parametrize("capacity", [None, 1024])
+def test_history_memory_per_million_updates(benchmark_result, capacity):
+    parameter = Parameter(0.0, history=History(capacity), clock=SimulationClock(step=1))
+    clock, update = parameter.clock, parameter.update
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for value in range(HISTORY_UPDATES):
+        clock.advance()
+        update(float(value))
+    elapsed = time.perf_counter() - started
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    growth = (after - before) * 1000000 / HISTORY_UPDATES
+    benchmark_result(capacity=capacity, updates=HISTORY_UPDATES, bytes_per_million_updates=growth,
+                     bytes_per_update=growth / 1000000, peak_bytes=peak - before, updates_per_second=HISTORY_UPDATES / elapsed)
+    # Two float64 arrays, plus their over-allocation while they grow.
+    assert growth / 1000000 < (32 if capacity is None else 1)
+
+
+def test_scalar_vs_batch(benchmark_result):
+    rng = np.random.default_rng(1)
+    ambient = rng.uniform(20, 30, (BATCH_STEPS, BATCH_TANKS))
+    fish_load = rng.integers(0, 3, (BATCH_STEPS, BATCH_TANKS)).astype(float)
+
+    def scalar():
+        models = [AquariumModel(clock=SimulationClock()) for _ in range(BATCH_TANKS)]
+        for step in range(BATCH_STEPS):
+            for tank, model in enumerate(models):
+                model.update_all(ambient_temp=ambient[step, tank], fish_load=fish_load[step, tank], waste_level=1)
+        return models
+
+    def batch():
+        model = BatchAquariumModel(BATCH_TANKS)
+        for step in range(BATCH_STEPS):
+            model.update_all(ambient_temp=ambient[step], fish_load=fish_load[step], waste_level=1)
+        return model
+
+    scalar_seconds, models = _timed(scalar)
+    batch_seconds, model = _timed(batch)
+
+    tank_steps = BATCH_TANKS * BATCH_STEPS
+    benchmark_result(tanks=BATCH_TANKS, steps=BATCH_STEPS,
+                     scalar_tank_steps_per_second=tank_steps / scalar_seconds,
+                     batch_tank_steps_per_second=tank_steps / batch_seconds,
+                     speedup=scalar_seconds / batch_seconds)
+
+    for tank in (0, BATCH_TANKS - 1):
+        assert model.tank(tank) == {name: p.value for name, p in models[tank].get_all_parameters().items()}
+    assert batch_seconds < scalar_seconds
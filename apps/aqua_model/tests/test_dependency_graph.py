@@ -0,0 +1,151 @@
+from graphlib import CycleError
+
+import pytest
+
+from app import AquariumModel, Parameter, SimulationClock
+
+
+class Alkalinity(Parameter):
+    """Alkalinity in dKH, consumed as pH is buffered."""
+
+    depends_on = ("ph",)
+    inputs = ("buffer_dose",)
+
+    def __init__(self, initial_value=8.0, **kwargs):
+        super().__init__(initial_value, name="Alkalinity", unit="dKH", **kwargs)
+        self.calls = 0
+
+    def calculate(self, ph_level=8.2, buffer_dose=0):
+        self.calls += 1
+        self.update(max(0, self.value + buffer_dose * 0.1 - (8.2 - ph_level) * 0.05))
+        return self.value
+
+    def recalculate(self, upstream, **inputs):
+        return self.calculate(ph_level=upstream["ph"].value, **inputs)
+
+
+def test_order_follows_dependencies():
+    model = AquariumModel()
+    model.add_parameter("alkalinity", Alkalinity())
+    order = model._order
+    for key, parameter in model.get_all_parameters().items():
+        for dependency in parameter.depends_on:
+            assert order.index(dependency) < order.index(key)
+
+
+def _histories(model):
+    return {key: list(parameter.history.values()) for key, parameter in model.get_all_parameters().items()}
+
+
+def test_settled_parameters_are_skipped():
+    model = AquariumModel()
+    alkalinity = Alkalinity()
+    model.add_parameter("alkalinity", alkalinity)
+    reference = AquariumModel(skip_settled=False)
+    reference.add_parameter("alkalinity", Alkalinity())
+    for _ in range(5):
+        model.update_all(ambient_temp=25)
+        reference.update_all(ambient_temp=25)
+
+    # Alkalinity settles after its first calculation, but still records a sample per update.
+    assert alkalinity.calls == 1
+    assert _histories(model) == _histories(reference)
+    assert len(model.get_parameter("temperature").history) == 6
+
+
+def test_changes_make_the_subgraph_dirty():
+    model = AquariumModel()
+    alkalinity = Alkalinity()
+    model.add_parameter("alkalinity", alkalinity)
+    model.update_all()
+    model.update_all()
+    calls = alkalinity.calls
+
+    # A direct update to pH makes pH and alkalinity dirty.
+    model.get_parameter("ph").update(7.9)
+    model.update_all()
+    assert alkalinity.calls == calls + 1
+
+    # So does a new input.
+    model.update_all(buffer_dose=1)
+    assert alkalinity.calls == calls + 2
+
+
+def test_upstream_changes_mark_dependents_dirty():
+    model = AquariumModel()
+    alkalinity = Alkalinity()
+    model.add_parameter("alkalinity", alkalinity)
+    model.update_all()
+    model.update_all()
+    assert alkalinity.calls == 1
+
+    # Alkalinity's own inputs are unchanged, but a new temperature changes pH, which marks it dirty.
+    model.update_all(ambient_temp=30)
+    assert alkalinity.calls == 2
+
+
+def test_unknown_inputs_are_rejected():
+    model = AquariumModel()
+    with pytest.raises(TypeError, match="fish_lod"):
+        model.update_all(fish_lod=3)
+    model.add_parameter("alkalinity", Alkalinity())
+    model.update_all(buffer_dose=1)
+
+
+def _full_update_all(p, ambient_temp=None, heater_power=0, top_off_water=0, salt_addition=0, fish_load=0, waste_level=0):
+    # The hard-coded evaluation that update_all() used before the dependency graph.
+    p["temperature"].calculate(ambient_temp=ambient_temp, heater_power=heater_power)
+    p["ph"].calculate(temperature=p["temperature"])
+    p["salinity"].calculate(top_off_water=top_off_water, salt_addition=salt_addition)
+    p["bacteria"].calculate(waste_level=waste_level)
+    p["ammonia"].calculate(fish_load=fish_load, bacteria_level=p["bacteria"].value)
+    p["nitrate"].calculate(ammonia=p["ammonia"], bacteria_level=p["bacteria"].value)
+
+
+def test_skipping_gives_the_same_values():
+    inputs = [dict(ambient_temp=26), dict(), dict(), dict(ambient_temp=26, fish_load=1), dict(waste_level=1), dict()] * 5
+    clock = SimulationClock(0)
+    models = [AquariumModel(clock=clock), AquariumModel(clock=clock, skip_settled=False)]
+    reference = AquariumModel(clock=clock)
+    for step in inputs:
+        clock.advance()
+        for model in models:
+            model.update_all(**step)
+        _full_update_all(reference.get_all_parameters(), **step)
+    for model in models:
+        assert _histories(model) == _histories(reference)
+        assert [list(p.history.timestamps()) for p in model.get_all_parameters().values()] == \
+            [list(p.history.timestamps()) for p in reference.get_all_parameters().values()]
+
+
+def test_invalid_graphs():
+    model = AquariumModel()
+    loop = Alkalinity()
+    loop.depends_on = ("alkalinity",)
+    with pytest.raises(CycleError):
+        model.add_parameter("alkalinity", loop)
+
+    orphan = Alkalinity()
+    orphan.depends_on = ("calcium",)
+    with pytest.raises(ValueError):
+        AquariumModel().add_parameter("alkalinity", orphan)
+
+
+def test_rejected_parameters_are_not_added():
+    model = AquariumModel()
+    order = model._order
+    loop = Alkalinity()
+    loop.depends_on = ("alkalinity",)
+    with pytest.raises(CycleError):
+        model.add_parameter("alkalinity", loop)
+    assert "alkalinity" not in model.parameters
+    assert model._order == order
+
+    # A rejected replacement leaves the previous parameter in place.
+    orphan = Alkalinity()
+    orphan.depends_on = ("calcium",)
+    ph = model.get_parameter("ph")
+    with pytest.raises(ValueError):
+        model.add_parameter("ph", orphan)
+    assert model.get_parameter("ph") is ph
+    model.update_all()
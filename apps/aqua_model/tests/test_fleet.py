@@ -0,0 +1,45 @@
+import pytest
+
+from app import AquariumModel, History, SimulationClock, Temperature
+from fleet import Fleet
+
+
+def test_parameters_models_and_histories_have_no_instance_dict():
+    model = AquariumModel()
+    for obj in (model, model.get_parameter("ph"), model.get_parameter("ph").history, History()):
+        assert not hasattr(obj, "__dict__")
+    with pytest.raises(AttributeError):
+        Temperature().colour = "blue"
+
+
+def test_models_share_their_evaluation_order():
+    assert AquariumModel()._order is AquariumModel()._order
+
+
+def test_fleet_registers_and_looks_up_tanks():
+    clock = SimulationClock()
+    fleet = Fleet(history_capacity=4, clock=clock)
+    reef = fleet.add("reef")
+    assert fleet["reef"] is reef and fleet.setdefault("reef") is reef
+    assert fleet.setdefault("nano") is fleet.get("nano")
+    assert reef.clock is clock and reef.get_parameter("ph").history.capacity == 4
+    assert len(fleet) == 2 and list(fleet) == ["reef", "nano"] and "lagoon" not in fleet
+
+    with pytest.raises(ValueError):
+        fleet.add("reef")
+
+    assert fleet.remove("nano") is not None
+    assert fleet.get("nano") is None
+
+
+def test_fleet_update_all_with_shared_and_per_tank_inputs():
+    fleet = Fleet(clock=SimulationClock())
+    for tank in range(3):
+        fleet.add(tank)
+
+    fleet.update_all({1: {"ambient_temp": 22}}, ambient_temp=27)
+    assert fleet.values("temperature") == {0: 27, 1: 22, 2: 27}
+
+    clock = SimulationClock(step=1)
+    fleet.set_clock(clock)
+    assert all(model.get_parameter("ph").clock is clock for _, model in fleet.items())
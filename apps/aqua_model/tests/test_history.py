@@ -0,0 +1,67 @@
+import datetime
+import tracemalloc
+
+import pytest
+
+from app import AquariumModel, History, Temperature
+
+
+def test_history_reads_like_a_list_of_tuples():
+    temp = Temperature(25.0)
+    temp.calculate(ambient_temp=26, heater_power=1)
+    assert len(temp.history) == 2
+    timestamp, value = temp.history[-1]
+    assert isinstance(timestamp, datetime.datetime)
+    assert value == 26.1
+    assert [v for _, v in temp.history] == [25.0, 26.1]
+    assert temp.history[:1] == [temp.history[0]]
+
+
+def test_ring_buffer_keeps_the_newest_samples():
+    history = History(capacity=3)
+    for i in range(7):
+        history.append(float(i), i * 10)
+    assert len(history) == 3
+    assert list(history.values()) == [40.0, 50.0, 60.0]
+    assert list(history.timestamps()) == [4.0, 5.0, 6.0]
+    assert history.value(-1) == 60.0 and history.timestamp(0) == 4.0
+    with pytest.raises(IndexError):
+        history[3]
+    history.clear()
+    assert len(history) == 0
+
+
+def test_model_history_capacity():
+    model = AquariumModel(history_capacity=5)
+    for _ in range(20):
+        model.update_all(ambient_temp=26, top_off_water=1, waste_level=1, fish_load=1)
+    assert all(len(p.history) == 5 for p in model.get_all_parameters().values())
+
+
+def test_history_from_existing_samples():
+    now = datetime.datetime.now()
+    temp = Temperature(25.0, history=[(now, 24.0)])
+    assert [v for _, v in temp.history] == [24.0, 25.0]
+    assert temp.history[0][0] == now
+
+
+def _traced(function):
+    tracemalloc.start()
+    kept = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, size
+
+
+def test_history_is_an_order_of_magnitude_smaller():
+    samples = 100_000
+    _, list_size = _traced(lambda: [(datetime.datetime.now(), float(i)) for i in range(samples)])
+
+    def fill():
+        history = History()
+        for i in range(samples):
+            history.append(float(i), float(i))
+        return history
+
+    _, history_size = _traced(fill)
+    assert list_size / history_size >= 5
@@ -0,0 +1,86 @@
+import datetime
+
+import pytest
+
+from app import AquariumModel, History, SimulationClock, WindowAggregator
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def _history(samples, capacity=None):
+    history = History(capacity)
+    base = START.timestamp()
+    for minute, value in samples:
+        history.append(base + minute * 60, value)
+    return history
+
+
+def test_range_is_half_open_and_binary_searched():
+    history = _history([(m, float(m)) for m in range(10)])
+    view = history.range(START + datetime.timedelta(minutes=2), START + datetime.timedelta(minutes=5))
+    assert list(view.values()) == [2.0, 3.0, 4.0]
+    assert len(view) == 3 and view[-1][1] == 4.0
+    assert len(history.range()) == 10
+    assert len(history.range(start=START + datetime.timedelta(hours=1))) == 0
+    assert history.position(START.timestamp() + 120, after=True) == 3
+
+
+def test_range_over_a_wrapped_ring_buffer():
+    history = _history([(m, float(m)) for m in range(10)], capacity=4)
+    assert list(history.range(START + datetime.timedelta(minutes=7)).values()) == [7.0, 8.0, 9.0]
+    assert list(history.range(end=START + datetime.timedelta(minutes=8)).values()) == [6.0, 7.0]
+
+
+def test_views_keep_their_samples_or_raise():
+    history = _history([(m, float(m)) for m in range(3)], capacity=4)
+    view = history.range(START + datetime.timedelta(minutes=1))
+    history.append(START.timestamp() + 180, 3.0)
+    # The buffer is full now; the view still reads minutes 1 and 2.
+    assert list(view.values()) == [1.0, 2.0]
+    history.append(START.timestamp() + 240, 4.0)
+    assert view[-1][1] == 2.0
+    history.append(START.timestamp() + 300, 5.0)
+    # Minute 1 has been overwritten.
+    with pytest.raises(RuntimeError):
+        list(view.values())
+    with pytest.raises(RuntimeError):
+        view[0]
+
+    unlimited = _history([(m, float(m)) for m in range(3)])
+    view = unlimited.range()
+    unlimited.clear()
+    with pytest.raises(RuntimeError):
+        list(view)
+
+
+def test_aggregate_windows():
+    history = _history([(0, 1.0), (1, 3.0), (4, 2.0), (5, 10.0), (6, 4.0), (16, 7.0)])
+    windows = list(history.aggregate(datetime.timedelta(minutes=5)))
+    assert [(w["start"], w["count"], w["min"], w["max"], w["mean"], w["last"]) for w in windows] == [
+        (START, 3, 1.0, 3.0, 2.0, 2.0),
+        (START + datetime.timedelta(minutes=5), 2, 4.0, 10.0, 7.0, 4.0),
+        (START + datetime.timedelta(minutes=15), 1, 7.0, 7.0, 7.0, 7.0),
+    ]
+    assert [w["count"] for w in history.aggregate(300, start=START + datetime.timedelta(minutes=1))] == [2, 2, 1]
+
+
+def test_window_aggregator_is_incremental():
+    aggregator = WindowAggregator(60)
+    assert aggregator.add(0, 1.0) is None
+    assert aggregator.add(30, 2.0) is None
+    assert aggregator.add(61, 5.0)["mean"] == 1.5
+    assert aggregator.flush()["last"] == 5.0
+    assert aggregator.flush() is None
+    with pytest.raises(ValueError):
+        WindowAggregator(0)
+
+
+def test_parameter_queries_on_a_simulated_day():
+    model = AquariumModel(clock=SimulationClock(start=START))
+    model.run(steps=24 * 60, dt=60, inputs={"ambient_temp": (20 + (step % 100) / 10 for step in range(24 * 60))})
+    temperature = model.get_parameter("temperature")
+    hour = (START + datetime.timedelta(hours=22), START + datetime.timedelta(hours=23))
+    assert len(temperature.history_range(*hour)) == 60
+    five_minutes = temperature.downsample(datetime.timedelta(minutes=5), *hour)
+    assert len(five_minutes) == 12
+    assert all(w["min"] <= w["mean"] <= w["max"] for w in five_minutes)
@@ -0,0 +1,176 @@
+import asyncio
+import datetime
+import io
+import json
+import os
+
+import pytest
+
+from app import AquariumModel, SimulationClock
+from ingest import IngestPipeline
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def _line(tank, parameter, value, minute=None):
+    reading = {"tank": tank, "parameter": parameter, "value": value}
+    if minute is not None:
+        reading["ts"] = (START + datetime.timedelta(minutes=minute)).isoformat()
+    return json.dumps(reading)
+
+
+def _run(pipeline, lines):
+    async def ingest():
+        async with pipeline:
+            await pipeline.feed(lines)
+    asyncio.run(ingest())
+    return pipeline
+
+
+def test_readings_are_validated_and_applied_per_tank():
+    factory = lambda: AquariumModel(clock=SimulationClock(START - datetime.timedelta(minutes=1)))
+    pipeline = _run(IngestPipeline(factory, update_interval=None), [
+        _line("a", "ph", 8.1, minute=0),
+        _line("a", "ph", 8.2, minute=1),
+        _line("b", "salinity", 34.5),
+        _line("a", "ambient_temp", 27),
+        _line("a", "ph", 99),
+        _line("a", "ph", 8.0, minute=0),
+        _line("a", "oxygen", 7),
+        '{"tank": "a", "parameter": "ph"',
+        json.dumps({"parameter": "ph", "value": 8}),
+    ])
+
+    ph = pipeline.models["a"].get_parameter("ph")
+    assert ph.value == 8.2
+    assert ph.history[-1] == (START + datetime.timedelta(minutes=1), 8.2)
+    assert pipeline.models["b"].get_parameter("salinity").value == 34.5
+    assert pipeline.inputs["a"] == {"ambient_temp": 27.0}
+
+    stats = pipeline.stats()
+    assert (stats["received"], stats["accepted"], stats["applied"]) == (9, 5, 4)
+    assert stats["rejected"] == {"out of range": 1, "out of order": 1, "unknown parameter": 1,
+                                 "invalid json": 1, "missing tank": 1}
+
+
+def test_update_all_uses_each_tanks_latest_inputs():
+    pipeline = _run(IngestPipeline(update_interval=None), [_line("a", "ambient_temp", 26), _line("b", "ph", 8.0)])
+    pipeline.tick()
+    assert pipeline.models["a"].get_parameter("temperature").value == 26
+    assert pipeline.models["b"].get_parameter("temperature").value == 25
+    assert pipeline.stats()["updates"] == 1
+
+
+def test_stop_runs_a_last_update_round():
+    clock = SimulationClock(START)
+    pipeline = _run(IngestPipeline(lambda: AquariumModel(clock=clock), update_interval=60),
+                    [_line("a", "ambient_temp", 22)])
+    assert pipeline.models["a"].get_parameter("temperature").value == 22
+    assert pipeline.stats()["updates"] == 1
+
+
+def test_a_full_queue_pushes_back_on_sources():
+    lines = [_line(i % 10, "ph", 8.0) for i in range(500)]
+    pipeline = _run(IngestPipeline(queue_size=8, batch_size=64, update_interval=None), lines)
+    stats = pipeline.stats()
+    assert stats["applied"] == 500 and len(pipeline.models) == 10
+    assert stats["queue_peak"] <= 8 and stats["blocked"] > 0
+    assert stats["batches"] >= 500 / 8
+
+
+def test_file_and_tcp_sources():
+    async def ingest(pipeline):
+        async with pipeline:
+            await pipeline.read_file(io.BytesIO((_line("file", "ph", 8.3) + "\n").encode()))
+            server = await pipeline.serve_tcp("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(("\n".join(_line("tcp", "nitrate", n) for n in range(5)) + "\n").encode())
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+            while pipeline.metrics.accepted < 6:
+                await asyncio.sleep(0.01)
+            server.close()
+            await server.wait_closed()
+
+    pipeline = IngestPipeline(update_interval=None)
+    asyncio.run(ingest(pipeline))
+    assert pipeline.models["file"].get_parameter("ph").value == 8.3
+    assert pipeline.models["tcp"].get_parameter("nitrate").value == 4
+
+
+class _FailingModel(AquariumModel):
+    __slots__ = ()
+
+    def update_all(self, **inputs):
+        raise ZeroDivisionError("model failure")
+
+
+def test_a_failing_consumer_cancels_waiting_sources():
+    async def ingest():
+        pipeline = IngestPipeline(_FailingModel, queue_size=4, batch_size=2, update_interval=0.001)
+        source = None
+        try:
+            async with pipeline:
+                source = asyncio.create_task(pipeline.feed([_line(i % 3, "ph", 8.0) for i in range(1000)]))
+                # The source blocks on the full queue once the consumer fails.
+                await asyncio.wait_for(asyncio.gather(source, return_exceptions=True), 5)
+        finally:
+            assert source is not None and source.cancelled()
+        return pipeline
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(ingest())
+
+
+def test_readings_queued_with_the_stop_are_applied():
+    async def ingest():
+        pipeline = IngestPipeline(update_interval=None)
+        # The source runs first once the test waits, queueing its readings behind the stop.
+        source = asyncio.create_task(pipeline.feed([_line("a", "nitrate", n) for n in (2, 3)]))
+        await pipeline.start()
+        await pipeline.put(_line("a", "nitrate", 1))
+        await pipeline.stop()
+        await source
+        return pipeline
+
+    pipeline = asyncio.run(ingest())
+    assert pipeline.models["a"].get_parameter("nitrate").value == 3
+    assert pipeline.stats()["applied"] == 3
+
+
+def test_future_readings_move_a_simulation_clock_and_are_rejected_on_the_wall_clock():
+    clock = SimulationClock(START)
+    pipeline = _run(IngestPipeline(lambda: AquariumModel(clock=clock), update_interval=None),
+                    [_line("a", "ph", 8.1, minute=60)])
+    pipeline.tick()
+    history = pipeline.models["a"].get_parameter("ph").history
+    timestamps = list(history.timestamps())
+    assert timestamps == sorted(timestamps) and timestamps[-1] == timestamps[-2]
+    assert clock.now() == (START + datetime.timedelta(minutes=60)).timestamp()
+
+    future = datetime.datetime.now() + datetime.timedelta(hours=1)
+    pipeline = _run(IngestPipeline(update_interval=None), [
+        json.dumps({"tank": "a", "parameter": "ph", "value": 8.1, "ts": future.isoformat()}),
+    ])
+    assert pipeline.stats()["rejected"] == {"in the future": 1}
+
+
+def test_pipe_readings_are_applied_before_the_pipe_closes():
+    async def ingest(pipeline, reader, writer):
+        async with pipeline:
+            source = asyncio.create_task(pipeline.read_file(reader))
+            os.write(writer, (_line("a", "ph", 8.3) + "\n").encode())
+            for _ in range(200):
+                if pipeline.metrics.applied:
+                    break
+                await asyncio.sleep(0.01)
+            applied = pipeline.metrics.applied
+            os.close(writer)
+            await source
+        return applied
+
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as reader:
+        assert asyncio.run(ingest(IngestPipeline(update_interval=None), reader, write_fd)) == 1
@@ -0,0 +1,66 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from app import AquariumModel, SimulationClock, Temperature
+
+
+def test_parameters_share_the_model_clock():
+    clock = SimulationClock(start=datetime.datetime(2024, 1, 1), step=300)
+    model = AquariumModel(clock=clock)
+    clock.advance()
+    model.update_all(ambient_temp=26)
+    timestamp, value = model.get_parameter("temperature").history[-1]
+    assert timestamp == datetime.datetime(2024, 1, 1, 0, 5)
+    assert value == 26.0
+
+
+def test_run_uses_simulated_timestamps_and_series():
+    start = datetime.datetime(2024, 1, 1)
+    model = AquariumModel(clock=SimulationClock(start=start))
+    steps = model.run(steps=3, dt=60, inputs={
+        "ambient_temp": np.array([24.0, 25.0, 26.0]),
+        "heater_power": (power for power in (1, 2, 3)),
+        "waste_level": 1,
+    })
+    assert steps == 3
+    history = model.get_parameter("temperature").history
+    assert [v for _, v in history] == [25.0, 24.1, 25.2, 26.3]
+    assert [t for t, _ in history][1:] == [start + datetime.timedelta(minutes=m) for m in (1, 2, 3)]
+
+
+def test_run_matches_update_all():
+    inputs = {"ambient_temp": [26, 27, 28, 27], "fish_load": [1, 0, 2, 1], "waste_level": 1}
+    stepped = AquariumModel()
+    for i in range(4):
+        stepped.update_all(ambient_temp=inputs["ambient_temp"][i], fish_load=inputs["fish_load"][i], waste_level=1)
+    ran = AquariumModel()
+    assert ran.run(inputs=inputs) == 4
+    assert {k: p.value for k, p in ran.get_all_parameters().items()} == {k: p.value for k, p in stepped.get_all_parameters().items()}
+    assert isinstance(ran.clock, SimulationClock)
+
+
+def test_run_takes_numpy_scalars_as_constants():
+    start = datetime.datetime(2024, 1, 1)
+    model = AquariumModel()
+    assert model.run(steps=2, inputs={"ambient_temp": np.float64(26.0), "waste_level": np.int64(1)},
+                     clock=SimulationClock(start=start)) == 2
+    history = model.get_parameter("temperature").history
+    assert [v for _, v in history] == [25.0, 26.0, 26.0]
+    assert history[-1][0] == start + datetime.timedelta(minutes=2)
+
+
+def test_run_input_errors():
+    with pytest.raises(ValueError):
+        AquariumModel().run(steps=5, inputs={"ambient_temp": [25, 26]})
+    with pytest.raises(ValueError):
+        AquariumModel().run(inputs={"waste_level": 1})
+    with pytest.raises(TypeError):
+        AquariumModel().run(steps=1, clock=datetime.datetime.now())
+
+
+def test_parameter_defaults_to_wall_clock():
+    before = datetime.datetime.now()
+    temp = Temperature()
+    assert before <= temp.history[0][0] <= datetime.datetime.now() + datetime.timedelta(seconds=1)
@@ -0,0 +1,122 @@
+import datetime
+import io
+import json
+import os
+import struct
+import sys
+
+import pytest
+
+from app import SimulationClock
+from storage import HEADER, MappedHistory, close_model, export_csv, export_ndjson, main, open_model
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def test_mapped_history_grows_and_reopens(tmp_path):
+    path = str(tmp_path / "ph.aqh")
+    history = MappedHistory(path, initial_slots=2)
+    for i in range(5):
+        history.append(1000.0 + i, float(i))
+    history.close()
+
+    with open(path, "rb") as file:
+        _, _, _, count, slots = HEADER.unpack(file.read(HEADER.size))
+    assert (count, slots) == (5, 8)
+
+    reopened = MappedHistory(path)
+    assert list(reopened.values()) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert list(reopened.timestamps()) == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+    assert list(reopened.range(1001, 1003).values()) == [1.0, 2.0]
+    reopened.close()
+
+
+def test_mapped_history_rejects_other_files(tmp_path):
+    path = tmp_path / "other.aqh"
+    path.write_bytes(struct.pack("<4sHHQQ8x", b"NOPE", 1, 0, 0, 1) + bytes(16))
+    with pytest.raises(ValueError):
+        MappedHistory(str(path))
+
+
+def test_mapped_history_rejects_truncated_files(tmp_path):
+    path = tmp_path / "short.aqh"
+    path.write_bytes(b"AQH1\x01")
+    with pytest.raises(ValueError, match="short.aqh"):
+        MappedHistory(str(path))
+
+    # A header listing more slots than the file holds.
+    path.write_bytes(HEADER.pack(b"AQH1", 1, 0, 0, 64) + bytes(16))
+    with pytest.raises(ValueError, match="short.aqh"):
+        MappedHistory(str(path), readonly=True)
+
+
+def test_readonly_histories_are_never_created_or_written(tmp_path):
+    path = str(tmp_path / "ph.aqh")
+    with pytest.raises(FileNotFoundError):
+        MappedHistory(path, readonly=True)
+    assert not os.path.exists(path)
+
+    history = MappedHistory(path)
+    history.append(1000.0, 8.0)
+    history.close()
+    os.chmod(path, 0o444)
+
+    reopened = MappedHistory(path, readonly=True)
+    assert list(reopened.values()) == [8.0]
+    with pytest.raises(io.UnsupportedOperation):
+        reopened.append(1001.0, 8.1)
+    reopened.close()
+
+
+def test_export_of_a_missing_parameter_fails(tmp_path, monkeypatch, capsys):
+    close_model(open_model(str(tmp_path)))
+    files = sorted(os.listdir(tmp_path))
+
+    monkeypatch.setattr(sys, "argv", ["storage.py", "export", str(tmp_path), "--parameter", "ph", "--parameter", "copper"])
+    with pytest.raises(SystemExit):
+        main()
+    assert "no such parameter: copper" in capsys.readouterr().err
+    assert sorted(os.listdir(tmp_path)) == files
+
+    model = open_model(str(tmp_path), readonly=True)
+    assert model.get_parameter("ph").history.readonly
+    close_model(model)
+
+
+def test_open_model_resumes_from_the_last_sample(tmp_path):
+    clock = SimulationClock(START, step=60)
+    model = open_model(str(tmp_path), clock=clock, initial_slots=4)
+    model.run(steps=10, inputs={"ambient_temp": [20 + i for i in range(10)], "top_off_water": 1})
+    temperature = model.get_parameter("temperature").value
+    samples = len(model.get_parameter("temperature").history)
+    close_model(model)
+
+    reopened = open_model(str(tmp_path))
+    assert reopened.get_parameter("temperature").value == temperature
+    assert len(reopened.get_parameter("temperature").history) == samples
+    assert reopened.get_parameter("temperature").history[-1][0] == START + datetime.timedelta(minutes=10)
+    close_model(reopened)
+
+
+def test_exports_stream_every_sample(tmp_path):
+    history = MappedHistory(str(tmp_path / "ph.aqh"))
+    for minute in range(3):
+        history.append(START.timestamp() + minute * 60, 8.0 + minute / 10)
+
+    csv = io.StringIO()
+    export_csv({"ph": history}, csv)
+    assert csv.getvalue().splitlines() == [
+        "parameter,timestamp,value",
+        "ph,2024-01-01T00:00:00,8.0",
+        "ph,2024-01-01T00:01:00,8.1",
+        "ph,2024-01-01T00:02:00,8.2",
+    ]
+
+    ndjson = io.StringIO()
+    export_ndjson({"ph": history.range(START + datetime.timedelta(minutes=1))}, ndjson)
+    rows = [json.loads(line) for line in ndjson.getvalue().splitlines()]
+    assert rows == [
+        {"parameter": "ph", "timestamp": "2024-01-01T00:01:00", "value": 8.1},
+        {"parameter": "ph", "timestamp": "2024-01-01T00:02:00", "value": 8.2},
+    ]
+    history.close()
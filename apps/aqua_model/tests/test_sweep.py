@@ -0,0 +1,42 @@
+import pytest
+
+from app import AquariumModel
+from sweep import SAFE_RANGES, grid, iter_sweep, random_scenarios, run_chunk, summarize
+
+
+def test_grid_and_random_scenarios():
+    assert list(grid(heater_power=[0, 5], fish_load=[1])) == [
+        {"heater_power": 0, "fish_load": 1}, {"heater_power": 5, "fish_load": 1}]
+    first = list(random_scenarios(5, seed=3, ambient_temp=(20, 30), fish_load=[0, 1], waste_level=1))
+    assert first == list(random_scenarios(5, seed=3, ambient_temp=(20, 30), fish_load=[0, 1], waste_level=1))
+    assert all(20 <= s["ambient_temp"] <= 30 and s["fish_load"] in (0, 1) for s in first)
+
+
+def test_chunk_statistics_match_the_scalar_model():
+    scenarios = list(grid(ambient_temp=[23, 27], fish_load=[0, 2], waste_level=[1]))
+    results = run_chunk(10, scenarios, steps=30, dt=60)
+    for result, scenario in zip(results, scenarios):
+        model = AquariumModel()
+        temperature = []
+        for _ in range(30):
+            model.update_all(**scenario)
+            temperature.append(model.get_parameter("temperature").value)
+        assert result["final"] == {k: p.value for k, p in model.get_all_parameters().items()}
+        low, high = SAFE_RANGES["temperature"]
+        assert result["time_out_of_range"]["temperature"] == 60 * sum(not low <= v <= high for v in temperature)
+    assert [r["index"] for r in results] == [10, 11, 12, 13]
+
+
+def test_process_pool_matches_in_process():
+    scenarios = list(random_scenarios(23, seed=1, ambient_temp=(20, 30), heater_power=(0, 10), fish_load=[0, 1, 2]))
+    pooled = sorted(iter_sweep(scenarios, steps=20, workers=2, chunk_size=4), key=lambda r: r["index"])
+    local = list(iter_sweep(iter(scenarios), steps=20, workers=0, chunk_size=5))
+    assert pooled == local
+    summary = summarize(local)
+    assert summary["scenarios"] == 23
+    assert summary["final"]["temperature"]["min"] <= summary["final"]["temperature"]["mean"] <= summary["final"]["temperature"]["max"]
+
+
+def test_unknown_inputs_are_rejected():
+    with pytest.raises(ValueError):
+        run_chunk(0, [{"calcium": 1}], steps=1)
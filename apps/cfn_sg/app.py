@@ -79,35 +79,97 @@
 
 import argparse
 import os
-import yaml
+import sys
 import json
 from collections import defaultdict
 
-# Yaml files dictionary file path and contents.
-yaml_files = {}
+from sg_rules import as_json, duplicate_as_json, find_duplicates, format_text, iter_duplicates
+from sg_cache import RuleCache
+from sg_files import expand_paths, has_magic, path_roots
+from sg_overlap import find_overlaps, format_overlaps, overlaps_as_json
+from sg_scan import scan
 
-# Read all files into the yaml_files dictionary.
-def read_files(path):
-    for file in os.listdir(path):
-        if file.endswith(".yaml") or file.endswith(".yml"):
-            with open(os.path.join(path, file), 'r') as stream:
-                try:
-                    yaml_files[file] = yaml.safe_load(stream)
-                except yaml.YAMLError as exc:
-                    print(exc)
+# Parse the files across a process pool, printing parse errors, and yield their rules.
+# Files unchanged since they were cached are not parsed again. Only the rules of a file are kept,
+# never its parsed document, so memory does not grow with the size of the templates.
+# When roots (the files and directories the paths were found under) are given, once every file has
+# been read the cache drops the entries under them of files this scan did not see, e.g. deleted or
+# renamed templates, so it does not grow without limit.
+def read_rules(paths, workers=None, cache=None, roots=None):
+    seen = []
+    for path, rules, error in scan(paths, workers, cache=cache):
+        if error:
+            print(error, file=sys.stderr)
+        seen.append(path)
+        yield from rules
+    if cache is not None and roots is not None:
+        cache.prune(seen, roots)
+
+# Write the duplicates in the requested output format.
+def write_duplicates(duplicates, output, stream=sys.stdout):
+    if output == "json":
+        json.dump(as_json(duplicates), stream, indent=2)
+        stream.write("\n")
+    elif output == "text":
+        for line in format_text(duplicates):
+            stream.write(line + "\n")
+
+# Write each duplicate as an NDJSON line as soon as it is found. Returns the number of duplicates.
+def stream_duplicates(rules, stream=sys.stdout):
+    count = 0
+    for original, rule in iter_duplicates(rules):
+        stream.write(json.dumps(duplicate_as_json(original, rule)) + "\n")
+        count += 1
+    return count
+
+# Write the overlapping and shadowed rules in the requested output format.
+def write_overlaps(overlaps, output, stream=sys.stdout):
+    if output == "json":
+        json.dump(overlaps_as_json(overlaps), stream, indent=2)
+        stream.write("\n")
+    elif output == "ndjson":
+        for overlap in overlaps_as_json(overlaps):
+            stream.write(json.dumps(overlap) + "\n")
+    elif output == "text":
+        for line in format_overlaps(overlaps):
+            stream.write(line + "\n")
 
 # Start of the script.
 if __name__ == "__main__":
     # Parse command line arguments.
     parser = argparse.ArgumentParser()
-    parser.add_argument("--path", help="Path to the yaml files")
-    parser.add_argument("--output", help="Output format: json|text", default="json")
+    parser.add_argument("--path", nargs="+", help="Yaml files, directories (searched recursively) or wildcards, e.g. 'templates/**/*.yaml'")
+    parser.add_argument("--output", help="Output format: json|ndjson|text|none. ndjson writes each duplicate as soon as it is found", choices=("json", "ndjson", "text", "none"), default="json")
+    parser.add_argument("--workers", type=int, help="Parser processes. Default is the CPU count, 0 parses in this process")
+    parser.add_argument("--cache", help="SQLite file caching the rules of each template between runs")
+    parser.add_argument("--mode", help="Report exact duplicates, or rules whose CIDRs and ports overlap or shadow others: duplicates|overlaps", choices=("duplicates", "overlaps"), default="duplicates")
     args = parser.parse_args()
 
     # Check if the path argument is provided.
     if not args.path:
         print("Error: The --path argument is required.")
         exit(1)
+
+    # Check that the files and directories exist. Wildcards may match nothing.
+    for path in args.path:
+        if not has_magic(path) and not os.path.exists(path):
+            print(f"Error: {path} does not exist.")
+            exit(1)
     
-    # Read all files into the yaml_files dictionary.
-    read_files(args.path)
+    # Parse the files in parallel as they are found, and find the duplicates (or overlaps) in their rules.
+    # The exit code is 1 when any are found.
+    cache = RuleCache(args.cache) if args.cache else None
+    try:
+        rules = read_rules(expand_paths(args.path), args.workers, cache, path_roots(args.path))
+        if args.mode == "overlaps":
+            findings = find_overlaps(list(rules))
+            write_overlaps(findings, args.output)
+        elif args.output == "ndjson":
+            findings = stream_duplicates(rules)
+        else:
+            findings = find_duplicates(rules)
+            write_duplicates(findings, args.output)
+    finally:
+        if cache:
+            cache.close()
+    exit(1 if findings else 0)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#
+# Parsing benchmark over a generated corpus of CloudFormation templates: serial SafeLoader (the
+# old read_files()), serial LibYAML loader, the process pool, and a re-run from the rule cache.
+#
+# Usage: python benchmarks/parse_corpus.py [--files 2000] [--groups 10] [--rules 20] [--workers 8]
+#   (run from apps/cfn_sg)
+#
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sg_cache import RuleCache
+from sg_loader import LIBYAML, load_file
+from sg_rules import extract_rules
+from sg_scan import scan
+
+
+# Write a template with groups security groups of rules inline rules each, plus one standalone rule per group.
+def template(index, groups, rules, rng):
+    resources = {}
+    for group in range(groups):
+        name = f"Group{index}x{group}"
+        resources[name] = {
+            "Type": "AWS::EC2::SecurityGroup",
+            "Properties": {
+                "GroupDescription": f"Generated group {group} of template {index}",
+                "SecurityGroupIngress": [{
+                    "IpProtocol": rng.choice(["tcp", "udp"]),
+                    "FromPort": port,
+                    "ToPort": port,
+                    "CidrIp": f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/24",
+                    "Description": f"Rule {rule}",
+                } for rule, port in enumerate(rng.sample(range(1, 65536), rules))],
+                "SecurityGroupEgress": [{"IpProtocol": "-1", "CidrIp": "0.0.0.0/0"}],
+                "Tags": [{"Key": "Team", "Value": f"team-{rng.randrange(50)}"}],
+            },
+        }
+        resources[f"{name}Https"] = {
+            "Type": "AWS::EC2::SecurityGroupIngress",
+            "Properties": {"GroupId": {"Ref": name}, "IpProtocol": "tcp", "FromPort": 443, "ToPort": 443, "CidrIp": "10.0.0.0/8"},
+        }
+    return {"AWSTemplateFormatVersion": "2010-09-09", "Description": f"Template {index}", "Resources": resources}
+
+
+def generate_corpus(directory, files, groups, rules, seed=1):
+    rng = random.Random(seed)
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"template-{index:05d}.yaml")
+        with open(path, "w") as stream:
+            yaml.safe_dump(template(index, groups, rules, rng), stream, sort_keys=False)
+        paths.append(path)
+    return paths
+
+
+def serial_safe_load(paths):
+    count = 0
+    for path in paths:
+        with open(path) as stream:
+            count += sum(1 for _ in extract_rules(path, yaml.safe_load(stream)))
+    return count
+
+
+def serial_libyaml(paths):
+    return sum(len(list(extract_rules(path, load_file(path)))) for path in paths)
+
+
+def process_pool(paths, workers):
+    return sum(len(rules) for _, rules, _ in scan(paths, workers))
+
+
+def cached(paths, workers, cache_path):
+    with RuleCache(cache_path) as cache:
+        return sum(len(rules) for _, rules, _ in scan(paths, workers, cache=cache))
+
+
+def measure(name, function, *args):
+    started = time.perf_counter()
+    count = function(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<24} {count:>9} rules  {elapsed:8.2f} s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark template parsing over a generated corpus.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of templates. Default is 2000")
+    parser.add_argument("--groups", type=int, default=10, help="Security groups per template. Default is 10")
+    parser.add_argument("--rules", type=int, default=20, help="Inline ingress rules per group. Default is 20")
+    parser.add_argument("--workers", type=int, help="Parser processes. Default is the CPU count")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(directory, args.files, args.groups, args.rules)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{len(paths)} templates, {size / 2**20:.1f} MiB. LibYAML: {LIBYAML}")
+
+        baseline = measure("serial SafeLoader", serial_safe_load, paths)
+        measure("serial TemplateLoader", serial_libyaml, paths)
+        pool = measure(f"process pool ({args.workers or os.cpu_count()})", process_pool, paths, args.workers)
+        print(f"Process pool is {baseline / pool:.1f}x the speed of serial SafeLoader.")
+
+        cache_path = os.path.join(directory, "cache.sqlite")
+        measure("cold cache", cached, paths, args.workers, cache_path)
+        measure("warm cache", cached, paths, args.workers, cache_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
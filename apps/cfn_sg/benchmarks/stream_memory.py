@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+# Memory benchmark: holding every parsed template (the old yaml_files dict) versus streaming each
+# template's rules and dropping the document, over a generated corpus.
+#
+# Usage: python benchmarks/stream_memory.py [--files 500] [--groups 10] [--rules 20]
+#   (run from apps/cfn_sg)
+#
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parse_corpus import generate_corpus
+from sg_loader import load_file
+from sg_rules import extract_rules, find_duplicates, iter_duplicates
+from sg_scan import scan
+
+
+def all_documents(paths):
+    documents = {path: load_file(path) for path in paths}
+    return len(find_duplicates(rule for path, document in documents.items() for rule in extract_rules(path, document)))
+
+
+def streamed(paths):
+    return sum(1 for _ in iter_duplicates(rule for _, rules, _ in scan(paths, workers=0) for rule in rules))
+
+
+def measure(name, function, paths):
+    tracemalloc.start()
+    count = function(paths)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<16} {count:>7} duplicates  peak {peak / 2**20:8.1f} MiB")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of holding all templates with streaming their rules.")
+    parser.add_argument("--files", type=int, default=500, help="Number of templates. Default is 500")
+    parser.add_argument("--groups", type=int, default=10, help="Security groups per template. Default is 10")
+    parser.add_argument("--rules", type=int, default=20, help="Inline ingress rules per group. Default is 20")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(directory, args.files, args.groups, args.rules)
+        largest = max(os.path.getsize(path) for path in paths)
+        print(f"{len(paths)} templates, largest {largest / 2**10:.0f} KiB")
+
+        held = measure("all documents", all_documents, paths)
+        stream = measure("streamed", streamed, paths)
+        print(f"Streaming peaks at {stream / held:.0%} of holding every document.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
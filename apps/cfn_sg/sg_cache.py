@@ -0,0 +1,120 @@
+#
+# A persistent cache of the rules extracted from each template, kept in SQLite.
+#
+# Entries are keyed by path and checked against the file's mtime and size, so an unchanged file
+# costs a stat and one primary key lookup. A file whose mtime changed but whose size did not is
+# hashed, and kept if its sha256 still matches (e.g. after a fresh git checkout). Lookups are per
+# file, so the cache is never loaded as a whole.
+#
+# Usage:
+#   with RuleCache('.cfn_sg_cache.sqlite') as cache:
+#       for path, rules, error in scan(paths, cache=cache):
+#           ...
+#
+
+import hashlib
+import json
+import os
+import sqlite3
+
+from sg_rules import RULES_VERSION, Rule
+
+
+# The sha256 of a file's content.
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for block in iter(lambda: stream.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RuleCache:
+    _SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            rules TEXT NOT NULL,
+            error TEXT
+        )''',
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.rehashed = 0
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        with self._connection:
+            for statement in self._SCHEMA:
+                self._connection.execute(statement)
+
+            # Rules extracted by another version of sg_rules may differ, so they are dropped.
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'rules_version'").fetchone()
+            if row is None or row[0] != str(RULES_VERSION):
+                self._connection.execute("DELETE FROM files")
+                self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules_version', ?)", (str(RULES_VERSION),))
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # Returns the cached (rules, error) of a file, or None when it changed. stat is the file's os.stat() result.
+    def lookup(self, path, stat):
+        row = self._connection.execute(
+            "SELECT mtime_ns, size, sha256, rules, error FROM files WHERE path = ?", (path,)).fetchone()
+
+        if row is None or row[1] != stat.st_size:
+            self.misses += 1
+            return None
+
+        mtime_ns, _, sha256, rules, error = row
+        if mtime_ns != stat.st_mtime_ns:
+            self.rehashed += 1
+            if file_digest(path) != sha256:
+                self.misses += 1
+                return None
+            with self._connection:
+                self._connection.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+
+        self.hits += 1
+        return [Rule(*fields) for fields in json.loads(rules)], error
+
+    # Stores the rules (or parse error) of a file, given its stat and sha256 from when it was parsed.
+    def store(self, path, stat, sha256, rules, error=None):
+        self.store_many([(path, stat, sha256, rules, error)])
+
+    def store_many(self, entries):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, sha256, rules, error) VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, stat.st_mtime_ns, stat.st_size, sha256, json.dumps([list(rule) for rule in rules]), error)
+                 for path, stat, sha256, rules, error in entries])
+
+    # Removes the entries of files that are not in paths, e.g. deleted templates. When roots (files and
+    # directories) are given, only entries at or under one of them are removed, so the entries of scans
+    # of other paths sharing the cache are kept.
+    def prune(self, paths, roots=None):
+        keep = set(paths)
+        prefixes = None if roots is None else tuple(os.path.join(os.path.abspath(root), "") for root in roots)
+        stale = [(path,) for (path,) in self._connection.execute("SELECT path FROM files")
+                 if path not in keep and (prefixes is None or os.path.join(os.path.abspath(path), "").startswith(prefixes))]
+        with self._connection:
+            self._connection.executemany("DELETE FROM files WHERE path = ?", stale)
+        return len(stale)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "rehashed": self.rehashed}
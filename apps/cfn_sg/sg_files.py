@@ -0,0 +1,138 @@
+#
+# Expands --path arguments (files, directories and wildcards) into template paths.
+#
+# Directories are walked recursively with os.scandir, one directory listing at a time, so paths are
+# yielded to the parser as they are found rather than after the whole tree is listed. Directories
+# that never hold templates (.git, node_modules, ...) are pruned without being listed, and symbolic
+# links to directories are not followed.
+#
+# Wildcards follow glob rules: * and ? stay within a path component, [abc] matches a character,
+# and ** matches any number of directories, e.g. infra/**/sg-*.yaml. Only the part of the tree
+# under the pattern's fixed prefix is walked, and no deeper than a pattern without ** can match.
+#
+
+import os
+import re
+
+EXTENSIONS = (".yaml", ".yml")
+
+PRUNE = frozenset([
+    ".git", ".hg", ".svn", ".idea", ".vscode", ".tox", ".venv", "venv", "__pycache__",
+    "node_modules", ".terraform", ".aws-sam", "cdk.out",
+])
+
+_MAGIC = re.compile(r"[*?[]")
+
+
+def has_magic(path):
+    return _MAGIC.search(path) is not None
+
+
+# Yield the files under directory whose names end with one of extensions, depth first in name order.
+# match(relative path) filters them instead when given, and max_depth limits how deep the walk goes.
+def walk(directory, extensions=EXTENSIONS, prune=PRUNE, match=None, max_depth=None):
+    stack = [(directory, "", 0)]
+    while stack:
+        path, relative, depth = stack.pop()
+        try:
+            with os.scandir(path) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        directories = []
+        for entry in entries:
+            name = f"{relative}{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in prune and (max_depth is None or depth < max_depth):
+                    directories.append((entry.path, f"{name}/", depth + 1))
+            elif match is not None:
+                if match(name) and entry.is_file():
+                    yield entry.path
+            elif entry.name.endswith(extensions) and entry.is_file():
+                yield entry.path
+
+        stack.extend(reversed(directories))
+
+
+# Translate a glob pattern (with ** for any number of directories) into a regular expression over '/' separated paths.
+def glob_regex(pattern):
+    parts = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+
+        character = pattern[index]
+        if character == "*":
+            parts.append("[^/]*")
+        elif character == "?":
+            parts.append("[^/]")
+        elif character == "[" and pattern.find("]", index + 2) != -1:
+            end = pattern.find("]", index + 2)
+            members = pattern[index + 1:end].replace("\\", "\\\\")
+            parts.append(f"[^{members[1:]}]" if members.startswith("!") else f"[{members}]")
+            index = end + 1
+            continue
+        else:
+            parts.append(re.escape(character))
+        index += 1
+
+    return re.compile("".join(parts) + r"\Z")
+
+
+# Split a glob pattern into the directory of its fixed prefix and the components after it.
+def split_pattern(pattern):
+    components = pattern.replace(os.sep, "/").split("/")
+    fixed = []
+    for component in components:
+        if has_magic(component):
+            break
+        fixed.append(component)
+    rest = components[len(fixed):]
+
+    base = "/".join(fixed) or "."
+    if pattern.startswith("/") and not fixed[1:]:
+        base = "/"
+    return base, rest
+
+
+# Yield the files matching a glob pattern, walking only the directories under its fixed prefix.
+def glob(pattern, prune=PRUNE):
+    base, rest = split_pattern(pattern)
+    regex = glob_regex("/".join(rest))
+    max_depth = None if any("**" in component for component in rest) else len(rest) - 1
+
+    for path in walk(base, prune=prune, match=regex.match, max_depth=max_depth):
+        # A pattern without a directory (e.g. *.yaml) matches paths without the ./ prefix.
+        yield path[2:] if base == "." and path.startswith("./") else path
+
+
+# Yield the template paths of files, directories and glob patterns, each path once, as they are found.
+def expand_paths(paths, extensions=EXTENSIONS, prune=PRUNE):
+    seen = set()
+    for path in paths:
+        if has_magic(path):
+            found = glob(path, prune)
+        elif os.path.isdir(path):
+            found = walk(path, extensions, prune)
+        else:
+            found = [path]
+
+        for file in found:
+            key = os.path.normpath(file)
+            if key not in seen:
+                seen.add(key)
+                yield file
+
+
+# The files and directories that paths (files, directories and glob patterns) can find templates under.
+# For a glob pattern that is the directory of its fixed prefix.
+def path_roots(paths):
+    return [split_pattern(path)[0] if has_magic(path) else path for path in paths]
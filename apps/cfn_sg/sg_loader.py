@@ -0,0 +1,91 @@
+#
+# YAML loading for CloudFormation templates.
+#
+# TemplateLoader is built on LibYAML's CSafeLoader when PyYAML was built with it, which parses
+# several times faster than the pure Python SafeLoader, and falls back to SafeLoader otherwise.
+#
+# The short form intrinsic function tags (!Ref, !GetAtt, !Sub, !Join, !Not, ...) that safe_load
+# rejects are loaded as Intrinsic nodes, e.g. !Ref MyCidrIp is Intrinsic('Ref', 'MyCidrIp').
+# Nothing is evaluated while loading; sg_rules resolves the few values rules need.
+#
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as BaseLoader
+except ImportError:
+    from yaml import SafeLoader as BaseLoader
+
+# True when templates are parsed by LibYAML.
+LIBYAML = BaseLoader.__name__ == "CSafeLoader"
+
+
+class Intrinsic:
+    # A short form intrinsic function call. It equals, and serialises like, its long form {function: argument}.
+    __slots__ = ("function", "argument")
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+    def as_dict(self):
+        return {self.function: self.argument}
+
+    def __eq__(self, other):
+        if isinstance(other, Intrinsic):
+            return self.function == other.function and self.argument == other.argument
+        return self.as_dict() == other
+
+    def __hash__(self):
+        return hash(_frozen(self))
+
+    def __repr__(self):
+        return f"Intrinsic({self.function!r}, {self.argument!r})"
+
+
+# A hashable value that is equal for equal template values: lists become tuples, mappings frozensets
+# of their items, and an Intrinsic its long form, so an Intrinsic hashes like any Intrinsic it equals.
+def _frozen(value):
+    if isinstance(value, Intrinsic):
+        value = value.as_dict()
+    if isinstance(value, dict):
+        return frozenset((key, _frozen(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+# Tags that are not Fn:: functions.
+_PLAIN_TAGS = ("Ref", "Condition")
+
+
+def _construct_intrinsic(loader, suffix, node):
+    function = suffix if suffix in _PLAIN_TAGS else f"Fn::{suffix}"
+    if isinstance(node, yaml.ScalarNode):
+        argument = loader.construct_scalar(node)
+        # !GetAtt Resource.Attribute is the short form of [Resource, Attribute].
+        if function == "Fn::GetAtt":
+            argument = argument.split(".", 1)
+    elif isinstance(node, yaml.SequenceNode):
+        argument = loader.construct_sequence(node, deep=True)
+    else:
+        argument = loader.construct_mapping(node, deep=True)
+    return Intrinsic(function, argument)
+
+
+class TemplateLoader(BaseLoader):
+    pass
+
+
+TemplateLoader.add_multi_constructor("!", _construct_intrinsic)
+
+
+# Parse a template from a str, bytes or file object.
+def load(stream, loader=TemplateLoader):
+    return yaml.load(stream, Loader=loader)
+
+
+# Parse a template file. Reading bytes lets LibYAML detect the encoding itself.
+def load_file(path, loader=TemplateLoader):
+    with open(path, "rb") as stream:
+        return load(stream.read(), loader)
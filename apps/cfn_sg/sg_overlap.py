@@ -0,0 +1,226 @@
+#
+# Shadowed and overlapping security group rules.
+#
+# Two rules of the same group and direction overlap when their protocols match (-1 matches every
+# protocol), their CIDRs share addresses and their port ranges intersect. A rule is shadowed when
+# another rule's CIDR and ports contain its own, which makes it redundant.
+#
+# CIDR blocks are either nested or disjoint, so after sorting them by (first address, -last
+# address) a stack sweep leaves exactly the blocks containing the current one on the stack. Each
+# block keeps an interval index over the port ranges of its rules, so a rule only queries the
+# indexes of its own block and the blocks containing it (at most 33 for IPv4, 129 for IPv6), and
+# the whole search is O(n log n + overlaps) rather than pairwise.
+#
+
+import ipaddress
+from typing import NamedTuple
+
+from sg_rules import Rule
+
+ALL_PROTOCOLS = "-1"
+ALL_PORTS = (0, 65535)
+ICMP = ("icmp", "icmpv6")
+
+
+class Overlap(NamedTuple):
+    # kind is 'duplicate' (same protocol, addresses and ports), 'shadowed' (rule is inside other) or 'overlap'.
+    kind: str
+    rule: Rule
+    other: Rule
+
+
+class IntervalIndex:
+    #
+    # A static augmented interval tree. The intervals are sorted by start, and the tree over them
+    # (implicit, rooted at the middle of each range) holds the largest end in each subtree, so a
+    # query skips every subtree that ends before the query starts.
+    #
+    def __init__(self, intervals):
+        # intervals: (start, end, item) tuples, inclusive.
+        self._intervals = sorted(intervals, key=lambda interval: interval[0])
+        self._starts = [interval[0] for interval in self._intervals]
+        self._max_end = [0] * len(self._intervals)
+        self._build(0, len(self._intervals))
+
+    def _build(self, low, high):
+        if low >= high:
+            return -1
+        middle = (low + high) // 2
+        self._max_end[middle] = max(self._intervals[middle][1], self._build(low, middle), self._build(middle + 1, high))
+        return self._max_end[middle]
+
+    def __len__(self):
+        return len(self._intervals)
+
+    # Yields the (start, end, item) intervals intersecting [start, end].
+    def overlapping(self, start, end):
+        stack = [(0, len(self._intervals))]
+        while stack:
+            low, high = stack.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            if self._max_end[middle] < start:
+                continue
+            stack.append((low, middle))
+            # Intervals right of an interval starting after end start after it too.
+            if self._starts[middle] <= end:
+                interval = self._intervals[middle]
+                if interval[1] >= start:
+                    yield interval
+                stack.append((middle + 1, high))
+
+
+def _addresses(cidr):
+    # Returns (version, first, last) for a literal CIDR, or None for other peers (groups, prefix lists, references).
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        return None
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def _ports(rule):
+    # Returns the (first, last) port range of a rule, or None when the ports are not known values.
+    # ICMP rules use type and code, encoded as type * 256 + code.
+    from_port, to_port = rule.from_port, rule.to_port
+    if rule.protocol == ALL_PROTOCOLS or (from_port is None and to_port is None):
+        return ALL_PORTS
+    if not isinstance(from_port, int) or not isinstance(to_port, (int, type(None))):
+        return None
+    if rule.protocol in ICMP:
+        if from_port == -1:
+            return ALL_PORTS
+        if to_port is None or to_port == -1:
+            return from_port * 256, from_port * 256 + 255
+        return from_port * 256 + to_port, from_port * 256 + to_port
+    if from_port == -1:
+        return ALL_PORTS
+    return from_port, from_port if to_port is None else to_port
+
+
+def _contains(outer, inner):
+    # Whether the outer entry's protocol, addresses and ports all contain the inner entry's.
+    _, outer_rule, outer_addresses, outer_ports = outer
+    _, inner_rule, inner_addresses, inner_ports = inner
+    return outer_rule.protocol in (ALL_PROTOCOLS, inner_rule.protocol) \
+        and outer_addresses[0] <= inner_addresses[0] and inner_addresses[1] <= outer_addresses[1] \
+        and outer_ports[0] <= inner_ports[0] and inner_ports[1] <= outer_ports[1]
+
+
+class _Block:
+    # The rules sharing one CIDR (or one other peer), with an interval index over their ports.
+    __slots__ = ("first", "last", "entries", "index")
+
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+        self.entries = []
+        self.index = None
+
+
+def _overlaps_in(entries, include):
+    #
+    # Yields the overlaps among entries, (position, rule, addresses, ports) tuples of one group,
+    # direction and peer namespace. include(rule, other) filters the pairs.
+    #
+    blocks = {}
+    for entry in entries:
+        first, last = entry[2]
+        block = blocks.get((first, last))
+        if block is None:
+            block = blocks[(first, last)] = _Block(first, last)
+        block.entries.append(entry)
+
+    for block in blocks.values():
+        block.index = IntervalIndex([(entry[3][0], entry[3][1], entry) for entry in block.entries])
+
+    stack = []
+    for block in sorted(blocks.values(), key=lambda block: (block.first, -block.last)):
+        # Blocks that end before this one starts cannot contain it, or anything after it.
+        while stack and stack[-1].last < block.first:
+            stack.pop()
+
+        for entry in block.entries:
+            position, rule, addresses, ports = entry
+            for container in stack:
+                for _, _, other in container.index.overlapping(*ports):
+                    if include(rule, other[1]):
+                        yield _pair(entry, other)
+            # Pairs within a block are reported once, from the later rule.
+            for _, _, other in block.index.overlapping(*ports):
+                if other[0] < position and include(rule, other[1]):
+                    yield _pair(entry, other)
+
+        stack.append(block)
+
+
+def _pair(entry, other):
+    # Returns the Overlap of two entries. A shadowed rule comes first, and duplicates are in rule order.
+    inside, outside = _contains(other, entry), _contains(entry, other)
+    if inside and outside:
+        return Overlap("duplicate", other[1], entry[1])
+    if inside:
+        return Overlap("shadowed", entry[1], other[1])
+    if outside:
+        return Overlap("shadowed", other[1], entry[1])
+    return Overlap("overlap", entry[1], other[1])
+
+
+# Returns the overlaps between the rules, as Overlap records.
+def find_overlaps(rules):
+    # (group, direction) -> protocol -> peer namespace -> entries
+    groups = {}
+    for position, rule in enumerate(rules):
+        ports = _ports(rule)
+        if ports is None:
+            continue
+        addresses = _addresses(rule.cidr)
+        if addresses is None:
+            # Peers other than CIDRs only overlap peers with the same name.
+            namespace, addresses = ("peer", rule.cidr), (0, 0)
+        else:
+            namespace, addresses = ("ip", addresses[0]), addresses[1:]
+
+        protocols = groups.setdefault((rule.group, rule.direction), {})
+        protocols.setdefault(rule.protocol, {}).setdefault(namespace, []).append((position, rule, addresses, ports))
+
+    overlaps = []
+    for protocols in groups.values():
+        all_protocols = protocols.get(ALL_PROTOCOLS, {})
+        for protocol, namespaces in protocols.items():
+            if protocol == ALL_PROTOCOLS:
+                for entries in namespaces.values():
+                    overlaps.extend(_overlaps_in(entries, lambda rule, other: True))
+                continue
+
+            # Rules for all protocols overlap this protocol's rules, but pairs of them are found above.
+            def include(rule, other, protocol=protocol):
+                return rule.protocol == protocol or other.protocol == protocol
+
+            for namespace, entries in namespaces.items():
+                overlaps.extend(_overlaps_in(entries + all_protocols.get(namespace, []), include))
+
+    return overlaps
+
+
+# Yields the text report of the overlaps, one line at a time.
+def format_overlaps(overlaps):
+    for overlap in overlaps:
+        rule, other = overlap.rule, overlap.other
+        verb = {"duplicate": "duplicates", "shadowed": "is shadowed by", "overlap": "overlaps"}[overlap.kind]
+        yield f"{rule.direction} {rule.file}: {rule.resource} ({rule.protocol} {rule.cidr or '-'} {_port_text(rule)}) " \
+              f"{verb} {other.file}: {other.resource} ({other.protocol} {other.cidr or '-'} {_port_text(other)})"
+
+
+def _port_text(rule):
+    return "all" if rule.from_port is None and rule.to_port is None else f"{rule.from_port}-{rule.to_port}"
+
+
+def overlaps_as_json(overlaps):
+    return [{
+        "kind": overlap.kind,
+        "direction": overlap.rule.direction,
+        "rule": overlap.rule._asdict(),
+        "other": overlap.other._asdict(),
+    } for overlap in overlaps]
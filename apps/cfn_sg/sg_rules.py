@@ -0,0 +1,327 @@
+#
+# Security group rule extraction and duplicate detection for CloudFormation templates.
+#
+# Rules come from the inline SecurityGroupIngress/SecurityGroupEgress lists of
+# AWS::EC2::SecurityGroup resources, and from standalone AWS::EC2::SecurityGroupIngress/Egress
+# resources. Each is normalised to a canonical key of (group, direction, protocol, cidr, fromport,
+# toport), and duplicates are the rules that share a key, found in a single pass over a dict.
+#
+# Rule values are resolved only as far as comparing rules needs: Ref to a parameter with a default
+# (or to a Fn::ForEach identifier) becomes its value, and Fn::Sub/Fn::Join of known values become
+# strings. Anything else is compared by its long form, so !Ref X and {Ref: X} are the same value.
+# Fn::ForEach blocks under Resources are expanded one item at a time, and only when they produce
+# security groups or rules.
+#
+
+import ipaddress
+import json
+import re
+from typing import NamedTuple, Optional
+
+from sg_loader import Intrinsic
+
+# Bump when a change to the extraction changes the rules of a template, so cached rules are dropped.
+RULES_VERSION = 1
+
+SECURITY_GROUP = "AWS::EC2::SecurityGroup"
+STANDALONE_RULES = {
+    "AWS::EC2::SecurityGroupIngress": "ingress",
+    "AWS::EC2::SecurityGroupEgress": "egress",
+}
+INLINE_RULES = {
+    "SecurityGroupIngress": "ingress",
+    "SecurityGroupEgress": "egress",
+}
+
+# The rule properties naming the other side of the rule, in order of preference.
+PEER_PROPERTIES = (
+    "CidrIp",
+    "CidrIpv6",
+    "SourceSecurityGroupId",
+    "SourceSecurityGroupName",
+    "DestinationSecurityGroupId",
+    "SourcePrefixListId",
+    "DestinationPrefixListId",
+)
+
+RULE_TYPES = frozenset([SECURITY_GROUP, *STANDALONE_RULES])
+FOR_EACH = "Fn::ForEach::"
+
+# IpProtocol accepts names or IANA numbers, and -1 for all protocols.
+PROTOCOLS = {"6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6", "all": "-1"}
+
+
+class Rule(NamedTuple):
+    file: str
+    resource: str
+    group: str
+    group_id: Optional[str]
+    direction: str
+    protocol: str
+    cidr: str
+    from_port: Optional[object]
+    to_port: Optional[object]
+    description: Optional[str]
+
+    @property
+    def key(self):
+        return (self.group, self.direction, self.protocol, self.cidr, self.from_port, self.to_port)
+
+
+# Returns (function, argument) for an intrinsic function call in either form, or None.
+def _intrinsic(value):
+    if isinstance(value, Intrinsic):
+        return value.function, value.argument
+    if isinstance(value, dict) and len(value) == 1:
+        function, argument = next(iter(value.items()))
+        if function in ("Ref", "Condition") or function.startswith("Fn::"):
+            return function, argument
+    return None
+
+
+def _canonical(value):
+    # Intrinsic functions (e.g. {'Ref': 'MyCidrIp'}) compare by their content.
+    if isinstance(value, (dict, list, Intrinsic)):
+        return json.dumps(value, sort_keys=True, separators=(",", ":"), default=Intrinsic.as_dict)
+    return str(value)
+
+
+_PLACEHOLDER = re.compile(r"\$\{([^}!]+)\}")
+
+
+# Resolves a value from the known Ref values (names), or returns it unchanged.
+def _resolve(value, names):
+    call = _intrinsic(value)
+    if call is None:
+        return value
+    function, argument = call
+
+    if function == "Ref" and isinstance(argument, str):
+        return names.get(argument, value)
+    if function == "Fn::Sub" and isinstance(argument, str):
+        resolved = _PLACEHOLDER.sub(lambda match: str(names.get(match[1], match[0])), argument)
+        return value if _PLACEHOLDER.search(resolved) else resolved
+    if function == "Fn::Join" and isinstance(argument, list) and len(argument) == 2 and isinstance(argument[1], list):
+        parts = [_resolve(part, names) for part in argument[1]]
+        if all(isinstance(part, (str, int, float)) for part in parts):
+            return str(argument[0]).join(str(part) for part in parts)
+    return value
+
+
+# Returns the defaults of the template parameters. List parameters default to lists.
+def _parameter_defaults(document):
+    defaults = {}
+    parameters = document.get("Parameters")
+    for name, parameter in (parameters.items() if isinstance(parameters, dict) else ()):
+        default = parameter.get("Default") if isinstance(parameter, dict) else None
+        if default is None or default == "":
+            continue
+        if isinstance(default, str) and str(parameter.get("Type", "")).startswith(("CommaDelimitedList", "List<")):
+            default = [item.strip() for item in default.split(",")]
+        defaults[name] = default
+    return defaults
+
+
+# Replaces a Fn::ForEach identifier in a copy of value: ${Identifier} and &{Identifier} in strings, and Ref Identifier.
+def _substitute(value, identifier, item):
+    if isinstance(value, str):
+        alphanumeric = re.sub(r"[^A-Za-z0-9]", "", str(item))
+        return value.replace(f"${{{identifier}}}", str(item)).replace(f"&{{{identifier}}}", alphanumeric)
+    call = _intrinsic(value)
+    if call == ("Ref", identifier):
+        return item
+    if isinstance(value, Intrinsic):
+        return Intrinsic(value.function, _substitute(value.argument, identifier, item))
+    if isinstance(value, dict):
+        return {_substitute(key, identifier, item): _substitute(child, identifier, item) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_substitute(child, identifier, item) for child in value]
+    return value
+
+
+# Whether a Fn::ForEach output map produces any security group or rule resources.
+def _produces_rules(outputs):
+    for key, body in outputs.items():
+        if key.startswith(FOR_EACH):
+            if isinstance(body, list) and len(body) == 3 and isinstance(body[2], dict) and _produces_rules(body[2]):
+                return True
+        elif isinstance(body, dict) and body.get("Type") in RULE_TYPES:
+            return True
+    return False
+
+
+# Yields (name, resource, names) for the resources, expanding Fn::ForEach blocks that produce rules.
+def _resources(resources, names):
+    for name, resource in resources.items():
+        if not name.startswith(FOR_EACH):
+            yield name, resource, names
+            continue
+
+        if not (isinstance(resource, list) and len(resource) == 3 and isinstance(resource[2], dict)):
+            continue
+        identifier, collection, outputs = resource
+        if not _produces_rules(outputs):
+            continue
+
+        collection = _resolve(collection, names)
+        if isinstance(collection, str):
+            collection = collection.split(",")
+        if not isinstance(collection, list):
+            # An unknown collection is analysed once, with the identifier left in place.
+            yield from _resources(outputs, names)
+            continue
+
+        for item in collection:
+            item = _resolve(item, names)
+            expanded = {_substitute(key, identifier, item): _substitute(body, identifier, item) for key, body in outputs.items()}
+            yield from _resources(expanded, {**names, identifier: item})
+
+
+def _protocol(value):
+    protocol = _canonical(value).lower()
+    return PROTOCOLS.get(protocol, protocol)
+
+
+def _port(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return _canonical(value)
+
+
+def _cidr(value):
+    if isinstance(value, str):
+        try:
+            # 10.0.0.1/8 and 10.0.0.0/8 allow the same addresses.
+            return str(ipaddress.ip_network(value, strict=False))
+        except ValueError:
+            pass
+    return _canonical(value)
+
+
+def _peer(properties, names):
+    for name in PEER_PROPERTIES:
+        if properties.get(name) is not None:
+            return _cidr(_resolve(properties[name], names))
+    return ""
+
+
+def _group(file, value, names):
+    # Returns (group, group id). Groups defined in the template are scoped to its file.
+    value = _resolve(value, names)
+    if isinstance(value, str):
+        return value, value
+    call = _intrinsic(value)
+    if call:
+        function, argument = call
+        if function == "Ref" and isinstance(argument, str):
+            return f"{file}#{argument}", None
+        if function == "Fn::GetAtt":
+            resource = argument[0] if isinstance(argument, list) else str(argument).split(".")[0]
+            return f"{file}#{resource}", None
+    return f"{file}#{_canonical(value)}", None
+
+
+def _rule(file, resource, group, group_id, direction, properties, names, description=None):
+    protocol = _protocol(_resolve(properties.get("IpProtocol", "-1"), names))
+    # Ports do not apply to all protocols, whatever the template says.
+    any_port = protocol == "-1"
+    description = _resolve(properties.get("Description", description), names)
+    return Rule(
+        file=file,
+        resource=resource,
+        group=group,
+        group_id=group_id,
+        direction=direction,
+        protocol=protocol,
+        cidr=_peer(properties, names),
+        from_port=None if any_port else _port(_resolve(properties.get("FromPort"), names)),
+        to_port=None if any_port else _port(_resolve(properties.get("ToPort"), names)),
+        description=description if description is None or isinstance(description, str) else _canonical(description),
+    )
+
+
+# Yields every security group rule of a parsed template.
+def extract_rules(file, document):
+    if not isinstance(document, dict) or not isinstance(document.get("Resources"), dict):
+        return
+
+    for name, resource, names in _resources(document["Resources"], _parameter_defaults(document)):
+        if not isinstance(resource, dict):
+            continue
+        resource_type = resource.get("Type")
+        properties = resource.get("Properties")
+        if not isinstance(properties, dict):
+            continue
+
+        if resource_type == SECURITY_GROUP:
+            group, group_id = f"{file}#{name}", None
+            for property_name, direction in INLINE_RULES.items():
+                rules = properties.get(property_name)
+                if not isinstance(rules, list):
+                    continue
+                for rule in rules:
+                    if isinstance(rule, dict):
+                        yield _rule(file, name, group, group_id, direction, rule, names, properties.get("GroupDescription"))
+
+        elif resource_type in STANDALONE_RULES:
+            group, group_id = _group(file, properties.get("GroupId", properties.get("GroupName")), names)
+            yield _rule(file, name, group, group_id, STANDALONE_RULES[resource_type], properties, names)
+
+
+# Yields (original, duplicate) as each rule sharing a key with an earlier rule is found.
+# Only the first rule of each key is kept, so memory grows with the distinct keys, not the rules.
+def iter_duplicates(rules):
+    first = {}
+    for rule in rules:
+        original = first.setdefault(rule.key, rule)
+        if original is not rule:
+            yield original, rule
+
+
+# Returns the lists of rules sharing a canonical key, in the order the keys were first seen.
+def find_duplicates(rules):
+    order = {}
+    groups = {}
+
+    def numbered(rules):
+        for rule in rules:
+            order.setdefault(rule.key, len(order))
+            yield rule
+
+    for original, rule in iter_duplicates(numbered(rules)):
+        groups.setdefault(rule.key, [original]).append(rule)
+    return [groups[key] for key in sorted(groups, key=order.__getitem__)]
+
+
+# Yields the text report of the duplicates, one line at a time.
+def format_text(duplicates):
+    for matches in duplicates:
+        first = matches[0]
+        ports = "all" if first.from_port is None and first.to_port is None else f"{first.from_port}-{first.to_port}"
+        yield f"Duplicate {first.direction} rule: protocol {first.protocol}, cidr {first.cidr or '-'}, ports {ports}"
+        for rule in matches:
+            details = f"  {rule.file}: {rule.resource}"
+            if rule.group_id:
+                details += f" (group {rule.group_id})"
+            if rule.description:
+                details += f" - {rule.description}"
+            yield details
+
+
+def duplicate_as_json(original, rule):
+    return {"rule": rule._asdict(), "duplicate_of": original._asdict()}
+
+
+def as_json(duplicates):
+    return [{
+        "direction": matches[0].direction,
+        "protocol": matches[0].protocol,
+        "cidr": matches[0].cidr,
+        "from_port": matches[0].from_port,
+        "to_port": matches[0].to_port,
+        "rules": [{"file": rule.file, "resource": rule.resource, "group_id": rule.group_id,
+                   "description": rule.description} for rule in matches],
+    } for matches in duplicates]
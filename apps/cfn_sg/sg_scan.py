@@ -0,0 +1,129 @@
+#
+# Parses templates across a process pool and extracts their security group rules.
+#
+# Workers parse a chunk of files each and send back only the extracted Rule records (and any
+# parse errors), never the parsed documents, so little more than the rules crosses the process
+# boundary. Paths are consumed lazily, with at most two chunks per worker in flight.
+#
+# With a RuleCache, each file is stat'ed and looked up first, and only new or changed files are
+# sent to the workers. Their rules are stored in the cache as the results come back.
+#
+
+import collections
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from sg_loader import load
+from sg_rules import extract_rules
+
+
+# Parse one file. Returns (path, rules, error, sha256), where error is None or the parse error message.
+def _parse(path):
+    try:
+        with open(path, "rb") as stream:
+            content = stream.read()
+    except OSError as exc:
+        return path, [], f"{path}: {exc}", None
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    try:
+        document = load(content)
+    except yaml.YAMLError as exc:
+        return path, [], f"{path}: {exc}", sha256
+    # A template that parses but has an unexpected shape fails that file only, not the whole scan.
+    try:
+        rules = list(extract_rules(path, document))
+    except Exception as exc:
+        return path, [], f"{path}: {type(exc).__name__}: {exc}", sha256
+    return path, rules, None, sha256
+
+
+# Parse one file. Returns (path, rules, error), where error is None or the parse error message.
+def parse_file(path):
+    return _parse(path)[:3]
+
+
+# Parse a chunk of files in a worker process.
+def parse_files(paths):
+    return [_parse(path) for path in paths]
+
+
+def _chunks(paths, chunk_size):
+    iterator = iter(paths)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Look up a chunk of paths in the cache. Returns (results, misses), where results holds the hits by
+# path, and misses maps the other paths to their stat.
+def _lookup(chunk, cache):
+    results, misses = {}, {}
+    for path in chunk:
+        try:
+            stat = os.stat(path)
+        except OSError as exc:
+            results[path] = (path, [], f"{path}: {exc}")
+            continue
+        cached = cache.lookup(path, stat)
+        if cached is None:
+            misses[path] = stat
+        else:
+            results[path] = (path, *cached)
+    return results, misses
+
+
+# Merge parsed files into a chunk's results, storing them in the cache.
+def _merge(chunk, results, misses, parsed, cache):
+    entries = []
+    for path, rules, error, sha256 in parsed:
+        results[path] = (path, rules, error)
+        if sha256 is not None:
+            entries.append((path, misses[path], sha256, rules, error))
+    if entries:
+        cache.store_many(entries)
+    return [results[path] for path in chunk]
+
+
+# Yield (path, rules, error) for every path, in the order of the paths.
+# workers=None uses every CPU, and workers=0 parses in this process.
+def scan(paths, workers=None, chunk_size=16, cache=None):
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    if workers == 0:
+        for chunk in _chunks(paths, chunk_size):
+            if cache is None:
+                yield from (result[:3] for result in parse_files(chunk))
+            else:
+                results, misses = _lookup(chunk, cache)
+                yield from _merge(chunk, results, misses, parse_files(list(misses)), cache)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(paths, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit(chunk):
+            if cache is None:
+                return chunk, None, None, executor.submit(parse_files, chunk)
+            results, misses = _lookup(chunk, cache)
+            return chunk, results, misses, executor.submit(parse_files, list(misses)) if misses else None
+
+        pending = collections.deque(submit(chunk) for chunk in itertools.islice(chunks, workers * 2))
+        while pending:
+            chunk, results, misses, future = pending.popleft()
+            parsed = future.result() if future else []
+            for next_chunk in itertools.islice(chunks, 1):
+                pending.append(submit(next_chunk))
+
+            if cache is None:
+                yield from (result[:3] for result in parsed)
+            else:
+                yield from _merge(chunk, results, misses, parsed, cache)
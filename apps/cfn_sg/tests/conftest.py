@@ -0,0 +1,13 @@
+import importlib.util
+import os
+import sys
+
+# Make the cfn_sg modules importable from the tests directory. The app module is loaded as sg_app,
+# as other apps also have an app module.
+_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, _DIRECTORY)
+if 'sg_app' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('sg_app', os.path.join(_DIRECTORY, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['sg_app'] = module
+    spec.loader.exec_module(module)
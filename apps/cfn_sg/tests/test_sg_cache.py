@@ -0,0 +1,106 @@
+import os
+
+import sg_scan
+from sg_app import read_rules
+from sg_cache import RuleCache
+from sg_scan import scan
+
+TEMPLATE = """
+Resources:
+  Group:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      SecurityGroupIngress:
+        - {IpProtocol: tcp, FromPort: %d, ToPort: %d, CidrIp: !Ref Office}
+"""
+
+
+def _write(path, port, mtime=None):
+    path.write_text(TEMPLATE % (port, port))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def test_unchanged_files_are_served_from_the_cache(tmp_path, monkeypatch):
+    paths = [_write(tmp_path / f"t{i}.yaml", i) for i in range(4)]
+    (tmp_path / "broken.yaml").write_text("Resources: [\n")
+    paths.append(str(tmp_path / "broken.yaml"))
+
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        first = list(scan(paths, workers=0, cache=cache))
+        assert cache.stats() == {"hits": 0, "misses": 5, "rehashed": 0}
+
+    parsed = []
+    parse_files = sg_scan.parse_files
+    monkeypatch.setattr(sg_scan, "parse_files", lambda chunk: parsed.extend(chunk) or parse_files(chunk))
+
+    # t0 is rewritten with the same content (new mtime), t1 changes, t2 changes mtime and size.
+    _write(tmp_path / "t0.yaml", 0, mtime=1)
+    _write(tmp_path / "t1.yaml", 5, mtime=2)
+    _write(tmp_path / "t2.yaml", 22)
+
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        second = list(scan(paths, workers=0, cache=cache))
+        assert cache.stats() == {"hits": 3, "misses": 2, "rehashed": 2}
+
+    assert sorted(parsed) == sorted(paths[1:3])
+    assert [path for path, _, _ in second] == paths
+    assert second[0] == first[0] and second[3:] == first[3:]
+    assert second[1][1][0].from_port == 5 and second[2][1][0].from_port == 22
+    assert second[-1][2].startswith(paths[-1])
+
+
+def test_pool_scan_fills_the_cache(tmp_path):
+    paths = [_write(tmp_path / f"t{i}.yaml", i) for i in range(5)]
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        pooled = list(scan(paths, workers=2, chunk_size=2, cache=cache))
+        assert list(scan(paths, workers=2, chunk_size=2, cache=cache)) == pooled
+        assert cache.stats()["hits"] == 5
+        assert cache.prune(paths[:2]) == 3
+
+
+def test_a_new_rules_version_drops_the_cache(tmp_path, monkeypatch):
+    paths = [_write(tmp_path / "t.yaml", 80)]
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        list(scan(paths, workers=0, cache=cache))
+
+    import sg_cache
+    monkeypatch.setattr(sg_cache, "RULES_VERSION", 2)
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        list(scan(paths, workers=0, cache=cache))
+        assert cache.stats()["misses"] == 1
+
+
+def test_a_full_read_prunes_files_it_did_not_see(tmp_path):
+    paths = [_write(tmp_path / f"t{i}.yaml", i) for i in range(3)]
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        assert len(list(read_rules(paths, workers=0, cache=cache, roots=[str(tmp_path)]))) == 3
+
+    os.remove(paths[1])
+    with RuleCache(str(tmp_path / "cache.sqlite")) as cache:
+        list(read_rules([paths[0], paths[2]], workers=0, cache=cache, roots=[str(tmp_path)]))
+        assert cache.prune([paths[0], paths[2]]) == 0
+        assert cache.prune([]) == 2
+
+
+def test_a_read_only_prunes_files_under_its_roots(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+    first = [_write(tmp_path / "a" / f"t{i}.yaml", i) for i in range(2)]
+    second = [_write(tmp_path / "b" / f"t{i}.yaml", i) for i in range(2)]
+    cache_path = str(tmp_path / "cache.sqlite")
+    with RuleCache(cache_path) as cache:
+        list(read_rules(first, workers=0, cache=cache, roots=[str(tmp_path / "a")]))
+        list(read_rules(second, workers=0, cache=cache, roots=[str(tmp_path / "b")]))
+
+    # Reading a/ again keeps b/'s entries, and drops the entry of the file removed from a/.
+    os.remove(first[1])
+    with RuleCache(cache_path) as cache:
+        list(read_rules(first[:1], workers=0, cache=cache, roots=[str(tmp_path / "a")]))
+        assert cache.prune(first[:1] + second) == 0
+
+    # A root that is a file, e.g. a single template, only covers that file.
+    with RuleCache(cache_path) as cache:
+        assert cache.prune([], roots=[second[0]]) == 1
+        assert cache.prune([], roots=[str(tmp_path / "b")]) == 1
@@ -0,0 +1,74 @@
+import os
+
+from sg_files import expand_paths, glob_regex, path_roots
+
+FILES = [
+    "a.yaml",
+    "notes.txt",
+    "infra/b.yml",
+    "infra/sg-web.yaml",
+    "infra/network/sg-db.yaml",
+    "infra/network/vpc.json",
+    ".git/objects/c.yaml",
+    "node_modules/pkg/d.yaml",
+]
+
+
+def _tree(directory):
+    for name in FILES:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("Resources: {}\n")
+    return directory
+
+
+def _relative(directory, paths):
+    return [os.path.relpath(path, directory).replace(os.sep, "/") for path in paths]
+
+
+def test_directory_is_walked_recursively_with_pruning(tmp_path):
+    # The files of a directory come before its subdirectories.
+    _tree(tmp_path)
+    assert _relative(tmp_path, expand_paths([str(tmp_path)])) == [
+        "a.yaml", "infra/b.yml", "infra/sg-web.yaml", "infra/network/sg-db.yaml",
+    ]
+
+
+def test_wildcards(tmp_path):
+    _tree(tmp_path)
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/*.yaml"])) == ["a.yaml"]
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/infra/*.y*ml"])) == ["infra/b.yml", "infra/sg-web.yaml"]
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/**/sg-*.yaml"])) == [
+        "infra/sg-web.yaml", "infra/network/sg-db.yaml",
+    ]
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/*/[!s]*"])) == ["infra/b.yml"]
+
+
+def test_files_are_kept_and_paths_reported_once(tmp_path):
+    _tree(tmp_path)
+    paths = expand_paths([str(tmp_path / "infra/network/vpc.json"), f"{tmp_path}/infra", f"{tmp_path}/infra/*.yaml"])
+    assert _relative(tmp_path, paths) == [
+        "infra/network/vpc.json", "infra/b.yml", "infra/sg-web.yaml", "infra/network/sg-db.yaml",
+    ]
+
+
+def test_paths_are_yielded_as_they_are_found(tmp_path):
+    _tree(tmp_path)
+    paths = expand_paths([str(tmp_path)])
+    assert _relative(tmp_path, [next(paths)]) == ["a.yaml"]
+    # Files created after the walk started are found when the walk reaches their directory.
+    (tmp_path / "infra/network/late.yaml").write_text("Resources: {}\n")
+    assert "infra/network/late.yaml" in _relative(tmp_path, paths)
+
+
+def test_glob_regex():
+    assert glob_regex("**/*.yaml").match("a.yaml")
+    assert glob_regex("**/*.yaml").match("x/y/a.yaml")
+    assert not glob_regex("*.yaml").match("x/a.yaml")
+    assert glob_regex("sg-?.yml").match("sg-1.yml")
+    assert not glob_regex("a+b.yaml").match("aab.yaml")
+
+
+def test_path_roots():
+    assert path_roots(["t.yaml", "infra", "infra/**/sg-*.yaml", "*.yaml", "/srv/*/t.yaml"]) == \
+        ["t.yaml", "infra", "infra", ".", "/srv"]
@@ -0,0 +1,89 @@
+import os
+
+import sg_rules
+from sg_loader import Intrinsic, load, load_file
+from sg_rules import extract_rules, find_duplicates
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "cfn_templates", "sg-rules1.yaml")
+
+TEMPLATE = """
+Parameters:
+  OfficeCidr:
+    Type: String
+    Default: 192.168.10.0/24
+  WebPort:
+    Type: Number
+    Default: 8080
+  PeerGroups:
+    Type: CommaDelimitedList
+    Default: sg-0aaaaaaaaaaaaaaaa, sg-0bbbbbbbbbbbbbbbb
+Resources:
+  Web:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      GroupDescription: !Sub "Web ${WebPort}"
+      SecurityGroupIngress:
+        - {IpProtocol: tcp, FromPort: !Ref WebPort, ToPort: !Ref WebPort, CidrIp: !Ref OfficeCidr}
+        - {IpProtocol: tcp, FromPort: 8080, ToPort: 8080, CidrIp: 192.168.10.0/24}
+        - {IpProtocol: tcp, FromPort: 22, ToPort: 22, CidrIp: !Ref Unknown}
+        - {IpProtocol: tcp, FromPort: 22, ToPort: 22, CidrIp: {Ref: Unknown}}
+  Fn::ForEach::Peers:
+    - Peer
+    - !Ref PeerGroups
+    - PeerHttps&{Peer}:
+        Type: AWS::EC2::SecurityGroupIngress
+        Properties:
+          GroupId: !Ref Peer
+          IpProtocol: tcp
+          FromPort: 443
+          ToPort: 443
+          CidrIp: !Join [".", ["10", "0", "0", "0/8"]]
+  Fn::ForEach::Buckets:
+    - Name
+    - !Ref NotAParameter
+    - Bucket${Name}:
+        Type: AWS::S3::Bucket
+"""
+
+
+def test_short_form_tags_load_as_intrinsic_nodes():
+    document = load("Value: !Not [!Equals [!Ref A, ''], !GetAtt B.GroupId]\nOther: !Sub {x: y}")
+    assert document["Value"] == Intrinsic("Fn::Not", [Intrinsic("Fn::Equals", [Intrinsic("Ref", "A"), ""]),
+                                                      Intrinsic("Fn::GetAtt", ["B", "GroupId"])])
+    assert document["Other"] == {"Fn::Sub": {"x": "y"}}
+
+
+def test_equal_intrinsics_hash_alike():
+    short = Intrinsic("Fn::Not", [Intrinsic("Ref", "A"), {"Fn::Sub": {"x": 1}}])
+    long = Intrinsic("Fn::Not", [{"Ref": "A"}, Intrinsic("Fn::Sub", {"x": 1.0})])
+    assert short == long and hash(short) == hash(long)
+    assert len({short, long, Intrinsic("Ref", "A")}) == 2
+
+
+def test_refs_resolve_to_parameter_defaults_and_short_forms_equal_long_forms():
+    rules = list(extract_rules("t.yaml", load(TEMPLATE)))
+    web = [rule for rule in rules if rule.resource == "Web"]
+    assert web[0].key == web[1].key == ("t.yaml#Web", "ingress", "tcp", "192.168.10.0/24", 8080, 8080)
+    assert web[0].description == "Web 8080"
+    assert web[2].cidr == '{"Ref":"Unknown"}' and web[2].key == web[3].key
+    assert len(find_duplicates(rules)) == 2
+
+
+def test_for_each_expands_rules_only(monkeypatch):
+    substituted = []
+    substitute = sg_rules._substitute
+    monkeypatch.setattr(sg_rules, "_substitute", lambda value, identifier, item: substituted.append(identifier) or substitute(value, identifier, item))
+
+    peers = [rule for rule in extract_rules("t.yaml", load(TEMPLATE)) if rule.resource.startswith("PeerHttps")]
+    assert [(rule.resource, rule.group_id, rule.cidr) for rule in peers] == [
+        ("PeerHttpssg0aaaaaaaaaaaaaaaa", "sg-0aaaaaaaaaaaaaaaa", "10.0.0.0/8"),
+        ("PeerHttpssg0bbbbbbbbbbbbbbbb", "sg-0bbbbbbbbbbbbbbbb", "10.0.0.0/8"),
+    ]
+    assert set(substituted) == {"Peer"}
+
+
+def test_sample_template_loads_and_its_for_each_is_analysed():
+    rules = list(extract_rules("sg-rules1.yaml", load_file(SAMPLE)))
+    assert [(rule.group, rule.protocol, rule.cidr, rule.from_port) for rule in rules] == [
+        ("sg-rules1.yaml#Identifier", "tcp", "10.0.0.0/8", 80),
+    ]
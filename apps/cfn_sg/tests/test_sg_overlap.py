@@ -0,0 +1,133 @@
+import ipaddress
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+
+from sg_overlap import IntervalIndex, _addresses, _ports, find_overlaps, format_overlaps
+from sg_rules import Rule
+
+
+def _rule(resource, cidr, from_port=None, to_port=None, protocol="tcp", group="g", direction="ingress"):
+    return Rule("t.yaml", resource, group, None, direction, protocol, cidr, from_port, to_port, None)
+
+
+def _kinds(overlaps):
+    return sorted((overlap.kind, overlap.rule.resource, overlap.other.resource) for overlap in overlaps)
+
+
+def test_interval_index_matches_a_scan():
+    rng = random.Random(3)
+    intervals = [(start, start + rng.randrange(50), index) for index, start in enumerate(rng.randrange(1000) for _ in range(300))]
+    index = IntervalIndex(intervals)
+    for _ in range(200):
+        start = rng.randrange(1000)
+        end = start + rng.randrange(30)
+        expected = sorted(i for i in intervals if i[0] <= end and i[1] >= start)
+        assert sorted(index.overlapping(start, end)) == expected
+
+
+def test_shadowed_overlapping_and_duplicate_rules():
+    rules = [
+        _rule("wide", "10.0.0.0/8", 0, 1024),
+        _rule("narrow", "10.1.2.0/24", 80, 80),
+        _rule("partial", "10.1.0.0/16", 1000, 2000),
+        _rule("copy", "10.0.0.0/8", 0, 1024),
+        _rule("elsewhere", "192.168.0.0/16", 80, 80),
+        _rule("v6", "2001:db8::/32", 443, 443),
+        _rule("v6-host", "2001:db8::1/128", 443, 443),
+        _rule("udp", "10.1.2.0/24", 80, 80, protocol="udp"),
+        _rule("other-group", "10.1.2.0/24", 80, 80, group="h"),
+        _rule("egress", "10.1.2.0/24", 80, 80, direction="egress"),
+    ]
+    assert _kinds(find_overlaps(rules)) == [
+        ("duplicate", "wide", "copy"),
+        ("overlap", "partial", "copy"),
+        ("overlap", "partial", "wide"),
+        ("shadowed", "narrow", "copy"),
+        ("shadowed", "narrow", "wide"),
+        ("shadowed", "v6-host", "v6"),
+    ]
+
+
+def test_all_protocols_rules_cover_every_protocol_and_peer_names_match_exactly():
+    rules = [
+        _rule("everything", "0.0.0.0/0", protocol="-1"),
+        _rule("web", "10.0.0.0/8", 80, 80),
+        _rule("ping", "10.0.0.0/8", 8, -1, protocol="icmp"),
+        _rule("dns", "10.0.0.0/8", 53, 53, protocol="udp"),
+        _rule("everything-again", "0.0.0.0/0", protocol="-1"),
+        _rule("peer", "sg-0123", 80, 80),
+        _rule("peer-all", "sg-0123", 0, 65535),
+        _rule("other-peer", "sg-0456", 80, 80),
+        _rule("unknown-port", "10.0.0.0/8", '{"Ref":"Port"}', '{"Ref":"Port"}'),
+    ]
+    kinds = _kinds(find_overlaps(rules))
+    assert ("duplicate", "everything", "everything-again") in kinds
+    for resource in ("web", "ping", "dns"):
+        assert ("shadowed", resource, "everything") in kinds and ("shadowed", resource, "everything-again") in kinds
+    assert ("shadowed", "peer", "peer-all") in kinds
+    assert len(kinds) == 8
+    assert next(format_overlaps(find_overlaps(rules[:2]))) == \
+        "ingress t.yaml: web (tcp 10.0.0.0/8 80-80) is shadowed by t.yaml: everything (-1 0.0.0.0/0 all)"
+
+
+def _brute_force(rules):
+    found = set()
+    for a, b in itertools.combinations(rules, 2):
+        if (a.group, a.direction) != (b.group, b.direction):
+            continue
+        if "-1" not in (a.protocol, b.protocol) and a.protocol != b.protocol:
+            continue
+        net_a, net_b = ipaddress.ip_network(a.cidr), ipaddress.ip_network(b.cidr)
+        if net_a.version != net_b.version or not net_a.overlaps(net_b):
+            continue
+        ports_a, ports_b = _ports(a), _ports(b)
+        if ports_a[0] <= ports_b[1] and ports_b[0] <= ports_a[1]:
+            found.add(frozenset((a.resource, b.resource)))
+    return found
+
+
+def test_matches_pairwise_comparison_on_random_rules():
+    rng = random.Random(11)
+    rules = []
+    for index in range(400):
+        prefix = rng.choice([8, 16, 24, 28, 32])
+        address = ipaddress.ip_network((rng.choice([10 << 24, (10 << 24) + (1 << 16)]) + rng.randrange(1 << 12) * 256, prefix), strict=False)
+        start = rng.randrange(0, 2000)
+        rules.append(_rule(f"r{index}", str(address), start, start + rng.randrange(100),
+                           protocol=rng.choice(["tcp", "tcp", "udp", "-1"]), group=rng.choice("ab")))
+
+    overlaps = find_overlaps(rules)
+    pairs = [frozenset((overlap.rule.resource, overlap.other.resource)) for overlap in overlaps]
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == _brute_force(rules)
+
+
+def test_address_ranges():
+    assert _addresses("10.0.0.0/8") == (4, 10 << 24, (11 << 24) - 1)
+    assert _addresses("::/0") == (6, 0, (1 << 128) - 1)
+    assert _addresses("sg-0123") is None
+
+
+def test_cli_overlaps_mode(tmp_path):
+    (tmp_path / "t.yaml").write_text("""
+Resources:
+  Group:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      SecurityGroupIngress:
+        - {IpProtocol: tcp, FromPort: 0, ToPort: 1024, CidrIp: 10.0.0.0/8}
+        - {IpProtocol: tcp, FromPort: 443, ToPort: 443, CidrIp: 10.20.0.0/16}
+""")
+    app = os.path.join(os.path.dirname(__file__), "..", "app.py")
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--mode", "overlaps", "--workers", "0"],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    [overlap] = json.loads(result.stdout)
+    assert (overlap["kind"], overlap["rule"]["from_port"], overlap["other"]["from_port"]) == ("shadowed", 443, 0)
+
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--workers", "0"], capture_output=True, text=True)
+    assert (result.returncode, json.loads(result.stdout)) == (0, [])
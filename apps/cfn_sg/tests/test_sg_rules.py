@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+import sys
+
+import yaml
+
+from sg_rules import extract_rules, find_duplicates, format_text, iter_duplicates
+
+TEMPLATE = """
+Resources:
+  WebGroup:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      GroupDescription: Web servers
+      SecurityGroupIngress:
+        - IpProtocol: tcp
+          FromPort: '80'
+          ToPort: '80'
+          CidrIp: 10.0.0.0/8
+        - IpProtocol: "6"
+          FromPort: 443
+          ToPort: 443
+          CidrIp: 10.1.2.3/8
+      SecurityGroupEgress:
+        - IpProtocol: "-1"
+          FromPort: 0
+          ToPort: 65535
+          CidrIp: 0.0.0.0/0
+  WebHttp:
+    Type: AWS::EC2::SecurityGroupIngress
+    Properties:
+      GroupId: !Ref WebGroup
+      IpProtocol: tcp
+      FromPort: 80
+      ToPort: 80
+      CidrIp: 10.0.0.0/8
+      Description: Duplicate of the inline rule
+  WebHttps:
+    Type: AWS::EC2::SecurityGroupIngress
+    Properties:
+      GroupId:
+        Fn::GetAtt: [WebGroup, GroupId]
+      IpProtocol: tcp
+      FromPort: 443
+      ToPort: 443
+      CidrIp: 10.0.0.0/8
+  AllOut:
+    Type: AWS::EC2::SecurityGroupEgress
+    Properties:
+      GroupId: !GetAtt WebGroup.GroupId
+      IpProtocol: all
+      CidrIp: 0.0.0.0/0
+  OtherGroup:
+    Type: AWS::EC2::SecurityGroupIngress
+    Properties:
+      GroupId: sg-0123456789abcdef0
+      IpProtocol: tcp
+      FromPort: 80
+      ToPort: 80
+      CidrIp: 10.0.0.0/8
+"""
+
+
+class _Loader(yaml.SafeLoader):
+    pass
+
+
+_Loader.add_constructor("!Ref", lambda loader, node: {"Ref": loader.construct_scalar(node)})
+_Loader.add_constructor("!GetAtt", lambda loader, node: {"Fn::GetAtt": loader.construct_scalar(node)})
+
+
+def _rules(template=TEMPLATE, file="web.yaml"):
+    return list(extract_rules(file, yaml.load(template, Loader=_Loader)))
+
+
+def test_extracts_inline_and_standalone_rules():
+    rules = _rules()
+    assert [(rule.resource, rule.direction) for rule in rules] == [
+        ("WebGroup", "ingress"), ("WebGroup", "ingress"), ("WebGroup", "egress"),
+        ("WebHttp", "ingress"), ("WebHttps", "ingress"), ("AllOut", "egress"), ("OtherGroup", "ingress"),
+    ]
+    assert rules[0].key == ("web.yaml#WebGroup", "ingress", "tcp", "10.0.0.0/8", 80, 80)
+    assert rules[0].description == "Web servers"
+    assert rules[-1].group == rules[-1].group_id == "sg-0123456789abcdef0"
+
+
+def test_duplicates_share_a_canonical_key():
+    duplicates = find_duplicates(_rules())
+    assert [[rule.resource for rule in matches] for matches in duplicates] == [
+        ["WebGroup", "WebHttp"],
+        ["WebGroup", "WebHttps"],
+        ["WebGroup", "AllOut"],
+    ]
+    lines = list(format_text(duplicates))
+    assert lines[0] == "Duplicate ingress rule: protocol tcp, cidr 10.0.0.0/8, ports 80-80"
+    assert lines[2] == "  web.yaml: WebHttp - Duplicate of the inline rule"
+
+
+def test_template_groups_are_scoped_to_their_file_and_group_ids_are_not():
+    duplicates = find_duplicates(_rules(file="a.yaml") + _rules(file="b.yaml"))
+    assert len(duplicates) == 7
+    assert [(rule.file, rule.resource) for rule in duplicates[3]] == [("a.yaml", "OtherGroup"), ("b.yaml", "OtherGroup")]
+
+
+def test_duplicates_are_found_incrementally():
+    rules = iter(_rules())
+    duplicates = iter_duplicates(rules)
+    original, duplicate = next(duplicates)
+    assert (original.resource, duplicate.resource) == ("WebGroup", "WebHttp")
+    # Nothing past the duplicate has been read yet.
+    assert next(rules).resource == "WebHttps"
+
+
+def test_cli_outputs_and_exit_code(tmp_path):
+    (tmp_path / "web.yaml").write_text(TEMPLATE)
+    app = os.path.join(os.path.dirname(__file__), "..", "app.py")
+
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--output", "json"], capture_output=True, text=True)
+    assert result.returncode == 1
+    assert len(json.loads(result.stdout)) == 3
+
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--output", "ndjson"], capture_output=True, text=True)
+    assert result.returncode == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [(line["duplicate_of"]["resource"], line["rule"]["resource"]) for line in lines] == [
+        ("WebGroup", "WebHttp"), ("WebGroup", "WebHttps"), ("WebGroup", "AllOut")]
+
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--output", "none"], capture_output=True, text=True)
+    assert (result.returncode, result.stdout) == (1, "")
+
+    (tmp_path / "web.yaml").write_text("Resources: {}\n")
+    result = subprocess.run([sys.executable, app, "--path", str(tmp_path), "--output", "text"], capture_output=True, text=True)
+    assert (result.returncode, result.stdout) == (0, "")
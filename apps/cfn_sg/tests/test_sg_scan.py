@@ -0,0 +1,63 @@
+import yaml
+
+import sg_scan
+from sg_loader import TemplateLoader, load_file
+from sg_scan import scan
+
+TEMPLATE = """
+Resources:
+  Group:
+    Type: AWS::EC2::SecurityGroup
+    Properties:
+      SecurityGroupIngress:
+        - {IpProtocol: tcp, FromPort: %d, ToPort: %d, CidrIp: 10.0.0.0/8}
+"""
+
+
+def _corpus(directory, files):
+    paths = []
+    for index in range(files):
+        path = directory / f"t{index}.yaml"
+        path.write_text(TEMPLATE % (index, index))
+        paths.append(str(path))
+    broken = directory / "broken.yaml"
+    broken.write_text("Resources: [unclosed\n")
+    return paths + [str(broken)]
+
+
+def test_loader_uses_libyaml_when_available():
+    assert issubclass(TemplateLoader, getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def test_pool_returns_rules_in_path_order(tmp_path):
+    paths = _corpus(tmp_path, 9)
+    serial = list(scan(paths, workers=0))
+    pooled = list(scan(paths, workers=2, chunk_size=2))
+
+    assert pooled == serial
+    assert [path for path, _, _ in pooled] == paths
+    assert [rules[0].from_port for _, rules, _ in pooled[:-1]] == list(range(9))
+
+    path, rules, error = pooled[-1]
+    assert rules == [] and "broken.yaml" in error
+
+
+def test_load_file_parses_bytes(tmp_path):
+    path = tmp_path / "t.yaml"
+    path.write_bytes("Description: café\n".encode("utf-8"))
+    assert load_file(str(path)) == {"Description": "café"}
+
+
+def test_extraction_errors_fail_only_their_file(tmp_path, monkeypatch):
+    paths = _corpus(tmp_path, 2)
+    extract_rules = sg_scan.extract_rules
+
+    def failing(path, document):
+        if path == paths[0]:
+            raise KeyError("GroupId")
+        return extract_rules(path, document)
+
+    monkeypatch.setattr(sg_scan, "extract_rules", failing)
+    results = list(scan(paths, workers=0))
+    assert results[0][1] == [] and results[0][2] == f"{paths[0]}: KeyError: 'GroupId'"
+    assert results[1][1][0].from_port == 1 and results[1][2] is None
@@ -1,89 +1,332 @@
 #!/usr/bin/env python3
 
 # changelog_linter.py
+import argparse
+import glob
+import io
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from kacl_cache import ResultCache, content_digest
+from kacl_model import Changelog, ChangelogBuilder, semver_key
+
+# The file names searched for in directories given to the batch mode, and the directories skipped.
+CHANGELOG_NAMES = frozenset(["CHANGELOG.md"])
+PRUNE = frozenset([".git", ".hg", ".svn", ".tox", ".venv", "venv", "__pycache__", "node_modules"])
+GLOB_REGEX = re.compile(r'[*?[]')
+
 class ChangelogLinter:
     VERSION_HEADER_REGEX = re.compile(
         r'^## \[(?P<version>.+?)\](?: - (?P<date>\d{4}-\d{2}-\d{2}))?$'
     )
     OPTIONAL_SECTION_REGEX = re.compile(r'^###\s+(Added|Changed|Deprecated|Removed|Fixed|Security)\s*$')
+    # Bump when a change to the checks changes the errors of a file, so cached results are dropped.
+    RULES_VERSION = 1
 
     def __init__(self, filepath):
         self.filepath = filepath
         self.errors = []
+        self.changelog = None
+        # Only filled by load_file(); lint() reads the file line by line without keeping it.
         self.content_lines = []
 
     def load_file(self):
+        """Reads the file into self.content_lines, for callers that need its lines. Returns False, adding
+        the error to self.errors, when it cannot be read."""
         try:
             with open(self.filepath, 'r', encoding='utf-8') as f:
                 self.content_lines = f.readlines()
-        except Exception as e:
+        except (OSError, ValueError) as e:
             self.errors.append(f"Failed to load file: {e}")
             return False
         return True
 
+    def parse(self):
+        """Lints the file and returns its Changelog model, e.g. parse()["1.0.0"].entries("Fixed"). The errors are in self.errors."""
+        self.changelog = Changelog(self.filepath)
+        self.lint()
+        return self.changelog
+
     def lint(self):
-        if not self.load_file():
-            return self.errors
-
-        # Check that the first non-empty line is "# Changelog"
-        for line in self.content_lines:
-            if line.strip():
-                if line.strip() != "# Changelog":
-                    self.errors.append("File must start with '# Changelog' as the first non-empty line.")
-                break
-
-        version_headers = []
-        for idx, line in enumerate(self.content_lines):
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                self.lint_lines(f)
+        except (OSError, ValueError) as e:
+            # Reading failed part way through, so only report the failure.
+            self.errors = [f"Failed to load file: {e}"]
+            if self.changelog is not None:
+                self.changelog = Changelog(self.filepath)
+        return self.errors
+
+    def lint_lines(self, lines):
+        """Lints lines in a single pass, holding only the current version block's state (and building
+        self.changelog, when parse() asked for it)."""
+        builder = ChangelogBuilder(self.changelog) if self.changelog is not None else None
+        order = {"seen": {}, "released": False, "version": None, "date": None}
+        title_checked = False
+        version = None  # (line number, version) of the current version block
+        has_section = False
+        found_version = False
+        section_errors = []  # reported after the header errors
+
+        for number, line in enumerate(lines, 1):
+            # Check that the first non-empty line is "# Changelog"
+            if not title_checked:
+                stripped = line.strip()
+                if stripped:
+                    if stripped != "# Changelog":
+                        self.errors.append("File must start with '# Changelog' as the first non-empty line.")
+                    title_checked = True
+
+            if "#" not in line:
+                # Most lines are entries or blank, neither headers nor sections.
+                if builder:
+                    builder.line(number, line)
+                continue
             if line.startswith("## "):
-                match = self.VERSION_HEADER_REGEX.match(line.strip())
-                if not match:
-                    self.errors.append(f"Line {idx+1}: Version header does not match required format.")
-                else:
-                    version = match.group("version")
-                    date = match.group("date")
-                    if version != "Unreleased":
-                        if not date:
-                            self.errors.append(f"Line {idx+1}: Version '{version}' must have a date.")
-                        else:
-                            try:
-                                datetime.strptime(date, '%Y-%m-%d')
-                            except ValueError:
-                                self.errors.append(f"Line {idx+1}: Date '{date}' is not in YYYY-MM-DD format.")
-                    else:
-                        if date:
-                            self.errors.append(f"Line {idx+1}: 'Unreleased' version should not have a date.")
-                    version_headers.append((idx, version))
-        if not version_headers:
-            self.errors.append("No version headers found in the file.")
+                header = self.check_header(number, line)
+                if header is not None:
+                    if version and not has_section:
+                        section_errors.append(self.section_error(*version))
+                    version, has_section, found_version = (number, header[0]), False, True
+                    self.check_order(number, *header, order)
+                    if builder:
+                        builder.version(number, header[0], header[1])
+                    continue
+            elif version and not has_section and self.OPTIONAL_SECTION_REGEX.match(line.strip()):
+                has_section = True
+            if builder:
+                builder.line(number, line)
 
+        if not found_version:
+            self.errors.append("No version headers found in the file.")
         # Verify that each version block has at least one optional section header
-        for i, (start_idx, version) in enumerate(version_headers):
-            end_idx = version_headers[i+1][0] if i+1 < len(version_headers) else len(self.content_lines)
-            block = self.content_lines[start_idx+1:end_idx]
-            if not any(self.OPTIONAL_SECTION_REGEX.match(line.strip()) for line in block):
-                self.errors.append(
-                    f"Version '{version}' (line {start_idx+1}) must include at least one optional section (e.g., Added, Changed, etc)."
-                )
+        if version and not has_section:
+            section_errors.append(self.section_error(*version))
+        self.errors.extend(section_errors)
         return self.errors
 
-def main(filepath):
-    linter = ChangelogLinter(filepath)
-    errors = linter.lint()
-    if errors:
-        print("Changelog lint errors:")
-        for err in errors:
-            print(f"- {err}")
+    def check_header(self, number, line):
+        """Checks a '## ' line. Returns (version, date, parsed date or None), or None when it is not a version header."""
+        match = self.VERSION_HEADER_REGEX.match(line.strip())
+        if not match:
+            self.errors.append(f"Line {number}: Version header does not match required format.")
+            return None
+        version = match.group("version")
+        date = match.group("date")
+        parsed = None
+        if version != "Unreleased":
+            if not date:
+                self.errors.append(f"Line {number}: Version '{version}' must have a date.")
+            else:
+                try:
+                    # The regex has checked the digits, so this only checks the date exists (strptime is far slower).
+                    parsed = datetime(int(date[:4]), int(date[5:7]), int(date[8:]))
+                except ValueError:
+                    self.errors.append(f"Line {number}: Date '{date}' is not in YYYY-MM-DD format.")
+        else:
+            if date:
+                self.errors.append(f"Line {number}: 'Unreleased' version should not have a date.")
+        return version, date, parsed
+
+    def check_order(self, number, version, date, parsed, order):
+        """Checks that versions are listed once, newest first: Unreleased, then falling semantic versions
+        and dates. order holds the last semantic version and date, and the other versions seen."""
+        seen = order["seen"]
+        if version == "Unreleased":
+            if version in seen:
+                self.errors.append(f"Line {number}: Version '{version}' is already listed on line {seen[version]}.")
+            elif order["released"]:
+                self.errors.append(f"Line {number}: 'Unreleased' version must be listed above the released versions.")
+            seen[version] = number
+            return
+        order["released"] = True
+
+        key = semver_key(version)
+        if key is None:
+            # Versions that are not semantic versions cannot be ordered, only checked for repeats.
+            if version in seen:
+                self.errors.append(f"Line {number}: Version '{version}' is already listed on line {seen[version]}.")
+                return
+            seen[version] = number
+        else:
+            # Semantic versions must fall strictly, so a repeat further down is out of order too.
+            # Only the last one is kept, so the memory used does not grow with the versions.
+            previous = order["version"]
+            if previous and version == previous[0]:
+                self.errors.append(f"Line {number}: Version '{version}' is already listed on line {previous[1]}.")
+                return
+            if previous and key >= previous[2]:
+                self.errors.append(f"Line {number}: Version '{version}' must be lower than version '{previous[0]}' above it (line {previous[1]}).")
+            order["version"] = (version, number, key)
+
+        if parsed is not None:
+            previous = order["date"]
+            if previous and parsed > previous[2]:
+                self.errors.append(f"Line {number}: Date '{date}' of version '{version}' is later than the date of version '{previous[0]}' above it (line {previous[1]}).")
+            order["date"] = (version, number, parsed)
+
+    @staticmethod
+    def section_error(number, version):
+        return f"Version '{version}' (line {number}) must include at least one optional section (e.g., Added, Changed, etc)."
+
+def expand_paths(patterns):
+    """Yields the changelogs of files, directories (searched for CHANGELOG.md) and globs such as
+    'packages/**/CHANGELOG.md', each path once. A file that does not exist is yielded, to fail linting."""
+    seen = set()
+    for pattern in patterns:
+        if GLOB_REGEX.search(pattern):
+            found = glob_changelogs(pattern)
+        elif os.path.isdir(pattern):
+            found = find_changelogs(pattern)
+        else:
+            found = [pattern]
+        for path in found:
+            key = os.path.normpath(path)
+            if key not in seen:
+                seen.add(key)
+                yield path
+
+def find_changelogs(directory):
+    for root, directories, files in os.walk(directory):
+        directories[:] = sorted(name for name in directories if name not in PRUNE)
+        for name in sorted(files):
+            if name in CHANGELOG_NAMES:
+                yield os.path.join(root, name)
+
+def glob_changelogs(pattern):
+    """Yields the files matching a glob (** matches any number of directories), and the changelogs of the
+    directories it matches. Matches inside PRUNE directories below the pattern's fixed prefix are skipped,
+    so packages/**/CHANGELOG.md leaves out node_modules."""
+    components = pattern.replace(os.sep, "/").split("/")
+    fixed = next((index for index, component in enumerate(components) if GLOB_REGEX.search(component)), len(components))
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        if PRUNE.intersection(path.replace(os.sep, "/").split("/")[fixed:-1]):
+            continue
+        if os.path.isdir(path):
+            if os.path.basename(path) not in PRUNE:
+                yield from find_changelogs(path)
+        else:
+            yield path
+
+def lint_content(content):
+    """Lints a changelog's bytes, as ChangelogLinter.lint() lints the file. Runs in the batch pool's workers."""
+    linter = ChangelogLinter(None)
+    try:
+        text = content.decode('utf-8')
+    except ValueError as e:
+        return [f"Failed to load file: {e}"]
+    # newline=None reads line endings as open() does.
+    return linter.lint_lines(io.StringIO(text, newline=None))
+
+def lint_batch(paths, workers=None, cache=None):
+    """Lints many changelogs. Returns a result per path, in order: {path, sha256, errors, cached}.
+
+    Content found in the cache (a ResultCache) is not linted again, identical files are linted once,
+    and the rest are linted across a process pool of workers processes (default: the CPU count,
+    0 lints in this process). Only the content and the errors cross the process boundary."""
+    results = []
+    known = {}    # digest -> errors
+    pending = {}  # digest -> content, to lint
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            results.append({"path": path, "sha256": None, "errors": [f"Failed to load file: {e}"], "cached": False})
+            continue
+
+        digest = content_digest(content)
+        cached = digest in known and known[digest][1]
+        if digest not in known and digest not in pending:
+            errors = cache.get(digest) if cache is not None else None
+            if errors is None:
+                pending[digest] = content
+            else:
+                known[digest] = (errors, True)
+                cached = True
+        results.append({"path": path, "sha256": digest, "errors": None, "cached": cached})
+
+    digests, contents = list(pending), list(pending.values())
+    workers = min((os.cpu_count() or 1) if workers is None else workers, len(contents))
+    if workers < 2:
+        linted = map(lint_content, contents)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            # Changelogs are small, so a few chunks per worker keep the processes busy without a round trip per file.
+            linted = list(executor.map(lint_content, contents, chunksize=max(1, len(contents) // (workers * 4))))
+    for digest, errors in zip(digests, linted):
+        known[digest] = (errors, False)
+        if cache is not None:
+            cache.put(digest, errors)
+
+    for result in results:
+        if result["errors"] is None:
+            result["errors"] = known[result["sha256"]][0]
+    return results
+
+def batch_report(results, cache=None):
+    report = {
+        "files": [{"path": result["path"], "valid": not result["errors"], "errors": result["errors"],
+                   "sha256": result["sha256"], "cached": result["cached"]} for result in results],
+        "summary": {
+            "files": len(results),
+            "invalid": sum(1 for result in results if result["errors"]),
+            "errors": sum(len(result["errors"]) for result in results),
+        },
+    }
+    if cache is not None:
+        report["cache"] = cache.stats()
+    return report
+
+def main(*filepaths, output="text", workers=None, cache=None):
+    """Lints the changelogs of filepaths (files, directories or globs). Returns 1 when any has errors."""
+    paths = list(expand_paths(filepaths))
+    if not paths:
+        print("No changelogs found.")
         return 1
+
+    result_cache = ResultCache(cache, ChangelogLinter.RULES_VERSION) if cache else None
+    try:
+        results = lint_batch(paths, workers, result_cache)
+    finally:
+        if result_cache is not None:
+            result_cache.save()
+
+    if output == "json":
+        print(json.dumps(batch_report(results, result_cache), indent=2))
+    elif len(results) == 1:
+        errors = results[0]["errors"]
+        if errors:
+            print("Changelog lint errors:")
+            for err in errors:
+                print(f"- {err}")
+        else:
+            print("Changelog is valid.")
     else:
-        print("Changelog is valid.")
-        return 0
+        for result in results:
+            if result["errors"]:
+                print(f"{result['path']}: Changelog lint errors:")
+                for err in result["errors"]:
+                    print(f"- {err}")
+            else:
+                print(f"{result['path']}: Changelog is valid.")
+        invalid = sum(1 for result in results if result["errors"])
+        print(f"{len(results)} changelogs, {invalid} with errors.")
+    return 1 if any(result["errors"] for result in results) else 0
 
 if __name__ == '__main__':
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: python changelog_linter.py <path to CHANGELOG.md>")
+    parser = argparse.ArgumentParser(description="Lint Keep a Changelog files.")
+    parser.add_argument("paths", nargs="*", help="CHANGELOG.md files, directories (searched for CHANGELOG.md) or globs, e.g. 'packages/**/CHANGELOG.md'")
+    parser.add_argument("--output", help="Output format: text|json. json is one report of every file", choices=("text", "json"), default="text")
+    parser.add_argument("--workers", type=int, help="Lint processes. Default is the CPU count, 0 lints in this process")
+    parser.add_argument("--cache", help="JSON file caching the results by content hash between runs")
+    args = parser.parse_args()
+    if not args.paths:
+        print("Usage: python changelog_linter.py <path to CHANGELOG.md> [<path, directory or glob> ...]")
         sys.exit(1)
-    sys.exit(main(sys.argv[1]))
+    sys.exit(main(*args.paths, output=args.output, workers=args.workers, cache=args.cache))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Benchmark: lint a synthetic changelog of about a million lines with the single-pass linter, and
+# compare its time and peak memory with reading the whole file and scanning it once per check.
+#
+# Usage: python benchmarks/lint_large.py [--lines 1000000]
+#   (run from apps/kacl)
+#
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+import tracemalloc
+
+_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, _DIRECTORY)
+_spec = importlib.util.spec_from_file_location('kacl_app', os.path.join(_DIRECTORY, 'app.py'))
+kacl_app = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(kacl_app)
+ChangelogLinter = kacl_app.ChangelogLinter
+
+EPOCH = date(2000, 1, 1)
+
+
+def generate_changelog(path, lines):
+    # Versions of 20 lines, newest first: header, two sections and their entries. Every 50th version has an invalid date.
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# Changelog\n\n## [Unreleased]\n\n### Added\n\n- Work in progress.\n\n")
+        written, version = 8, lines // 20
+        while written < lines and version > 0:
+            date = "2024-02-30" if version % 50 == 0 else (EPOCH + timedelta(days=version)).strftime("%Y-%m-%d")
+            f.write(f"## [{version // 100}.{version % 100}.0] - {date}\n\n### Added\n\n")
+            f.writelines(f"- Entry {entry} of version {version}.\n" for entry in range(6))
+            f.write("\n### Fixed\n\n")
+            f.writelines(f"- Fix {entry}.\n" for entry in range(5))
+            f.write("\n")
+            written += 20
+            version -= 1
+    return written
+
+
+def multi_pass(path):
+    # The previous approach, with the same checks: read every line, then scan them for the headers and each block.
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    linter = ChangelogLinter(path)
+    errors = []
+    headers = []
+    order = {"seen": {}, "released": False, "version": None, "date": None}
+    for number, line in enumerate(lines, 1):
+        if line.startswith("## "):
+            header = linter.check_header(number, line)
+            if header is not None:
+                linter.check_order(number, *header, order)
+                headers.append((number - 1, header[0]))
+    for i, (start, version) in enumerate(headers):
+        end = headers[i + 1][0] if i + 1 < len(headers) else len(lines)
+        if not any(linter.OPTIONAL_SECTION_REGEX.match(line.strip()) for line in lines[start + 1:end]):
+            errors.append(linter.section_error(start + 1, version))
+    return linter.errors + errors
+
+
+def streamed(path):
+    return ChangelogLinter(path).lint()
+
+
+def measure(name, function, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    errors = function(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {len(errors):>6} errors  {elapsed:6.2f} s  peak {peak / 2**20:8.1f} MiB")
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the changelog linter on a large synthetic changelog.")
+    parser.add_argument("--lines", type=int, default=1000000, help="Approximate number of lines. Default is 1000000")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "CHANGELOG.md")
+        lines = generate_changelog(path, args.lines)
+        print(f"{lines} lines, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        # tracemalloc slows both down alike, so times are comparable with each other only.
+        held_time, held = measure("multi-pass", multi_pass, path)
+        stream_time, stream = measure("single-pass", streamed, path)
+        print(f"Single pass takes {stream_time / held_time:.0%} of the time and peaks at {stream / held:.1%} of the memory.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
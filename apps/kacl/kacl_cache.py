@@ -0,0 +1,83 @@
+#
+# A cache of changelog lint results, keyed by the sha256 of each changelog's content.
+#
+# Lint errors depend only on the content, so a changelog that has not changed since any earlier run
+# (at any path) is not linted again. The cache is one JSON file, replaced atomically when saved, and
+# is dropped as a whole when the linter's rules version changes. The least recently used entries
+# are dropped once there are more than max_entries.
+#
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def content_digest(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path, version, max_entries=10000):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._changed = False
+        self._results = {}
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == version and isinstance(data.get("results"), dict):
+                self._results = data["results"]
+        except (OSError, ValueError):
+            # A missing or unreadable cache starts empty.
+            pass
+
+    def get(self, digest):
+        """Returns the cached errors of a content digest, or None."""
+        errors = self._results.pop(digest, None)
+        if errors is None:
+            self.misses += 1
+            return None
+        # Entries are kept in the order they were last used.
+        self._results[digest] = errors
+        self._changed = True
+        self.hits += 1
+        return errors
+
+    def put(self, digest, errors):
+        self._results.pop(digest, None)
+        self._results[digest] = errors
+        self._changed = True
+
+    def save(self):
+        if not self._changed:
+            return
+        for digest in list(self._results)[:max(0, len(self._results) - self.max_entries)]:
+            del self._results[digest]
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix=".kacl-cache-")
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.version, "results": self._results}, f)
+            os.replace(temporary, self.path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._changed = False
+
+    def stats(self):
+        return {"entries": len(self._results), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.save()
@@ -0,0 +1,201 @@
+#
+# A parsed changelog: versions, their sections and the entries of each section, with the lines they span.
+#
+# The model is built by ChangelogLinter as it lints, in the same single pass over the file (see
+# ChangelogLinter.parse()). Versions are indexed by name, so tools can look up the entries of a
+# version directly instead of scanning the changelog again:
+#
+#   changelog = ChangelogLinter("CHANGELOG.md").parse()
+#   for entry in changelog["1.2.0"].entries("Fixed"):
+#       print(entry.line, entry.text)
+#
+
+import re
+
+# Semantic Versioning 2.0.0, https://semver.org/#is-there-a-suggested-regular-expression-regex-to-check-a-semver-string
+SEMVER_REGEX = re.compile(
+    r'^(?P<major>0|[1-9]\d*)\.(?P<minor>0|[1-9]\d*)\.(?P<patch>0|[1-9]\d*)'
+    r'(?:-(?P<prerelease>(?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*)(?:\.(?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*))*))?'
+    r'(?:\+(?P<build>[0-9a-zA-Z-]+(?:\.[0-9a-zA-Z-]+)*))?$'
+)
+SECTION_REGEX = re.compile(r'^###\s+(?P<name>.+)$')
+ENTRY_REGEX = re.compile(r'^[-*+]\s+(?P<text>.*?)\s*$')
+
+
+def semver_key(version):
+    """Returns a key ordering versions by semantic version precedence, or None when version is not one."""
+    match = SEMVER_REGEX.match(version)
+    if not match:
+        return None
+    prerelease = match.group("prerelease")
+    if prerelease is None:
+        # A release is higher than its pre-releases.
+        release = (1,)
+    else:
+        # Numeric identifiers are lower than alphanumeric ones, and compare as numbers.
+        release = (0,) + tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in prerelease.split("."))
+    return int(match.group("major")), int(match.group("minor")), int(match.group("patch")), release
+
+
+class Entry:
+    """A list item of a section. Indented lines below it (wrapped text, sub-items) are part of it."""
+    __slots__ = ("line", "end_line", "text")
+
+    def __init__(self, line, text):
+        self.line = line
+        self.end_line = line
+        self.text = text
+
+    def as_dict(self):
+        return {"line": self.line, "end_line": self.end_line, "text": self.text}
+
+    def __repr__(self):
+        return f"Entry(line={self.line}, text={self.text!r})"
+
+
+class Section:
+    """A '### ' section of a version. name is None for entries above the version's first section."""
+    __slots__ = ("name", "line", "end_line", "entries")
+
+    def __init__(self, name, line):
+        self.name = name
+        self.line = line
+        self.end_line = line
+        self.entries = []
+
+    def as_dict(self):
+        return {"name": self.name, "line": self.line, "end_line": self.end_line,
+                "entries": [entry.as_dict() for entry in self.entries]}
+
+    def __repr__(self):
+        return f"Section({self.name!r}, line={self.line}, {len(self.entries)} entries)"
+
+
+class Version:
+    """A '## [version] - date' block. Its span ends at its last non-blank line."""
+    __slots__ = ("version", "date", "line", "end_line", "sections")
+
+    def __init__(self, version, date, line):
+        self.version = version
+        self.date = date
+        self.line = line
+        self.end_line = line
+        self.sections = []
+
+    def section(self, name):
+        """Returns the first section called name, or None."""
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def entries(self, name=None):
+        """Returns the entries of the sections called name, or of every section."""
+        return [entry for section in self.sections if name is None or section.name == name for entry in section.entries]
+
+    @property
+    def semver(self):
+        return semver_key(self.version)
+
+    def as_dict(self):
+        return {"version": self.version, "date": self.date, "line": self.line, "end_line": self.end_line,
+                "sections": [section.as_dict() for section in self.sections]}
+
+    def __repr__(self):
+        return f"Version({self.version!r}, date={self.date!r}, line={self.line})"
+
+
+class Changelog:
+    """The versions of a changelog in file order, indexed by version."""
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self.versions = []
+        self._index = {}
+
+    def add(self, version):
+        self.versions.append(version)
+        # A version listed twice is found at its first (newest) position.
+        self._index.setdefault(version.version, version)
+
+    def get(self, version, default=None):
+        return self._index.get(version, default)
+
+    def entries(self, version, section=None):
+        """Returns the entries of a version, optionally of one section, or [] when the version is not listed."""
+        found = self._index.get(version)
+        return found.entries(section) if found else []
+
+    @property
+    def unreleased(self):
+        return self._index.get("Unreleased")
+
+    @property
+    def latest(self):
+        """The first released version, normally the newest."""
+        return next((version for version in self.versions if version.version != "Unreleased"), None)
+
+    def as_dict(self):
+        return {"file": self.filepath, "versions": [version.as_dict() for version in self.versions]}
+
+    def __getitem__(self, version):
+        return self._index[version]
+
+    def __contains__(self, version):
+        return version in self._index
+
+    def __iter__(self):
+        return iter(self.versions)
+
+    def __len__(self):
+        return len(self.versions)
+
+    def __repr__(self):
+        return f"Changelog of {len(self.versions)} versions"
+
+
+class ChangelogBuilder:
+    """Builds a Changelog from the lines the linter reads: version() for version headers, line() for every other line."""
+
+    def __init__(self, changelog):
+        self.changelog = changelog
+        self._version = None
+        self._section = None
+        self._entry = None
+
+    def version(self, number, version, date):
+        self._version = Version(version, date, number)
+        self._section = None
+        self._entry = None
+        self.changelog.add(self._version)
+
+    def line(self, number, line):
+        stripped = line.strip()
+        if self._version is None or not stripped:
+            return
+        self._version.end_line = number
+
+        match = SECTION_REGEX.match(stripped)
+        if match:
+            self._section = Section(match.group("name"), number)
+            self._entry = None
+            self._version.sections.append(self._section)
+            return
+
+        if line[0] in " \t":
+            # Indented lines continue the current entry.
+            if self._entry is not None:
+                self._entry.text += "\n" + stripped
+                self._entry.end_line = self._section.end_line = number
+            return
+
+        match = ENTRY_REGEX.match(line)
+        if not match:
+            self._entry = None
+            return
+        if self._section is None:
+            self._section = Section(None, number)
+            self._version.sections.append(self._section)
+        self._entry = Entry(number, match.group("text"))
+        self._section.entries.append(self._entry)
+        self._section.end_line = number
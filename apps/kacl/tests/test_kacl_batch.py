@@ -0,0 +1,93 @@
+import json
+import os
+
+from kacl_app import ChangelogLinter, expand_paths, lint_batch, main
+from kacl_cache import ResultCache
+
+VALID = "# Changelog\n\n## [1.0.0] - 2024-07-05\n\n### Added\n\n- A file.\n"
+INVALID = "Intro\r\n## [1.0.0]\r\n- no section\r\n"
+
+
+def _monorepo(directory):
+    files = {
+        "CHANGELOG.md": VALID,
+        "packages/a/CHANGELOG.md": INVALID,
+        "packages/b/CHANGELOG.md": VALID,
+        "packages/b/docs/CHANGELOG.md": "# Changelog\n",
+        "packages/b/node_modules/dep/CHANGELOG.md": INVALID,
+        "packages/c/notes.md": VALID,
+    }
+    for name, text in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(text.encode("utf-8"))
+    (directory / "packages/d").mkdir()
+    (directory / "packages/d/CHANGELOG.md").write_bytes(b"# Changelog\n\xff\n")
+    return directory
+
+
+def _relative(directory, paths):
+    return [os.path.relpath(path, directory).replace(os.sep, "/") for path in paths]
+
+
+def test_expand_paths(tmp_path):
+    _monorepo(tmp_path)
+    assert _relative(tmp_path, expand_paths([str(tmp_path)])) == [
+        "CHANGELOG.md", "packages/a/CHANGELOG.md", "packages/b/CHANGELOG.md", "packages/b/docs/CHANGELOG.md",
+        "packages/d/CHANGELOG.md",
+    ]
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/packages/*/CHANGELOG.md", f"{tmp_path}/packages/c/notes.md",
+                                             f"{tmp_path}/packages/a"])) == [
+        "packages/a/CHANGELOG.md", "packages/b/CHANGELOG.md", "packages/d/CHANGELOG.md", "packages/c/notes.md",
+    ]
+    # ** does not descend into pruned directories such as node_modules.
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/packages/**/CHANGELOG.md"])) == [
+        "packages/a/CHANGELOG.md", "packages/b/CHANGELOG.md", "packages/b/docs/CHANGELOG.md", "packages/d/CHANGELOG.md",
+    ]
+    assert _relative(tmp_path, expand_paths([f"{tmp_path}/packages/[ab]"])) == [
+        "packages/a/CHANGELOG.md", "packages/b/CHANGELOG.md", "packages/b/docs/CHANGELOG.md",
+    ]
+
+
+def test_batch_matches_linting_each_file(tmp_path):
+    _monorepo(tmp_path)
+    paths = list(expand_paths([str(tmp_path)])) + [str(tmp_path / "missing.md")]
+    serial = lint_batch(paths, workers=0)
+    pooled = lint_batch(paths, workers=2)
+
+    assert pooled == serial
+    assert [result["path"] for result in pooled] == paths
+    assert [result["errors"] for result in pooled] == [ChangelogLinter(path).lint() for path in paths]
+
+
+def test_results_are_cached_by_content(tmp_path):
+    _monorepo(tmp_path)
+    paths = list(expand_paths([str(tmp_path)]))
+    cache_path = str(tmp_path / "cache.json")
+
+    with ResultCache(cache_path, ChangelogLinter.RULES_VERSION) as cache:
+        first = lint_batch(paths, workers=0, cache=cache)
+    # The two valid changelogs have the same content, so it is linted once.
+    assert [result["cached"] for result in first] == [False] * 5
+    assert cache.stats() == {"entries": 4, "hits": 0, "misses": 4}
+
+    (tmp_path / "packages/a/CHANGELOG.md").write_text(VALID)
+    with ResultCache(cache_path, ChangelogLinter.RULES_VERSION) as cache:
+        second = lint_batch(paths, workers=0, cache=cache)
+    assert [result["cached"] for result in second] == [True, True, True, True, True]
+    assert second[1]["errors"] == []
+
+    # A new rules version drops the cached results.
+    assert len(ResultCache(cache_path, ChangelogLinter.RULES_VERSION + 1)) == 0
+
+
+def test_main_reports_json_and_one_exit_code(tmp_path, capsys):
+    _monorepo(tmp_path)
+    assert main(f"{tmp_path}/packages/b", output="json", workers=0) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [entry["valid"] for entry in report["files"]] == [True, False]
+    assert report["summary"] == {"files": 2, "invalid": 1, "errors": 1}
+
+    assert main(str(tmp_path / "CHANGELOG.md")) == 0
+    assert capsys.readouterr().out == "Changelog is valid.\n"
+    assert main(f"{tmp_path}/nothing/*.md") == 1
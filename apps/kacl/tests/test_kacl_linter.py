@@ -0,0 +1,79 @@
+from kacl_app import ChangelogLinter
+
+VALID = """# Changelog
+
+## [Unreleased]
+
+### Added
+
+- Something new.
+
+## [1.0.0] - 2024-07-05
+
+### Fixed
+
+- A bug.
+"""
+
+
+def _lint(tmp_path, text):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_text(text, encoding="utf-8")
+    return ChangelogLinter(str(path)).lint()
+
+
+def test_valid_changelog(tmp_path):
+    assert _lint(tmp_path, VALID) == []
+
+
+def test_errors_are_reported_in_order(tmp_path):
+    text = "\n".join([
+        "Intro",
+        "## [1.1.0]",
+        "### Added",
+        "## [1.0.0] - 2024-02-30",
+        "- no section",
+        "## Unreleased",
+        "## [Unreleased] - 2024-01-01",
+        "### Changed",
+    ])
+    assert _lint(tmp_path, text) == [
+        "File must start with '# Changelog' as the first non-empty line.",
+        "Line 2: Version '1.1.0' must have a date.",
+        "Line 4: Date '2024-02-30' is not in YYYY-MM-DD format.",
+        "Line 6: Version header does not match required format.",
+        "Line 7: 'Unreleased' version should not have a date.",
+        "Line 7: 'Unreleased' version must be listed above the released versions.",
+        # An invalid header does not end the version block before it.
+        "Version '1.0.0' (line 4) must include at least one optional section (e.g., Added, Changed, etc).",
+    ]
+
+
+def test_no_version_headers(tmp_path):
+    assert _lint(tmp_path, "# Changelog\n\nNothing yet.\n") == ["No version headers found in the file."]
+
+
+def test_lint_lines_accepts_any_iterable():
+    lines = (line for line in VALID.splitlines(keepends=True))
+    assert ChangelogLinter(None).lint_lines(lines) == []
+
+
+def test_unreadable_file_reports_only_the_failure(tmp_path):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_bytes(b"Intro\n## bad\n\xff\n")
+    errors = ChangelogLinter(str(path)).lint()
+    assert len(errors) == 1 and errors[0].startswith("Failed to load file:")
+    assert ChangelogLinter(str(tmp_path / "missing.md")).lint()[0].startswith("Failed to load file:")
+
+
+def test_load_file_keeps_its_lines(tmp_path):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_text(VALID, encoding="utf-8")
+    linter = ChangelogLinter(str(path))
+    assert linter.load_file()
+    assert linter.content_lines == VALID.splitlines(keepends=True)
+    assert linter.lint_lines(linter.content_lines) == []
+
+    missing = ChangelogLinter(str(tmp_path / "missing.md"))
+    assert not missing.load_file()
+    assert missing.content_lines == [] and missing.errors[0].startswith("Failed to load file:")
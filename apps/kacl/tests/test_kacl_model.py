@@ -0,0 +1,107 @@
+from kacl_app import ChangelogLinter
+from kacl_model import semver_key
+
+CHANGELOG = """# Changelog
+
+## [Unreleased]
+
+### Added
+
+- Batch mode.
+
+## [1.1.0] - 2024-07-23
+
+### Changed
+
+- Fixed several linting warnings,
+  wrapped onto a second line.
+  - And a sub-item.
+- Minor log message changes.
+
+### Fixed
+
+* A crash.
+
+## [1.0.0] - 2024-07-05
+
+- An entry above the first section.
+
+### Added
+
+- `.gitignore` file.
+"""
+
+
+def _parse(tmp_path, text):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_text(text, encoding="utf-8")
+    linter = ChangelogLinter(str(path))
+    return linter.parse(), linter.errors
+
+
+def test_versions_sections_and_entries(tmp_path):
+    changelog, errors = _parse(tmp_path, CHANGELOG)
+    assert errors == []
+    assert [version.version for version in changelog] == ["Unreleased", "1.1.0", "1.0.0"]
+    assert changelog.unreleased is changelog["Unreleased"] and changelog.latest is changelog["1.1.0"]
+    assert "2.0.0" not in changelog and changelog.entries("2.0.0") == []
+
+    version = changelog["1.1.0"]
+    assert (version.date, version.line, version.end_line) == ("2024-07-23", 9, 20)
+    assert [section.name for section in version.sections] == ["Changed", "Fixed"]
+    changed = version.section("Changed")
+    assert (changed.line, changed.end_line) == (11, 16)
+    assert [(entry.line, entry.end_line, entry.text) for entry in changed.entries] == [
+        (13, 15, "Fixed several linting warnings,\nwrapped onto a second line.\n- And a sub-item."),
+        (16, 16, "Minor log message changes."),
+    ]
+    assert [entry.text for entry in changelog.entries("1.1.0", "Fixed")] == ["A crash."]
+
+    first = changelog["1.0.0"]
+    assert [section.name for section in first.sections] == [None, "Added"]
+    assert [entry.text for entry in first.entries()] == ["An entry above the first section.", "`.gitignore` file."]
+    assert changelog.as_dict()["versions"][2]["end_line"] == 28
+
+
+def test_lint_does_not_build_a_model(tmp_path):
+    path = tmp_path / "CHANGELOG.md"
+    path.write_text(CHANGELOG, encoding="utf-8")
+    linter = ChangelogLinter(str(path))
+    assert linter.lint() == [] and linter.changelog is None
+
+
+def test_version_order_and_dates(tmp_path):
+    text = "\n".join([
+        "# Changelog",
+        "## [1.0.0] - 2024-01-01",
+        "### Added",
+        "## [1.1.0] - 2023-12-01",
+        "### Added",
+        "## [Unreleased]",
+        "### Added",
+        "## [1.0.0-rc.1] - 2024-02-01",
+        "### Added",
+        "## [1.0.0-rc.1] - 2023-01-01",
+        "### Added",
+        "## [legacy] - 2022-01-01",
+        "### Added",
+        "## [legacy] - 2021-01-01",
+        "### Added",
+    ])
+    changelog, errors = _parse(tmp_path, text)
+    assert errors == [
+        "Line 4: Version '1.1.0' must be lower than version '1.0.0' above it (line 2).",
+        "Line 6: 'Unreleased' version must be listed above the released versions.",
+        "Line 8: Date '2024-02-01' of version '1.0.0-rc.1' is later than the date of version '1.1.0' above it (line 4).",
+        "Line 10: Version '1.0.0-rc.1' is already listed on line 8.",
+        "Line 14: Version 'legacy' is already listed on line 12.",
+    ]
+    # The index finds the first of a repeated version.
+    assert changelog["1.0.0-rc.1"].line == 8 and len(changelog) == 7
+
+
+def test_semver_precedence():
+    versions = ["1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta", "1.0.0-beta", "1.0.0-beta.2",
+                "1.0.0-beta.11", "1.0.0-rc.1", "1.0.0", "1.0.1", "1.10.0", "2.0.0+build.5"]
+    assert sorted(reversed(versions), key=semver_key) == versions
+    assert semver_key("1.0") is None and semver_key("01.0.0") is None
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
 import logging
 import yaml
 import json
 
 from modules.PyTeamCity import PyTeamCity
+from modules.RoleScopeIndex import RoleScopeIndex
+from modules.TeamCitySnapshot import TeamCitySnapshot
 
 # Generic log formatter.
 class LogFormatter(logging.Formatter):
@@ -58,11 +61,11 @@ def read_yaml_file(file_path:str=None):
     
     except FileNotFoundError as e:
         logger.error(f'Unable to {topic}. File not found: {file_path}')
-        raise (False, e)
+        raise
 
     except Exception as e:
         logger.error(f'Unable to {topic}. Reason: {e}')
-        raise (False, e)
+        raise
 
 def read_config_file(file_path:str=None):
     topic = 'read configuration file'
@@ -77,7 +80,7 @@ def read_config_file(file_path:str=None):
 
     except Exception as e:
         logger.error(f'Unable to {topic}. Reason: {e}')
-        raise (False, e)
+        raise
 
 def dict_deep_merge(dict1, dict2):
     """Recursively merge two dictionaries, including nested dictionaries."""
@@ -88,10 +91,46 @@ def dict_deep_merge(dict1, dict2):
             dict1[key] = dict2[key]
     return dict1
 
+def connect(config_path:str, credentials_path:str):
+    """Merge the configuration and credential files, and return a PyTeamCity client."""
+    try:
+        result_config, config = read_config_file(config_path)
+        result_creds, creds = read_config_file(credentials_path)
+    except Exception:
+        # read_config_file() has logged the reason.
+        result_config = result_creds = False
+
+    if not result_config or not result_creds:
+        logger.error(f'Unable to read either configuration or credentials file/s. Exiting.')
+        exit(1)
+
+    configuration = dict_deep_merge(config, creds)
+
+    url = configuration['teamcity']['config']['url']
+    username = configuration['teamcity']['auth']['username']
+    password = configuration['teamcity']['auth']['password']
+    
+    return PyTeamCity(base_url=url, username=username, password=password)
+
 # 
 # Main
 # 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report the users with a role in one or more TeamCity project scopes.')
+    parser.add_argument('--config', default='./config.yaml', help='Configuration file. Default is ./config.yaml')
+    parser.add_argument('--credentials', default='./credentials.yaml', help='Credentials file. Default is ./credentials.yaml')
+    parser.add_argument('--project', dest='projects', action='extend', nargs='+',
+                        help='Project id/s to audit, e.g. --project MyProj OtherProj. Subprojects (MyProj_*) are included.')
+    parser.add_argument('--snapshot', help='SQLite snapshot file. When provided, projects are audited offline from the snapshot.')
+    parser.add_argument('--sync', action='store_true', help='Pull the users and roles from TeamCity into the --snapshot file first.')
+    args = parser.parse_args()
+
+    if not args.projects and not args.sync:
+        parser.error('Either --project or --sync must be provided.')
+
+    if args.sync and not args.snapshot:
+        parser.error('--sync requires --snapshot.')
+
     log_stream_handler = logging.StreamHandler()
     log_stream_handler.setFormatter(LogFormatter(mesg_format='text', json_indent=0))
 
@@ -100,47 +139,44 @@ if __name__ == '__main__':
     logger.propagate = False
     logger.setLevel(logging.DEBUG)
     logger.info('Starting TeamCity script.')
-    exit(0)
-    # 
-    # Merge the configuration and credential files.
-    result_config, config = read_config_file('./config.yaml')
-    result_creds, creds = read_config_file('./credentials.yaml')
 
-    if not result_config or not result_creds:
-        logger.error(f'Unable to read either configuration or credentials file/s. Exiting.')
-        exit(1)
-    
-    import json
-    
-    logger.info(f'Configuration: {json.dumps(config)}')
-    exit(0)
+    if args.snapshot:
+        # 
+        # Audit from the local snapshot, syncing it from TeamCity first if asked to.
+        source = TeamCitySnapshot(args.snapshot)
 
-    # Merge the configuration and credential files.
-    configuration = dict_deep_merge(config, creds)
+        if args.sync:
+            logger.debug(f'Syncing the snapshot: {args.snapshot}')
+            result, message, stats = source.sync(connect(args.config, args.credentials))
 
-    url = configuration['teamcity']['config']['url']
-    username = configuration['teamcity']['auth']['username']
-    password = configuration['teamcity']['auth']['password']
-    
-    tc = PyTeamCity(base_url=url, username=username, password=password)
+            if not result:
+                logger.error(f'{message}: {stats}')
+                exit(1)
 
-    logger.debug(f'Getting all users with roles in the project scope.')
-    result, message, response = tc.get_users(fields='**')
+            logger.info(f'Snapshot synced. Added: {stats["added"]}. Updated: {stats["updated"]}. Unchanged: {stats["unchanged"]}. Removed: {stats["removed"]}.')
 
-    if not result:
-        logger.error(f'{message}')
-        exit(1)
+        elif source.last_sync() is None:
+            logger.error(f'The snapshot has never been synced. Run with --sync first.')
+            exit(1)
 
-    logger.debug(f'Found {len(response["user"])} users with roles in the project scope.')
-    
-    # 
-    # Look for any users with a role in the project scope.
-    scope_exact = [ 'p:MyProj' ]
-    scope_starts_with = [ f'{scope_exact[0]}_' ]   
+    else:
+        tc = connect(args.config, args.credentials)
+
+        logger.debug(f'Getting all users with their roles.')
+        result, message, response = tc.get_users(fields='user(username,roles(role(roleId,scope)))')
+
+        if not result:
+            logger.error(f'{message}')
+            exit(1)
+
+        # 
+        # Index the role scopes once, then look up each project and its subprojects.
+        source = RoleScopeIndex(response)
+
+    logger.debug(f'Indexed {len(source)} roles for {source.user_count} users.')
 
-    for user in response['user']:
-        username, roles = user['username'], user['roles']['role']
+    for project, grants in source.projects(args.projects or []).items():
+        logger.debug(f'Found {len(grants)} roles in the {project} project scope.')
 
-        for role in roles:
-            if role['scope'] in scope_exact or any([role['scope'].startswith(s) for s in scope_starts_with]):
-                logger.info(f'Username: {username}\tRoleId: {role["roleId"]}\tScope: {role["scope"]}')
+        for username, role_id, scope in grants:
+            logger.info(f'Project: {project}\tUsername: {username}\tRoleId: {role_id}\tScope: {scope}')
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+#
+# Memory benchmark: buffered json.loads() versus JsonStream.iter_array_items() on a synthetic
+# TeamCity users payload.
+#
+# Usage: python benchmarks/json_stream_memory.py [--users 100000] [--chunk-size 65536]
+#   (run from apps/pyteamcity)
+#
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.JsonStream import iter_array_items
+
+def synthetic_user(index:int):
+    return {
+        'username': f'user{index:07d}',
+        'name': f'User Number {index}',
+        'id': index,
+        'email': f'user{index}@contoso.example',
+        'href': f'/app/rest/users/id:{index}',
+        'roles': {'role': [
+            {'roleId': 'PROJECT_DEVELOPER', 'scope': f'p:Proj{index % 500}_Sub{index % 7}', 'href': f'/app/rest/users/id:{index}/roles/PROJECT_DEVELOPER/p:Proj{index % 500}'},
+            {'roleId': 'PROJECT_VIEWER', 'scope': f'p:Proj{(index + 1) % 500}', 'href': f'/app/rest/users/id:{index}/roles/PROJECT_VIEWER/p:Proj{(index + 1) % 500}'},
+        ]}
+    }
+
+def payload_chunks(users:int, chunk_size:int):
+    # Generates the response body lazily, the way it arrives from the socket.
+    pending = bytearray(f'{{"count":{users},"href":"/app/rest/users","user":['.encode('utf-8'))
+
+    for index in range(users):
+        if index:
+            pending += b','
+        pending += json.dumps(synthetic_user(index)).encode('utf-8')
+
+        if len(pending) >= chunk_size:
+            yield bytes(pending)
+            pending.clear()
+
+    pending += b']}'
+    yield bytes(pending)
+
+def measure(name:str, function):
+    # Time and memory are measured in separate runs, as tracing allocations slows everything down.
+    started = time.perf_counter()
+    count = function()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'name': name, 'users': count, 'seconds': round(elapsed, 3), 'peak_bytes': peak}
+
+def buffered(users:int, chunk_size:int):
+    # What response.json() does: join the whole body, then build the whole document.
+    body = b''.join(payload_chunks(users, chunk_size))
+    document = json.loads(body)
+    return sum(1 for _ in document['user'])
+
+def streamed(users:int, chunk_size:int):
+    return sum(1 for _ in iter_array_items(payload_chunks(users, chunk_size), 'user'))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100000, help='Number of synthetic users. Default is 100000')
+    parser.add_argument('--chunk-size', type=int, default=65536, help='Chunk size in bytes. Default is 65536')
+    args = parser.parse_args()
+
+    results = [
+        measure('buffered', lambda: buffered(args.users, args.chunk_size)),
+        measure('streamed', lambda: streamed(args.users, args.chunk_size)),
+    ]
+
+    for result in results:
+        print(json.dumps(result))
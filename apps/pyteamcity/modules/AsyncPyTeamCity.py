@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+#
+# AsyncPyTeamCity - An asyncio variant of PyTeamCity for concurrent fan-out queries.
+#
+# Version: Alpha 0.1
+#
+# Usage:
+#   async with AsyncPyTeamCity(base_url=url, token=token, max_concurrency=20) as tc:
+#       results = await tc.get_users_batch(['username:alice', 'username:bob'], fields='**')
+#
+
+# Import the required libraries.
+import asyncio
+import base64
+import logging
+import aiohttp
+
+from modules.PyTeamCity import PyTeamCity
+
+class AsyncPyTeamCity(PyTeamCity):
+    #
+    # Global variables
+    #
+    _max_concurrency:int = None
+    _limit_per_host:int = None
+    _timeout:float = None
+
+    _session:aiohttp.ClientSession = None
+    _semaphore:asyncio.Semaphore = None
+
+    def __init__(self, base_url:str=None, username:str=None, password:str=None, token=None, body_format='json', response_format:str='json', cache=None, max_concurrency:int=10, limit_per_host:int=4, timeout:float=60):
+        # Validate the common settings (url, formats, authentication, cache).
+        super().__init__(base_url=base_url, username=username, password=password, token=token, body_format=body_format, response_format=response_format, cache=cache)
+
+        try:
+            # Check the concurrency limits.
+            if not isinstance(max_concurrency, int) or max_concurrency < 1:
+                raise Exception('Maximum concurrency must be an integer of 1 or more.')
+
+            if not isinstance(limit_per_host, int) or limit_per_host < 0:
+                raise Exception('Limit per host must be an integer of 0 (unlimited) or more.')
+
+            if timeout is not None and timeout <= 0:
+                raise Exception('Timeout must be greater than 0 seconds, or None for no timeout.')
+
+            self._max_concurrency = max_concurrency
+            self._limit_per_host = limit_per_host
+            self._timeout = timeout
+            self._session = None
+            self._semaphore = None
+
+            self._logger.debug(f'Async TeamCity object initialized. Max concurrency: {max_concurrency}. Limit per host: {limit_per_host}.')
+
+        except Exception as e:
+            self._logger.error(f'Error: {e}')
+            raise
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        # The session must be created inside the running event loop, so it is created on first use.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._max_concurrency, limit_per_host=self._limit_per_host)
+            headers = dict(self._headers)
+            headers['Authorization'] = 'Basic ' + base64.b64encode(':'.join(self._auth).encode('utf-8')).decode('ascii')
+
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  headers=headers,
+                                                  timeout=aiohttp.ClientTimeout(total=self._timeout))
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+        self._semaphore = None
+
+    async def _get(self, url:str):
+        session = self._get_session()
+
+        # Check the cache first, and make the request conditional if the cached entry is stale.
+        cache_key, cache_entry, cache_headers = self._cache_lookup(url)
+
+        if cache_entry is not None and not cache_headers:
+            self._logger.debug(f'Cache hit: {url}')
+            self._cache.hit(cache_entry)
+            return self._decode_body(cache_entry['body'])
+
+        async with self._semaphore:
+            async with session.get(url, headers=cache_headers) as response:
+                if cache_entry is not None and response.status == 304:
+                    self._logger.debug(f'Cache revalidated: {url}')
+                    self._cache.revalidated(cache_key, cache_entry)
+                    return self._decode_body(cache_entry['body'])
+
+                response.raise_for_status()
+
+                if cache_key is not None:
+                    text = await response.text()
+                    self._cache.store(cache_key, text,
+                                      etag=response.headers.get('ETag'),
+                                      last_modified=response.headers.get('Last-Modified'))
+                    body = self._decode_body(text)
+                elif self._response_format == 'json':
+                    body = await response.json(content_type=None)
+                elif self._response_format == 'text':
+                    body = await response.text()
+                else:
+                    # Read the body before the connection is released, so the caller can still use it.
+                    await response.read()
+                    body = response
+
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f'Response: {body}')
+
+        return body
+
+    async def get_users(self, username:str=None, id:int=None, href:str=None, locator=None, fields:str="*"):
+        try:
+            url = self._users_url(username=username, id=id, href=href, locator=locator, fields=fields)
+
+            self._logger.debug(f'Request: {url}')
+
+            return True, 'Success', await self._get(url)
+
+        except aiohttp.ClientResponseError as e:
+            self._logger.error(f'HTTP Error: {e}')
+            return False, 'Failure', e
+
+        except Exception as e:
+            self._logger.error(f'Error: {e}')
+            return False, 'Failure', e
+
+    async def get_users_batch(self, locators:list=None, fields:str="*"):
+        #
+        # Fetch many user locators in parallel, e.g. ['username:alice', 'id:42'].
+        # - At most max_concurrency requests are in flight, and at most limit_per_host per host.
+        # - The results are returned in the same order as the locators, one (result, message, response) per locator.
+        # - A failure for one locator does not cancel the others.
+        #
+        if not locators:
+            return []
+
+        return list(await asyncio.gather(*[self.get_users(locator=locator, fields=fields) for locator in locators]))
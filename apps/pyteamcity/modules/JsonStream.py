@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+#
+# JsonStream - Incremental parsing of large TeamCity JSON responses.
+#
+# Version: Alpha 0.1
+#
+# TeamCity list responses are a top level object holding one array of entities, e.g.
+#   {"count": 2, "href": "/app/rest/users", "user": [{...}, {...}]}
+# iter_array_items() reads the body chunk by chunk and yields the entities of that array one at a
+# time, so each entity is built once and the whole document is never held in memory.
+#
+# Usage:
+#   for user in iter_array_items(response.iter_content(chunk_size=65536), 'user'):
+#       ...
+#
+
+# Import the required libraries.
+import codecs
+import json
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+class _ChunkBuffer:
+    #
+    # A text buffer over an iterable of str or bytes chunks. Consumed text is dropped by compact(),
+    # so the buffer only ever holds the entity being parsed plus at most one chunk.
+    #
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size:int=1):
+        # Read chunks until at least min_size more characters are buffered. Returns False at the end of the stream.
+        target = len(self.text) + min_size
+
+        while len(self.text) < target:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.text += self._decoder.decode(b'', final=True)
+                self.eof = True
+                return False
+
+            self.text += self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        return True
+
+    def compact(self):
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+
+    def peek(self):
+        # Returns the next non-whitespace character without consuming it, or '' at the end of the stream.
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+
+            self.compact()
+            if not self.fill():
+                return ''
+
+    def expect(self, characters:str):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f'Expected one of {characters!r} at offset {self.pos}, found {character!r}.')
+
+        self.pos += 1
+        return character
+
+    def decode(self):
+        # Decodes the next complete JSON value, reading more of the stream until it is complete.
+        self.peek()
+
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            # Grow the buffer geometrically, so a value larger than a chunk is not re-parsed once per chunk.
+            self.compact()
+            self.fill(max(len(self.text), 1))
+
+def iter_array_items(chunks, key:str):
+    #
+    # Yields the items of the array held by a top level key.
+    # - chunks: An iterable of str or bytes (UTF-8) chunks, e.g. requests' response.iter_content().
+    # - key: The top level key holding the array, e.g. 'user'.
+    #
+    # Other top level values are decoded and discarded. A missing key yields nothing.
+    # Raises ValueError (json.JSONDecodeError) on malformed documents.
+    #
+    buffer = _ChunkBuffer(chunks)
+    buffer.expect('{')
+
+    if buffer.peek() == '}':
+        return
+
+    while True:
+        name = buffer.decode()
+        if not isinstance(name, str):
+            raise ValueError(f'Expected an object key at offset {buffer.pos}.')
+
+        buffer.expect(':')
+
+        if name == key and buffer.peek() == '[':
+            buffer.expect('[')
+
+            if buffer.peek() != ']':
+                while True:
+                    yield buffer.decode()
+                    buffer.compact()
+
+                    if buffer.expect(',]') == ']':
+                        break
+            else:
+                buffer.expect(']')
+        else:
+            buffer.decode()
+            buffer.compact()
+
+        if buffer.expect(',}') == '}':
+            return
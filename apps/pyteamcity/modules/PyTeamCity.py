@@ -11,6 +11,8 @@ from requests.exceptions import HTTPError
 import logging
 import json
 
+from modules.JsonStream import iter_array_items
+
 # Configure the logger and format the logs as JSON.
 class PrettyJsonFormatter(logging.Formatter):
     def __init__(self, datefmt='%Y-%m-%d %H:%M:%S', indent=2):
@@ -57,6 +59,7 @@ class PyTeamCity:
     _body_format:str = None # json or xml
     _response_format:str = None # json or object
     _headers:str = {}
+    _cache = None # ResponseCache or None
 
     _log_stream_handler = logging.StreamHandler()
     _log_stream_handler.setFormatter(PrettyJsonFormatter())
@@ -66,7 +69,7 @@ class PyTeamCity:
     _logger.addHandler(_log_stream_handler)
     _logger.setLevel(logging.INFO)
 
-    def __init__(self, base_url:str=None, username:str=None, password:str=None, token=None, body_format='json', response_format:str='json'):
+    def __init__(self, base_url:str=None, username:str=None, password:str=None, token=None, body_format='json', response_format:str='json', cache=None):
         try:
             # 
             # Configure the logger and format the logs as JSON.
@@ -107,6 +110,9 @@ class PyTeamCity:
                 self._auth_type = 'USER_PASS'
                 self._auth = (username, password)
             
+            # Optional response cache, e.g. modules.ResponseCache.ResponseCache.
+            self._cache = cache
+
             # Log the successful initialization.
             auth_description = self._AUTH_TYPES[self._auth_type]['description']
 
@@ -116,63 +122,154 @@ class PyTeamCity:
             self._logger.error(f'Error: {e}')
             raise
 
+    def _users_url(self, username:str=None, id:int=None, href:str=None, locator=None, fields:str="*"):
+        # 
+        # Parameter rules:
+        # - username, id, href, locator: If none provided, assume all users are required.
+        # - username, id, href, locator: If provided, only one of these can be provided.
+        # - locator: If provided, nesting is within (), e.g. (username:myuser). All ( must be closed with ).
+        # - fields: If not provided, defaults to *.
+        # 
+
+        # Check that either 0 (all users) or 1 (specific user/s) of username, id, href, or locator is provided.
+        params_count = sum([1 for param in [username, id, href, locator] if param])
+        if params_count == 0:
+            self._logger.debug('Requesting all users.')  
+        elif params_count > 1:
+            raise Exception('Only one of username, id, href, or locator can be provided.')  
+        
+        # Check if locator is provided, the parantheses are balanced.
+        if locator and locator.count('(') != locator.count(')'):
+            raise Exception('Unbalanced parentheses in locator. Check that all ( are closed with ).')
+        
+        # Reset the fields to * if not provided.
+        if not fields:
+            fields = '*'
+        
+        # Construct the url depending on the parameters provided.
+        url = f'{self._api_url}/users'
+        url += f'?locator=username:{username}' if username else \
+               f'?locator=id:{id}' if id else \
+               f'?locator=href:{href}' if href else \
+               f'?locator={locator}' if locator else ''
+        
+        url += f'?fields={fields}' if params_count == 0 else f'&fields={fields}'
+
+        return url
+
+    def _cache_lookup(self, url:str):
+        # 
+        # Returns (key, entry, headers):
+        # - key: The cache key, or None when the response must not be cached.
+        # - entry: The cached entry, or None on a miss.
+        # - headers: Conditional request headers. Empty with an entry means the entry is fresh.
+        # 
+        # The object response format returns the raw response, so it always goes to the server.
+        if self._cache is None or self._response_format == 'object':
+            return None, None, {}
+
+        # TeamCity filters responses by permission, so each user or token gets its own entries. The
+        # password is left out of the key, as the keys are stored with the on-disk entries.
+        identity = f'{self._auth_type}:{self._auth[0]}'
+        key = self._cache.key(url, self._headers.get('Accept'), identity)
+        entry, headers = self._cache.lookup(key)
+
+        return key, entry, headers
+
+    def _decode_body(self, body:str):
+        if self._response_format == 'json':
+            return json.loads(body)
+
+        return body
+
     def get_users(self, username:str=None, id:int=None, href:str=None, locator=None, fields:str="*"):
         try:
-            # 
-            # Parameter rules:
-            # - username, id, href, locator: If none provided, assume all users are required.
-            # - username, id, href, locator: If provided, only one of these can be provided.
-            # - locator: If provided, nesting is within (), e.g. (username:myuser). All ( must be closed with ).
-            # - fields: If not provided, defaults to *.
-            # 
-
-            # Check that either 0 (all users) or 1 (specific user/s) of username, id, href, or locator is provided.
-            params_count = sum([1 for param in [username, id, href, locator] if param])
-            if params_count == 0:
-                self._logger.debug('Requesting all users.')  
-            elif params_count > 1:
-                raise Exception('Only one of username, id, href, or locator can be provided.')  
-            
-            # Check if locator is provided, the parantheses are balanced.
-            if locator and locator.count('(') != locator.count(')'):
-                raise Exception('Unbalanced parentheses in locator. Check that all ( are closed with ).')
-            
-            # Reset the fields to * if not provided.
-            if not fields:
-                fields = '*'
-            
-            # Construct the url depending on the parameters provided.
-            url = f'{self._api_url}/users'
-            url += f'?locator=username:{username}' if username else \
-                   f'?locator=id:{id}' if id else \
-                   f'?locator=href:{href}' if href else \
-                   f'?locator:{locator}' if locator else ''
-            
-            url += f'?fields={fields}' if params_count == 0 else f'&fields={fields}'
+            url = self._users_url(username=username, id=id, href=href, locator=locator, fields=fields)
 
             self._logger.debug(f'Request: {url}')
 
-            headers = self._headers
+            headers = dict(self._headers)
             auth = self._auth
 
             params = {}
 
+            # Check the cache first, and make the request conditional if the cached entry is stale.
+            cache_key, cache_entry, cache_headers = self._cache_lookup(url)
+
+            if cache_entry is not None and not cache_headers:
+                self._logger.debug(f'Cache hit: {url}')
+                self._cache.hit(cache_entry)
+                return True, 'Success', self._decode_body(cache_entry['body'])
+
+            headers.update(cache_headers)
+
             # Make the request.
             response = requests.get(url=url, 
                                     auth=auth, 
                                     params=params, 
                                     headers=headers)
+
+            if cache_entry is not None and response.status_code == 304:
+                self._logger.debug(f'Cache revalidated: {url}')
+                self._cache.revalidated(cache_key, cache_entry)
+                return True, 'Success', self._decode_body(cache_entry['body'])
+
             response.raise_for_status()
 
+            if cache_key is not None:
+                self._cache.store(cache_key, response.text,
+                                  etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
+
             if self._response_format == 'json':
-                self._logger.debug(f'Response: {response.json()}')
-                return True, 'Success', response.json()
+                body = response.json()
             elif self._response_format == 'text':
-                self._logger.debug(f'Response: {response.text}')
-                return True, 'Success', response.text
+                body = response.text
             else:
-                self._logger.debug(f'Response: {response}')
-                return True, 'Success', response
+                body = response
+
+            # Only format the (possibly multi-megabyte) body when it will actually be logged.
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug(f'Response: {body}')
+
+            return True, 'Success', body
+        
+        except HTTPError as e:
+            self._logger.error(f'HTTP Error: {e}')
+            return False, 'Failure', e
+        
+        except Exception as e:
+            self._logger.error(f'Error: {e}')
+            return False, 'Failure', e
+
+    def iter_users(self, username:str=None, id:int=None, href:str=None, locator=None, fields:str="*", chunk_size:int=65536):
+        # 
+        # Streaming variant of get_users() for large responses.
+        # - Same parameters as get_users(), plus chunk_size: The number of bytes read from the socket at a time.
+        # - Returns (result, message, users), where users is a generator yielding one user dict at a time,
+        #   parsed incrementally as the body arrives. The body is never held in memory as a whole.
+        # - Always requests JSON and bypasses the response cache.
+        # 
+        try:
+            url = self._users_url(username=username, id=id, href=href, locator=locator, fields=fields)
+
+            self._logger.debug(f'Request (streaming): {url}')
+
+            headers = dict(self._headers)
+            headers['Accept'] = 'application/json'
+
+            # Make the request, only reading the headers for now.
+            response = requests.get(url=url, 
+                                    auth=self._auth, 
+                                    headers=headers,
+                                    stream=True)
+            response.raise_for_status()
+
+            def users():
+                with response:
+                    yield from iter_array_items(response.iter_content(chunk_size=chunk_size), 'user')
+
+            return True, 'Success', users()
         
         except HTTPError as e:
             self._logger.error(f'HTTP Error: {e}')
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+#
+# ResponseCache - A response cache for PyTeamCity reads.
+#
+# Version: Alpha 0.1
+#
+# Entries are held in an in-memory LRU with a TTL, and optionally also in an on-disk store so
+# repeated runs can reuse them. Stale entries that carry an ETag or Last-Modified header are kept,
+# so the next request can be made conditional (If-None-Match / If-Modified-Since) and a
+# 304 Not Modified answer reuses the cached body.
+#
+# Usage:
+#   cache = ResponseCache(max_entries=256, ttl=300, directory='./.tc_cache')
+#   tc = PyTeamCity(base_url=url, token=token, cache=cache)
+#   ...
+#   print(cache.stats())
+#
+
+# Import the required libraries.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    #
+    # Global variables
+    #
+    _max_entries:int = None
+    _ttl:float = None
+    _directory:str = None
+
+    _entries:OrderedDict = None
+    _lock:threading.Lock = None
+    _counters:dict = None
+
+    def __init__(self, max_entries:int=256, ttl:float=300, directory:str=None):
+        # Check the limits.
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise Exception('Maximum entries must be an integer of 1 or more.')
+
+        if ttl is None or ttl < 0:
+            raise Exception('TTL must be 0 or more seconds.')
+
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._directory = directory
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+
+    @staticmethod
+    def key(url:str, accept:str=None, identity:str=None):
+        # The url carries the locator and fields, the Accept header decides between json and xml bodies,
+        # and the identity (who is asking) keeps a response out of the hands of other credentials.
+        return hashlib.sha256(f'{identity} {accept} {url}'.encode('utf-8')).hexdigest()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries))
+
+    def is_fresh(self, entry:dict):
+        return time.time() - entry['stored'] < self._ttl
+
+    def get(self, key:str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+
+        return entry
+
+    def lookup(self, key:str):
+        #
+        # Returns (entry, headers):
+        # - entry: The cached entry if there is one worth using, otherwise None.
+        # - headers: The conditional request headers to send when the entry is stale.
+        #
+        entry = self.get(key)
+
+        if entry is None:
+            return None, {}
+
+        if self.is_fresh(entry):
+            return entry, {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        # Nothing to revalidate with, so the entry is useless.
+        if not headers:
+            self.discard(key)
+            return None, {}
+
+        return entry, headers
+
+    def hit(self, entry:dict):
+        with self._lock:
+            self._counters['hits'] += 1
+            self._counters['bytes_saved'] += entry['size']
+
+    def revalidated(self, key:str, entry:dict):
+        # A 304 Not Modified answer. The cached body is still current, so restart its TTL.
+        entry = dict(entry, stored=time.time())
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+        with self._lock:
+            self._counters['revalidated'] += 1
+            self._counters['bytes_saved'] += entry['size']
+
+        return entry
+
+    def store(self, key:str, body:str, etag:str=None, last_modified:str=None):
+        entry = {
+            'stored': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': len(body.encode('utf-8')),
+            'body': body
+        }
+
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+        with self._lock:
+            self._counters['misses'] += 1
+
+        return entry
+
+    def discard(self, key:str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self._directory:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+        if self._directory:
+            for file in os.listdir(self._directory):
+                if file.endswith('.json'):
+                    os.remove(os.path.join(self._directory, file))
+
+    def _remember(self, key:str, entry:dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries.
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key:str):
+        return os.path.join(self._directory, f'{key}.json')
+
+    def _read_disk(self, key:str):
+        if not self._directory:
+            return None
+
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_disk(self, key:str, entry:dict):
+        if not self._directory:
+            return
+
+        # Write to a temporary file and rename it, so a reader never sees a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(entry, file)
+            os.replace(temp_path, self._disk_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
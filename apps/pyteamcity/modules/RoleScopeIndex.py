@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+#
+# RoleScopeIndex - An index over TeamCity role scopes for fast project permission audits.
+#
+# Version: Alpha 0.1
+#
+# The index is built once from a PyTeamCity.get_users() response (fields must include the roles).
+# Scopes are held in a sorted list, so "who has which role under project X and its subprojects"
+# is a binary search for 'p:X' followed by a walk over the contiguous 'p:X_' range, instead of a
+# scan over every role of every user.
+#
+# Usage:
+#   result, message, response = tc.get_users(fields='user(username,roles(role(roleId,scope)))')
+#   index = RoleScopeIndex(response)
+#   for username, role_id, scope in index.project('MyProj'):
+#       ...
+#
+
+# Import the required libraries.
+from bisect import bisect_left
+
+class RoleScopeIndex:
+    #
+    # Constants
+    #
+    # Project scopes are 'p:<project id>', and subproject ids are '<parent id>_<name>'.
+    _PROJECT_PREFIX = 'p:'
+    _SUBPROJECT_SEPARATOR = '_'
+
+    # ------------------------------
+
+    #
+    # Global variables
+    #
+    _scopes:list = None     # Sorted, unique scopes.
+    _grants:dict = None     # Scope -> list of (username, roleId).
+    _users:int = None
+
+    def __init__(self, response:dict=None):
+        self._scopes = []
+        self._grants = {}
+        self._users = 0
+
+        if response:
+            self.add_users(response.get('user', []))
+
+    def add_users(self, users:list):
+        for user in users:
+            username = user.get('username')
+            roles = (user.get('roles') or {}).get('role') or []
+
+            for role in roles:
+                self._grants.setdefault(role['scope'], []).append((username, role['roleId']))
+
+            self._users += 1
+
+        # Sort once per batch of users rather than on every insert.
+        self._scopes = sorted(self._grants)
+
+    def __len__(self):
+        return sum(len(grants) for grants in self._grants.values())
+
+    @property
+    def user_count(self):
+        return self._users
+
+    def scope(self, scope:str):
+        # Returns the (username, roleId, scope) grants for exactly this scope.
+        return [(username, role_id, scope) for username, role_id in self._grants.get(scope, [])]
+
+    def scopes_starting_with(self, prefix:str):
+        # Sorted scopes sharing a prefix are contiguous, so find the first and walk until they stop matching.
+        index = bisect_left(self._scopes, prefix)
+
+        while index < len(self._scopes) and self._scopes[index].startswith(prefix):
+            yield self._scopes[index]
+            index += 1
+
+    def project(self, project:str):
+        #
+        # Returns the (username, roleId, scope) grants for a project and all of its subprojects.
+        # - project: The project id (MyProj) or its scope (p:MyProj).
+        #
+        scope = project if project.startswith(self._PROJECT_PREFIX) else f'{self._PROJECT_PREFIX}{project}'
+
+        grants = self.scope(scope)
+        for subproject_scope in self.scopes_starting_with(f'{scope}{self._SUBPROJECT_SEPARATOR}'):
+            grants.extend(self.scope(subproject_scope))
+
+        return grants
+
+    def projects(self, projects:list):
+        # Returns {project: grants} for many projects in one pass over the index.
+        return {project: self.project(project) for project in projects}
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+#
+# TeamCitySnapshot - A local SQLite snapshot of TeamCity users and roles for offline queries.
+#
+# Version: Alpha 0.1
+#
+# sync() streams the users and their roles from TeamCity (PyTeamCity.iter_users) into indexed tables.
+# The REST API has no "changed since" filter for users, so every sync reads the full list, but only
+# users whose record changed since the last sync are rewritten, and users that no longer exist are removed.
+# The query methods mirror RoleScopeIndex, so audits can run against either.
+#
+# Usage:
+#   snapshot = TeamCitySnapshot('./teamcity.sqlite')
+#   result, message, stats = snapshot.sync(tc)
+#   for username, role_id, scope in snapshot.project('MyProj'):
+#       ...
+#
+
+# Import the required libraries.
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+class TeamCitySnapshot:
+    #
+    # Constants
+    #
+    # Bump the schema version, and add a migration to _SCHEMA, when tables are added (e.g. projects).
+    _SCHEMA_VERSION = 1
+    _SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            name TEXT,
+            email TEXT,
+            digest TEXT NOT NULL,
+            synced_at REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS users_username ON users (username)',
+        '''CREATE TABLE IF NOT EXISTS roles (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            role_id TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            PRIMARY KEY (user_id, role_id, scope)
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS roles_scope ON roles (scope, role_id)',
+        'CREATE INDEX IF NOT EXISTS roles_role_id ON roles (role_id)',
+    ]
+
+    # The user fields requested from TeamCity during a sync.
+    _SYNC_FIELDS = 'user(id,username,name,email,roles(role(roleId,scope)))'
+
+    # Project scopes are 'p:<project id>', and subproject ids are '<parent id>_<name>'.
+    _PROJECT_PREFIX = 'p:'
+    _SUBPROJECT_SEPARATOR = '_'
+
+    # ------------------------------
+
+    #
+    # Global variables
+    #
+    _path:str = None
+    _connection:sqlite3.Connection = None
+
+    _logger = logging.getLogger('PyTeamCity')
+
+    def __init__(self, path:str=None):
+        if not path:
+            raise Exception('Snapshot path must be provided.')
+
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.execute('PRAGMA journal_mode = WAL')
+
+        with self._connection:
+            for statement in self._SCHEMA:
+                self._connection.execute(statement)
+            self._connection.execute(f'PRAGMA user_version = {self._SCHEMA_VERSION}')
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _digest(user:dict):
+        return hashlib.sha1(json.dumps(user, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def sync(self, tc):
+        #
+        # Pulls the users and roles from TeamCity into the snapshot.
+        # - tc: A PyTeamCity instance.
+        # - Returns (result, message, stats), where stats counts the added, updated, unchanged and removed users.
+        #
+        try:
+            result, message, users = tc.iter_users(fields=self._SYNC_FIELDS)
+            if not result:
+                return False, message, users
+
+            stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+            synced_at = time.time()
+
+            known = dict(self._connection.execute('SELECT id, digest FROM users'))
+            seen = set()
+
+            # One transaction for the whole sync, so readers never see a half synced snapshot.
+            with self._connection:
+                for user in users:
+                    user_id = int(user['id'])
+                    digest = self._digest(user)
+                    seen.add(user_id)
+
+                    if known.get(user_id) == digest:
+                        stats['unchanged'] += 1
+                        continue
+
+                    stats['added' if user_id not in known else 'updated'] += 1
+
+                    self._connection.execute(
+                        'INSERT INTO users (id, username, name, email, digest, synced_at) VALUES (?, ?, ?, ?, ?, ?) '
+                        'ON CONFLICT (id) DO UPDATE SET username = excluded.username, name = excluded.name, '
+                        'email = excluded.email, digest = excluded.digest, synced_at = excluded.synced_at',
+                        (user_id, user.get('username'), user.get('name'), user.get('email'), digest, synced_at))
+
+                    # Replace the roles of a changed user.
+                    roles = (user.get('roles') or {}).get('role') or []
+                    self._connection.execute('DELETE FROM roles WHERE user_id = ?', (user_id,))
+                    self._connection.executemany(
+                        'INSERT OR IGNORE INTO roles (user_id, role_id, scope) VALUES (?, ?, ?)',
+                        [(user_id, role['roleId'], role['scope']) for role in roles])
+
+                removed = [(user_id,) for user_id in known if user_id not in seen]
+                self._connection.executemany('DELETE FROM users WHERE id = ?', removed)
+                stats['removed'] = len(removed)
+
+                self._connection.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+                    ('last_sync', str(synced_at)),
+                    ('last_sync_stats', json.dumps(stats)),
+                ])
+
+            self._logger.debug(f'Snapshot synced: {self._path}. {stats}')
+            return True, 'Success', stats
+
+        except Exception as e:
+            self._logger.error(f'Error: {e}')
+            return False, 'Failure', e
+
+    def last_sync(self):
+        # Returns the time (seconds since the epoch) of the last successful sync, or None.
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'last_sync'").fetchone()
+        return float(row[0]) if row else None
+
+    @property
+    def user_count(self):
+        return self._connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM roles').fetchone()[0]
+
+    def scope(self, scope:str):
+        # Returns the (username, roleId, scope) grants for exactly this scope.
+        return self._connection.execute(
+            'SELECT u.username, r.role_id, r.scope FROM roles r JOIN users u ON u.id = r.user_id '
+            'WHERE r.scope = ? ORDER BY u.username, r.role_id', (scope,)).fetchall()
+
+    def project(self, project:str):
+        #
+        # Returns the (username, roleId, scope) grants for a project and all of its subprojects.
+        # - project: The project id (MyProj) or its scope (p:MyProj).
+        #
+        scope = project if project.startswith(self._PROJECT_PREFIX) else f'{self._PROJECT_PREFIX}{project}'
+
+        # 'p:MyProj_' <= scope < 'p:MyProj`' is the subproject prefix as a range the scope index can seek.
+        prefix = f'{scope}{self._SUBPROJECT_SEPARATOR}'
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        return self._connection.execute(
+            'SELECT u.username, r.role_id, r.scope FROM roles r JOIN users u ON u.id = r.user_id '
+            'WHERE r.scope = ? OR (r.scope >= ? AND r.scope < ?) ORDER BY r.scope, u.username, r.role_id',
+            (scope, prefix, upper)).fetchall()
+
+    def projects(self, projects:list):
+        # Returns {project: grants} for many projects.
+        return {project: self.project(project) for project in projects}
+
+    def user_roles(self, username:str):
+        # Returns the (roleId, scope) roles of a user.
+        return self._connection.execute(
+            'SELECT r.role_id, r.scope FROM roles r JOIN users u ON u.id = r.user_id '
+            'WHERE u.username = ? ORDER BY r.scope, r.role_id', (username,)).fetchall()
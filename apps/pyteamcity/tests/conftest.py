@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the app's "modules" package importable, the same way app.py imports it.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from modules.AsyncPyTeamCity import AsyncPyTeamCity
+
+
+async def _start_server(state):
+    async def users(request):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            locator = request.query.get("locator", "")
+            # Answer later requests sooner, so completion order differs from request order.
+            await asyncio.sleep(0.05 / (1 + len(state["seen"])))
+            state["seen"].append(locator)
+            if locator == "username:missing":
+                raise web.HTTPNotFound()
+            return web.json_response({"user": [{"username": locator.split(":", 1)[-1]}], "fields": request.query.get("fields")})
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app.router.add_get("/app/rest/users", users)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_batch_preserves_order_and_bounds_concurrency():
+    async def scenario():
+        state = {"in_flight": 0, "peak": 0, "seen": []}
+        runner, url = await _start_server(state)
+        try:
+            locators = [f"username:user{i}" for i in range(20)]
+            async with AsyncPyTeamCity(base_url=url, token="t", max_concurrency=3, limit_per_host=3) as tc:
+                results = await tc.get_users_batch(locators, fields="username")
+        finally:
+            await runner.cleanup()
+        return state, results
+
+    state, results = asyncio.run(scenario())
+    assert [r[2]["user"][0]["username"] for r in results] == [f"user{i}" for i in range(20)]
+    assert all(r[0] for r in results)
+    assert results[0][2]["fields"] == "username"
+    assert state["peak"] <= 3
+
+
+def test_batch_reports_failures_per_locator():
+    async def scenario():
+        state = {"in_flight": 0, "peak": 0, "seen": []}
+        runner, url = await _start_server(state)
+        try:
+            async with AsyncPyTeamCity(base_url=url, username="u", password="p") as tc:
+                return await tc.get_users_batch(["username:alice", "username:missing", "(bad"])
+        finally:
+            await runner.cleanup()
+
+    results = asyncio.run(scenario())
+    assert results[0][0] is True
+    assert results[1][0] is False and results[1][2].status == 404
+    assert results[2][0] is False
+
+
+def test_invalid_concurrency():
+    with pytest.raises(Exception):
+        AsyncPyTeamCity(base_url="http://localhost", token="t", max_concurrency=0)
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from modules.JsonStream import iter_array_items
+
+DOCUMENT = {
+    "count": 3,
+    "href": "/app/rest/users?fields=*",
+    "nested": {"user": ["not", "this", "one"], "n": [1, 2.5, -3e2]},
+    "user": [
+        {"username": "alice", "id": 1, "roles": {"role": [{"roleId": "PROJECT_ADMIN", "scope": "p:MyProj"}]}},
+        {"username": "björn ☃", "id": 22, "flags": [True, False, None]},
+        {"username": "carol", "id": 12345678901234},
+    ],
+    "nextHref": "/app/rest/users?start=3",
+}
+
+
+def _chunks(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 1 << 20])
+def test_matches_json_loads_for_any_chunking(size):
+    body = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8")
+    assert list(iter_array_items(_chunks(body, size), "user")) == DOCUMENT["user"]
+
+
+def test_text_chunks_and_empty_arrays():
+    assert list(iter_array_items(['{"user": [] }'], "user")) == []
+    assert list(iter_array_items(['{}'], "user")) == []
+    assert list(iter_array_items(['{"count": 0}'], "user")) == []
+    assert list(iter_array_items(['{"user": [1', '2, 3', ']}'], "user")) == [12, 3]
+
+
+@pytest.mark.parametrize("body", ['', '[]', '{"user": [1, 2', '{"user": [1 2]}', '{"count": 1 "user": []}'])
+def test_malformed_documents_raise(body):
+    with pytest.raises(ValueError):
+        list(iter_array_items(_chunks(body, 3), "user"))
@@ -0,0 +1,105 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.ResponseCache import ResponseCache
+
+requests = pytest.importorskip("requests")
+from modules.PyTeamCity import PyTeamCity
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    for name in ("a", "b", "c"):
+        cache.store(name, name)
+    assert cache.get("a") is None
+    assert cache.get("b")["body"] == "b"
+    assert cache.stats()["entries"] == 2
+
+
+def test_stale_entry_yields_conditional_headers():
+    cache = ResponseCache(ttl=0)
+    cache.store("k", "body", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    entry, headers = cache.lookup("k")
+    assert entry["body"] == "body"
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+    # Without validators a stale entry is dropped.
+    cache.store("plain", "body")
+    assert cache.lookup("plain") == (None, {})
+    assert cache.get("plain") is None
+
+
+def test_disk_store_survives_new_instance(tmp_path):
+    ResponseCache(ttl=60, directory=str(tmp_path)).store("k", "payload", etag='"e"')
+    entry, headers = ResponseCache(ttl=60, directory=str(tmp_path)).lookup("k")
+    assert entry["body"] == "payload" and headers == {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    body = json.dumps({"count": 1, "user": [{"username": "alice"}]}).encode()
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_client_hits_and_revalidates(server):
+    cache = ResponseCache(ttl=60)
+    tc = PyTeamCity(base_url=server, token="t", cache=cache)
+
+    assert tc.get_users(fields="username")[2]["user"][0]["username"] == "alice"
+    assert tc.get_users(fields="username")[2]["user"][0]["username"] == "alice"
+    assert _Handler.requests_seen == [None]
+
+    # Expire the entry, the next request is conditional and answered with 304.
+    cache._ttl = 0
+    result, _, response = tc.get_users(fields="username")
+    assert result and response["count"] == 1
+    assert _Handler.requests_seen == [None, '"v1"']
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["revalidated"]) == (1, 1, 1)
+    assert stats["bytes_saved"] == 2 * len(_Handler.body)
+
+    # Different fields are a different cache entry.
+    tc.get_users(fields="*")
+    assert cache.stats()["misses"] == 2
+
+
+def test_credentials_get_their_own_entries(server):
+    cache = ResponseCache(ttl=60)
+    alice = PyTeamCity(base_url=server, username="alice", password="a", cache=cache)
+    bob = PyTeamCity(base_url=server, username="bob", password="b", cache=cache)
+
+    alice.get_users(fields="username")
+    bob.get_users(fields="username")
+    alice.get_users(fields="username")
+    assert _Handler.requests_seen == [None, None]
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (2, 1)
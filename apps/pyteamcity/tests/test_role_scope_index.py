@@ -0,0 +1,53 @@
+from modules.RoleScopeIndex import RoleScopeIndex
+
+RESPONSE = {
+    "count": 4,
+    "user": [
+        {"username": "alice", "roles": {"role": [
+            {"roleId": "PROJECT_ADMIN", "scope": "p:MyProj"},
+            {"roleId": "PROJECT_VIEWER", "scope": "p:OtherProj"},
+        ]}},
+        {"username": "bob", "roles": {"role": [
+            {"roleId": "PROJECT_DEVELOPER", "scope": "p:MyProj_Sub"},
+            {"roleId": "PROJECT_VIEWER", "scope": "p:MyProject"},
+        ]}},
+        {"username": "carol", "roles": {"role": [{"roleId": "SYSTEM_ADMIN", "scope": "g"}]}},
+        {"username": "dave"},
+    ],
+}
+
+
+def _legacy_scan(response, project):
+    # The original app.py loop.
+    scope_exact = [f"p:{project}"]
+    scope_starts_with = [f"{scope_exact[0]}_"]
+    found = []
+    for user in response["user"]:
+        for role in (user.get("roles") or {}).get("role", []):
+            if role["scope"] in scope_exact or any([role["scope"].startswith(s) for s in scope_starts_with]):
+                found.append((user["username"], role["roleId"], role["scope"]))
+    return found
+
+
+def test_project_includes_subprojects_only():
+    index = RoleScopeIndex(RESPONSE)
+    assert sorted(index.project("MyProj")) == [
+        ("alice", "PROJECT_ADMIN", "p:MyProj"),
+        ("bob", "PROJECT_DEVELOPER", "p:MyProj_Sub"),
+    ]
+    assert index.project("p:MyProj") == index.project("MyProj")
+    assert index.project("Missing") == []
+
+
+def test_matches_legacy_scan():
+    index = RoleScopeIndex(RESPONSE)
+    for project in ("MyProj", "MyProject", "OtherProj", "My"):
+        assert sorted(index.project(project)) == sorted(_legacy_scan(RESPONSE, project))
+
+
+def test_counts_and_many_projects():
+    index = RoleScopeIndex(RESPONSE)
+    assert len(index) == 5
+    assert index.user_count == 4
+    assert set(index.projects(["MyProj", "OtherProj"])) == {"MyProj", "OtherProj"}
+    assert index.scope("g") == [("carol", "SYSTEM_ADMIN", "g")]
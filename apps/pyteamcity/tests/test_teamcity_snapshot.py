@@ -0,0 +1,63 @@
+import copy
+
+from modules.RoleScopeIndex import RoleScopeIndex
+from modules.TeamCitySnapshot import TeamCitySnapshot
+
+USERS = [
+    {"id": 1, "username": "alice", "roles": {"role": [
+        {"roleId": "PROJECT_ADMIN", "scope": "p:MyProj"},
+        {"roleId": "PROJECT_VIEWER", "scope": "p:MyProject"},
+    ]}},
+    {"id": 2, "username": "bob", "roles": {"role": [{"roleId": "PROJECT_DEVELOPER", "scope": "p:MyProj_Sub"}]}},
+    {"id": 3, "username": "carol"},
+]
+
+
+class FakeTeamCity:
+    def __init__(self, users):
+        self.users = users
+
+    def iter_users(self, fields="*"):
+        return True, "Success", iter(copy.deepcopy(self.users))
+
+
+def test_sync_and_query_match_index(tmp_path):
+    with TeamCitySnapshot(str(tmp_path / "tc.sqlite")) as snapshot:
+        assert snapshot.last_sync() is None
+        result, _, stats = snapshot.sync(FakeTeamCity(USERS))
+        assert result and stats == {"added": 3, "updated": 0, "unchanged": 0, "removed": 0}
+        assert snapshot.last_sync() is not None
+
+        index = RoleScopeIndex({"user": USERS})
+        for project in ("MyProj", "MyProject", "p:MyProj_Sub", "Missing"):
+            assert sorted(snapshot.project(project)) == sorted(index.project(project))
+
+        assert snapshot.user_count == 3 and len(snapshot) == 3
+        assert snapshot.user_roles("alice") == [("PROJECT_ADMIN", "p:MyProj"), ("PROJECT_VIEWER", "p:MyProject")]
+
+
+def test_incremental_sync(tmp_path):
+    path = str(tmp_path / "tc.sqlite")
+    with TeamCitySnapshot(path) as snapshot:
+        snapshot.sync(FakeTeamCity(USERS))
+
+    users = copy.deepcopy(USERS[:2])
+    users[1]["roles"]["role"] = [{"roleId": "PROJECT_VIEWER", "scope": "p:Other"}]
+
+    with TeamCitySnapshot(path) as snapshot:
+        result, _, stats = snapshot.sync(FakeTeamCity(users))
+        assert stats == {"added": 0, "updated": 1, "unchanged": 1, "removed": 1}
+        assert snapshot.project("MyProj") == [("alice", "PROJECT_ADMIN", "p:MyProj")]
+        assert snapshot.scope("p:Other") == [("bob", "PROJECT_VIEWER", "p:Other")]
+        assert snapshot.user_count == 2
+
+
+def test_sync_failure_is_reported(tmp_path):
+    class Broken:
+        def iter_users(self, fields="*"):
+            return False, "Failure", Exception("boom")
+
+    with TeamCitySnapshot(str(tmp_path / "tc.sqlite")) as snapshot:
+        result, message, _ = snapshot.sync(Broken())
+        assert not result and message == "Failure"
+        assert snapshot.last_sync() is None